@@ -0,0 +1,311 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Benchmark of Block.from_signed_raw against the previous line by line parser,
+# and of Block.from_parsed_json eager and lazy modes
+#
+# Run from the project folder:
+#
+#   poetry run python benchmarks/block_parser.py
+
+import json
+import timeit
+
+from duniterpy.documents import (
+    Certification,
+    Identity,
+    MalformedDocumentError,
+    Membership,
+    Revocation,
+    Transaction,
+)
+from duniterpy.documents.block import Block
+from tests.documents.test_block import (
+    json_block_0,
+    json_block_250004,
+    raw_block_with_tx,
+    raw_block_zero,
+    raw_block_with_leavers,
+)
+
+# CONFIG #######################################
+
+# number of parsing of each sample block per run
+ITERATIONS = 1000
+# number of runs
+REPEAT = 5
+
+################################################
+
+
+def legacy_from_signed_raw(signed_raw: str) -> Block:
+    """
+    Previous implementation of Block.from_signed_raw, for reference
+    """
+    lines = signed_raw.splitlines(True)
+    n = 0
+
+    version = int(Block.parse_field("Version", lines[n]))
+    n += 1
+
+    Block.parse_field("Type", lines[n])
+    n += 1
+
+    currency = Block.parse_field("Currency", lines[n])
+    n += 1
+
+    number = int(Block.parse_field("Number", lines[n]))
+    n += 1
+
+    powmin = int(Block.parse_field("PoWMin", lines[n]))
+    n += 1
+
+    time = int(Block.parse_field("Time", lines[n]))
+    n += 1
+
+    mediantime = int(Block.parse_field("MedianTime", lines[n]))
+    n += 1
+
+    ud_match = Block.re_universaldividend.match(lines[n])
+    ud = None
+    unit_base = 0
+    if ud_match is not None:
+        ud = int(Block.parse_field("UD", lines[n]))
+        n += 1
+
+    unit_base = int(Block.parse_field("UnitBase", lines[n]))
+    n += 1
+
+    issuer = Block.parse_field("Issuer", lines[n])
+    n += 1
+
+    issuers_frame = Block.parse_field("IssuersFrame", lines[n])
+    n += 1
+    issuers_frame_var = Block.parse_field("IssuersFrameVar", lines[n])
+    n += 1
+    different_issuers_count = Block.parse_field("DifferentIssuersCount", lines[n])
+    n += 1
+
+    prev_hash = None
+    prev_issuer = None
+    if number > 0:
+        prev_hash = str(Block.parse_field("PreviousHash", lines[n]))
+        n += 1
+
+        prev_issuer = str(Block.parse_field("PreviousIssuer", lines[n]))
+        n += 1
+
+    parameters = None
+    if number == 0:
+        try:
+            params_match = Block.re_parameters.match(lines[n])
+            if params_match is None:
+                raise MalformedDocumentError("Parameters")
+            parameters = params_match.groups()
+            n += 1
+        except AttributeError:
+            raise MalformedDocumentError("Parameters") from AttributeError
+
+    members_count = int(Block.parse_field("MembersCount", lines[n]))
+    n += 1
+
+    identities = []
+    joiners = []
+    actives = []
+    leavers = []
+    revoked = []
+    excluded = []
+    certifications = []
+    transactions = []
+
+    if Block.re_identities.match(lines[n]) is not None:
+        n += 1
+        while Block.re_joiners.match(lines[n]) is None:
+            selfcert = Identity.from_inline(version, currency, lines[n])
+            identities.append(selfcert)
+            n += 1
+
+    if Block.re_joiners.match(lines[n]):
+        n += 1
+        while Block.re_actives.match(lines[n]) is None:
+            membership = Membership.from_inline(version, currency, "IN", lines[n])
+            joiners.append(membership)
+            n += 1
+
+    if Block.re_actives.match(lines[n]):
+        n += 1
+        while Block.re_leavers.match(lines[n]) is None:
+            membership = Membership.from_inline(version, currency, "IN", lines[n])
+            actives.append(membership)
+            n += 1
+
+    if Block.re_leavers.match(lines[n]):
+        n += 1
+        while Block.re_revoked.match(lines[n]) is None:
+            membership = Membership.from_inline(version, currency, "OUT", lines[n])
+            leavers.append(membership)
+            n += 1
+
+    if Block.re_revoked.match(lines[n]):
+        n += 1
+        while Block.re_excluded.match(lines[n]) is None:
+            revokation = Revocation.from_inline(version, currency, lines[n])
+            revoked.append(revokation)
+            n += 1
+
+    if Block.re_excluded.match(lines[n]):
+        n += 1
+        while Block.re_certifications.match(lines[n]) is None:
+            exclusion_match = Block.re_exclusion.match(lines[n])
+            if exclusion_match is not None:
+                exclusion = exclusion_match.group(1)
+                excluded.append(exclusion)
+            n += 1
+
+    if Block.re_certifications.match(lines[n]):
+        n += 1
+        while Block.re_transactions.match(lines[n]) is None:
+            certification = Certification.from_inline(
+                version, currency, prev_hash, lines[n]
+            )
+            certifications.append(certification)
+            n += 1
+
+    if Block.re_transactions.match(lines[n]):
+        n += 1
+        while not Block.re_hash.match(lines[n]):
+            tx_lines = ""
+            header_data = Transaction.re_header.match(lines[n])
+            if header_data is None:
+                raise MalformedDocumentError(
+                    "Compact transaction ({0})".format(lines[n])
+                )
+            issuers_num = int(header_data.group(2))
+            inputs_num = int(header_data.group(3))
+            unlocks_num = int(header_data.group(4))
+            outputs_num = int(header_data.group(5))
+            has_comment = int(header_data.group(6))
+            sup_lines = 2
+            tx_max = (
+                n
+                + sup_lines
+                + issuers_num * 2
+                + inputs_num
+                + unlocks_num
+                + outputs_num
+                + has_comment
+            )
+            for index in range(n, tx_max):
+                tx_lines += lines[index]
+            n += tx_max - n
+            transaction = Transaction.from_compact(currency, tx_lines)
+            transactions.append(transaction)
+
+    inner_hash = Block.parse_field("InnerHash", lines[n])
+    n += 1
+
+    nonce = int(Block.parse_field("Nonce", lines[n]))
+    n += 1
+
+    signature = Block.parse_field("Signature", lines[n])
+
+    return Block(
+        version,
+        currency,
+        number,
+        powmin,
+        time,
+        mediantime,
+        ud,
+        unit_base,
+        issuer,
+        issuers_frame,
+        issuers_frame_var,
+        different_issuers_count,
+        prev_hash,
+        prev_issuer,
+        parameters,
+        members_count,
+        identities,
+        joiners,
+        actives,
+        leavers,
+        revoked,
+        excluded,
+        certifications,
+        transactions,
+        inner_hash,
+        nonce,
+        signature,
+    )
+
+
+def main():
+    """
+    Main code
+    """
+    for name, raw in (
+        ("block zero", raw_block_zero),
+        ("block with transactions", raw_block_with_tx),
+        ("block with leavers", raw_block_with_leavers),
+    ):
+        # both parsers must return the same block
+        assert legacy_from_signed_raw(raw).signed_raw() == raw
+        assert Block.from_signed_raw(raw).signed_raw() == raw
+
+        print(name)
+        for label, function in (
+            ("legacy parser", lambda: legacy_from_signed_raw(raw)),
+            ("single pass parser", lambda: Block.from_signed_raw(raw)),
+            ("single pass lazy parser", lambda: Block.from_signed_raw(raw, lazy=True)),
+            (
+                "single pass lazy parser, header only",
+                lambda: Block.from_signed_raw(raw, lazy=True).issuer,
+            ),
+        ):
+            # keep the best run to reduce the noise of the system
+            duration = min(timeit.repeat(function, number=ITERATIONS, repeat=REPEAT))
+            print(
+                "  {0:40} {1:8.1f} µs/block".format(
+                    label, duration / ITERATIONS * 1000000
+                )
+            )
+
+    for name, json_block in (
+        ("json block zero", json_block_0),
+        ("json block with transactions", json_block_250004),
+    ):
+        parsed_json_block = json.loads(json_block)
+
+        print(name)
+        for label, function in (
+            ("json parser", lambda: Block.from_parsed_json(parsed_json_block)),
+            (
+                "json lazy parser, header only",
+                lambda: Block.from_parsed_json(parsed_json_block, lazy=True).issuer,
+            ),
+        ):
+            duration = min(timeit.repeat(function, number=ITERATIONS, repeat=REPEAT))
+            print(
+                "  {0:40} {1:8.1f} µs/block".format(
+                    label, duration / ITERATIONS * 1000000
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
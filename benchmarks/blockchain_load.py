@@ -0,0 +1,73 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Benchmark of a full scan of json chunk files with and without prefetch
+#
+# Run from the project folder:
+#
+#   poetry run python benchmarks/blockchain_load.py
+
+import json
+import pathlib
+import tempfile
+import time
+
+from duniterpy.helpers.blockchain import CHUNK_SIZE, load
+from tests.documents.test_block import json_block_250004
+
+CHUNKS = 4
+
+
+def write_chunks(folder: pathlib.Path) -> None:
+    """
+    Write CHUNKS chunk files of CHUNK_SIZE copies of a block with transactions
+
+    :param folder: Chunks folder
+    :return:
+    """
+    json_block = json.loads(json_block_250004)
+    for chunk_number in range(CHUNKS):
+        blocks = []
+        for number in range(chunk_number * CHUNK_SIZE, (chunk_number + 1) * CHUNK_SIZE):
+            blocks.append(dict(json_block, number=number))
+        with open(
+            str(folder.joinpath("chunk_%d-%d.json" % (chunk_number, CHUNK_SIZE))), "w"
+        ) as f:
+            json.dump({"blocks": blocks}, f)
+
+
+def main():
+    """
+    Main code
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = pathlib.Path(tmp)
+        write_chunks(folder)
+
+        for label, prefetch in (("sequential load", 0), ("prefetch load", 4)):
+            start = time.perf_counter()
+            count = sum(1 for _ in load(str(folder), prefetch=prefetch))
+            duration = time.perf_counter() - start
+            print(
+                "{0}: {1} blocks in {2:.2f} s ({3:.0f} blocks/s)".format(
+                    label, count, duration, count / duration
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
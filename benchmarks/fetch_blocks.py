@@ -0,0 +1,137 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Benchmark of fetch_blocks against a sequential bma.blockchain.blocks loop
+#
+# A local aiohttp server stands in for a Duniter node: each request waits
+# a fixed latency plus a delay per block, and answers 429 when too many
+# requests are in flight.
+#
+# Run from the project folder:
+#
+#   poetry run python benchmarks/fetch_blocks.py
+
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from duniterpy.api import bma
+from duniterpy.api.client import Client
+from duniterpy.helpers.sync import fetch_blocks
+from tests.documents.test_block import json_block_0
+
+BLOCKS = 5000
+# node behaviour
+LATENCY = 0.05
+BLOCK_DELAY = 0.0002
+MAX_REQUESTS = 8
+
+small_block = dict(
+    json.loads(json_block_0), identities=[], joiners=[], certifications=[]
+)
+
+
+def create_app() -> web.Application:
+    """
+    Return the stand-in node application
+
+    :return:
+    """
+    state = {"in_flight": 0, "rejected": 0}
+
+    async def blocks(request):
+        count = int(request.match_info["count"])
+        start = int(request.match_info["start"])
+        if state["in_flight"] >= MAX_REQUESTS:
+            state["rejected"] += 1
+            return web.json_response(
+                {"ucode": 1006, "message": "Too many requests"}, status=429
+            )
+        state["in_flight"] += 1
+        try:
+            await asyncio.sleep(LATENCY + BLOCK_DELAY * count)
+            numbers = range(start, min(start + count, BLOCKS))
+            return web.json_response([dict(small_block, number=n) for n in numbers])
+        finally:
+            state["in_flight"] -= 1
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_get("/blockchain/blocks/{count}/{start}", blocks)
+    return app
+
+
+async def sequential(client: Client) -> int:
+    """
+    Fetch blocks with a hand-written loop
+
+    :param client: Client instance
+    :return:
+    """
+    count = 0
+    for start in range(0, BLOCKS, 50):
+        count += len(await client(bma.blockchain.blocks, 50, start))
+    return count
+
+
+async def adaptive(client: Client) -> int:
+    """
+    Fetch blocks with fetch_blocks
+
+    :param client: Client instance
+    :return:
+    """
+    count = 0
+    async for _ in fetch_blocks(client, 0, BLOCKS, retry_delay=0.05):
+        count += 1
+    return count
+
+
+async def main():
+    """
+    Main code
+    """
+    app = create_app()
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+
+    client = Client("BASIC_MERKLED_API 127.0.0.1 {0}".format(port))
+    for label, function in (
+        ("sequential loop", sequential),
+        ("fetch_blocks", adaptive),
+    ):
+        app["state"]["rejected"] = 0
+        started = time.perf_counter()
+        count = await function(client)
+        duration = time.perf_counter() - started
+        print(
+            "{0}: {1} blocks in {2:.2f} s ({3:.0f} blocks/s, {4} requests rejected)".format(
+                label, count, duration, count / duration, app["state"]["rejected"]
+            )
+        )
+
+    await client.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,79 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Benchmark of the output condition parser and composer against pypeg2
+#
+# Run from the project folder:
+#
+#   poetry run python benchmarks/output_condition.py
+
+import timeit
+
+import pypeg2
+
+from duniterpy.grammars.output import (
+    Condition,
+    compose_condition,
+    intern_condition,
+    parse_condition,
+)
+
+# CONFIG #######################################
+
+# number of parsing of each sample condition per run
+ITERATIONS = 2000
+# number of runs
+REPEAT = 5
+
+################################################
+
+CONDITIONS = (
+    ("signature", "SIG(DNann1Lh55eZMEDXeYt59bzHbA3NJR46DeQYCS2qQdLV)"),
+    (
+        "complex condition",
+        "(CSV(1654300) || (SIG(DNann1Lh55eZMEDXeYt59bzHbA3NJR46DeQYCS2qQdLV) && CLTV(2594024)))",
+    ),
+)
+
+
+def main():
+    """
+    Main code
+    """
+    for name, text in CONDITIONS:
+        condition = pypeg2.parse(text, Condition)
+        assert parse_condition(text) == condition
+
+        print(name)
+        for label, function in (
+            ("pypeg2 parse", lambda: pypeg2.parse(text, Condition)),
+            ("parse_condition", lambda: parse_condition(text)),
+            ("intern_condition", lambda: intern_condition(text)),
+            ("pypeg2 compose", lambda: pypeg2.compose(condition, Condition)),
+            ("compose_condition", lambda: compose_condition(condition)),
+        ):
+            # keep the best run to reduce the noise of the system
+            duration = min(timeit.repeat(function, number=ITERATIONS, repeat=REPEAT))
+            print(
+                "  {0:40} {1:8.2f} µs/condition".format(
+                    label, duration / ITERATIONS * 1000000
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
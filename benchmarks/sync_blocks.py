@@ -0,0 +1,205 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Benchmark of sync_blocks over WS2P against fetch_blocks over BMA,
+# both yielding Block instances, without schema validation
+#
+# A local aiohttp server, in its own process, stands in for a Duniter node:
+# each BMA request and each WS2P getBlocks request waits a fixed latency
+# plus a delay per block.
+# Eager block conversion dominates both paths, so they are compared with lazy
+# conversion as well. A process pool only pays off with several cores,
+# as the blocks are pickled back from the workers.
+#
+# Run from the project folder:
+#
+#   poetry run python benchmarks/sync_blocks.py
+
+import asyncio
+import functools
+import json
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+from duniterpy.api.client import VALIDATE_OFF, Client
+from duniterpy.api.ws2p.client import WS2PClient
+from duniterpy.documents import Block
+from duniterpy.helpers.sync import fetch_blocks, sync_blocks
+from tests.api.webserver import find_unused_port
+from tests.documents.test_block import json_block_250004
+
+BLOCKS = 2000
+# node behaviour
+LATENCY = 0.05
+BLOCK_DELAY = 0.0002
+
+block_json = json.loads(json_block_250004)
+
+
+def chunk(start: int, count: int) -> list:
+    """
+    Return the blocks of a response
+
+    :param start: First block number
+    :param count: Blocks count
+    :return:
+    """
+    return [
+        dict(block_json, number=n) for n in range(start, min(start + count, BLOCKS))
+    ]
+
+
+def create_app() -> web.Application:
+    """
+    Return the stand-in node application
+
+    :return:
+    """
+
+    async def blocks(request):
+        count = int(request.match_info["count"])
+        start = int(request.match_info["start"])
+        await asyncio.sleep(LATENCY + BLOCK_DELAY * count)
+        return web.json_response(chunk(start, count))
+
+    async def answer(ws, data):
+        params = data["body"]["params"]
+        await asyncio.sleep(LATENCY + BLOCK_DELAY * params["count"])
+        await ws.send_json(
+            {
+                "resId": data["reqId"],
+                "body": chunk(params["fromNumber"], params["count"]),
+            }
+        )
+
+    async def ws2p(request):
+        ws = web.WebSocketResponse(max_msg_size=0, compress=False)
+        await ws.prepare(request)
+        tasks = []
+        async for message in ws:
+            tasks.append(asyncio.ensure_future(answer(ws, json.loads(message.data))))
+        await asyncio.gather(*tasks)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/blockchain/blocks/{count}/{start}", blocks)
+    app.router.add_get("/ws2p", ws2p)
+    return app
+
+
+async def bma_sync(port: int, lazy: bool = False) -> int:
+    """
+    Fetch blocks with fetch_blocks and convert them in the event loop
+
+    :param port: Node port
+    :param lazy: Build the sub-documents on first access (optional, default False)
+    :return:
+    """
+    client = Client(
+        "BASIC_MERKLED_API 127.0.0.1 {0}".format(port), validation=VALIDATE_OFF
+    )
+    count = 0
+    async for json_block in fetch_blocks(client, 0, BLOCKS):
+        Block.from_parsed_json(json_block, lazy)
+        count += 1
+    await client.close()
+    return count
+
+
+async def ws2p_sync(
+    port: int, executor: Optional[Executor] = None, lazy: bool = False
+) -> int:
+    """
+    Sync blocks with sync_blocks over one WS2P connection
+
+    :param port: Node port
+    :param executor: Executor of the conversions (optional, default in the event loop)
+    :param lazy: Build the sub-documents on first access (optional, default False)
+    :return:
+    """
+    session = aiohttp.ClientSession()
+    ws = await session.ws_connect(
+        "http://127.0.0.1:{0}/ws2p".format(port), max_msg_size=0
+    )
+    client = WS2PClient(ws, validation=VALIDATE_OFF)
+    client.start()
+    count = 0
+    async for _ in sync_blocks(
+        client, 0, BLOCKS, executor=executor, check=False, lazy=lazy
+    ):
+        count += 1
+    await client.close()
+    await session.close()
+    return count
+
+
+async def ws2p_sync_processes(port: int) -> int:
+    """
+    Sync blocks with sync_blocks, converting them in a process pool
+
+    :param port: Node port
+    :return:
+    """
+    with ProcessPoolExecutor() as executor:
+        return await ws2p_sync(port, executor)
+
+
+def serve(port: int) -> None:
+    """
+    Run the stand-in node until the process is terminated
+
+    :param port: Node port
+    :return:
+    """
+    web.run_app(create_app(), host="127.0.0.1", port=port, print=None)
+
+
+async def main():
+    """
+    Main code
+    """
+    port = find_unused_port()
+    node = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    node.start()
+    await asyncio.sleep(1)
+
+    for label, function in (
+        ("fetch_blocks over BMA", bma_sync),
+        ("sync_blocks over WS2P", ws2p_sync),
+        ("sync_blocks over WS2P, process pool", ws2p_sync_processes),
+        ("fetch_blocks over BMA, lazy", functools.partial(bma_sync, lazy=True)),
+        ("sync_blocks over WS2P, lazy", functools.partial(ws2p_sync, lazy=True)),
+    ):
+        started = time.perf_counter()
+        count = await function(port)
+        duration = time.perf_counter() - started
+        print(
+            "{0}: {1} blocks in {2:.2f} s ({3:.0f} blocks/s)".format(
+                label, count, duration, count / duration
+            )
+        )
+
+    node.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
@@ -16,6 +16,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import logging
+from typing import AsyncIterator
 
 from aiohttp import ClientResponse
 
@@ -136,6 +137,28 @@ async def history(client: Client, pubkey: str) -> dict:
     return await client.get(MODULE + "/history/%s" % pubkey, schema=HISTORY_SCHEMA)
 
 
+def history_stream(
+    client: Client, pubkey: str, section: str = "sent"
+) -> AsyncIterator[dict]:
+    """
+    Get transactions history of public key, yielding each transaction of section as soon as it is received
+
+    Usage: async for transaction in client(history_stream, pubkey, "received")
+
+    :param client: Client to connect to the api
+    :param pubkey: Public key
+    :param section: History section: sent, received, sending, receiving or pending (optional, default sent)
+    :return:
+    """
+    schema = HISTORY_SCHEMA["properties"]["history"]["properties"][section]  # type: ignore
+    definition = schema["$ref"].split("/")[-1]
+    return client.get_stream(
+        MODULE + "/history/%s" % pubkey,
+        path=("history", section),
+        schema=HISTORY_SCHEMA["definitions"][definition]["items"],  # type: ignore
+    )
+
+
 async def process(client: Client, transaction_signed_raw: str) -> ClientResponse:
     """
     POST a transaction raw document
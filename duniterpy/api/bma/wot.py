@@ -16,6 +16,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import logging
+from typing import AsyncIterator
 
 from aiohttp import ClientResponse
 
@@ -318,6 +319,22 @@ async def members(client: Client) -> dict:
     return await client.get(MODULE + "/members", schema=MEMBERS_SCHEMA)
 
 
+def members_stream(client: Client) -> AsyncIterator[dict]:
+    """
+    GET list of all current members of the Web of Trust, yielding each member as soon as it is received
+
+    Usage: async for member in client(members_stream)
+
+    :param client: Client to connect to the api
+    :return:
+    """
+    return client.get_stream(
+        MODULE + "/members",
+        path=("results",),
+        schema=MEMBERS_SCHEMA["properties"]["results"]["items"],  # type: ignore
+    )
+
+
 async def requirements(client: Client, search: str) -> dict:
     """
     GET list of requirements for a given UID/Public key
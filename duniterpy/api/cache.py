@@ -0,0 +1,226 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence, Tuple
+
+from duniterpy.api import endpoint
+
+logger = logging.getLogger("duniter/cache")
+
+# Default max count of cached responses
+DEFAULT_CACHE_SIZE = 10000
+
+# Default time to live of the mutable responses in seconds
+DEFAULT_TTL = 30.0
+
+# endpoint, path, sorted query parameters and id of the schema validating the data
+CacheKey = Tuple[str, str, tuple, Optional[int]]
+
+# Paths of the responses which never change once served, the response of a path
+# with a count group is immutable only if it holds count items: a range of blocks
+# running past the current block is truncated
+IMMUTABLE_PATHS = (
+    r"blockchain/parameters",
+    r"blockchain/block/\d+",
+    r"blockchain/blocks/(?P<count>\d+)/\d+",
+)
+
+
+class ResponseCache:
+    """
+    LRU cache of the json responses of Client.get()
+
+    Responses are keyed by endpoint, path, query parameters and by the schema
+    they were validated against, if any.
+    The responses of the immutable paths (parameters, blocks by number) are kept
+    until evicted. The other responses expire after the ttl, and as soon as
+    a new current block is known (see update_current() and follow()).
+
+    A rollback of the current block clears the whole cache, as the cached blocks
+    may have been replaced.
+
+    Cached data is shared by all the callers: it must not be modified.
+
+    Usage:
+
+        cache = ResponseCache()
+        client = Client(BMAS_ENDPOINT, cache=cache)
+        asyncio.ensure_future(cache.follow(await client(bma.ws.block)))
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        ttl: float = DEFAULT_TTL,
+        immutable_paths: Sequence[str] = IMMUTABLE_PATHS,
+    ) -> None:
+        """
+        Init ResponseCache instance
+
+        :param max_size: Max count of cached responses (optional, default 10000)
+        :param ttl: Time to live of the mutable responses in seconds (optional, default 30)
+        :param immutable_paths: Regular expressions of the immutable paths (optional, default IMMUTABLE_PATHS)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.immutable_regex = re.compile(
+            "|".join("(?:{0})".format(path) for path in immutable_paths)
+        )
+        # key => (data, expiration time or None if immutable, generation)
+        self.entries = OrderedDict()  # type: OrderedDict
+        self.hits = 0
+        self.misses = 0
+        self.block_number = None  # type: Optional[int]
+        self.block_hash = None  # type: Optional[str]
+        # incremented on each new current block, invalidates the mutable entries
+        self._generation = 0
+
+    @staticmethod
+    def key(
+        _endpoint: endpoint.Endpoint,
+        path: str,
+        params: Optional[dict] = None,
+        schema: Optional[dict] = None,
+    ) -> CacheKey:
+        """
+        Return the cache key of a request
+
+        :param _endpoint: Endpoint instance
+        :param path: Url path following the endpoint
+        :param params: Url query string parameters dictionary (optional, default None)
+        :param schema: Json Schema the data is validated against (optional, default None)
+        :return:
+        """
+        return (
+            _endpoint.inline(),
+            path.lstrip("/"),
+            tuple(sorted((params or {}).items())),
+            None if schema is None else id(schema),
+        )
+
+    def is_immutable(self, path: str, data: Any = None) -> bool:
+        """
+        Return True if the response of the path never changes
+
+        If data is given, the response of a path with a count group is immutable
+        only if data holds count items.
+
+        :param path: Url path following the endpoint
+        :param data: Json data of the response (optional, default None)
+        :return:
+        """
+        match = self.immutable_regex.fullmatch(path.lstrip("/"))
+        if match is None:
+            return False
+        count = match.groupdict().get("count")
+        if data is None or count is None:
+            return True
+        return isinstance(data, list) and len(data) == int(count)
+
+    def get(self, key: CacheKey) -> Any:
+        """
+        Return the cached data of the key or None, and count the hit or miss
+
+        :param key: Cache key
+        :return:
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            data, expiration, generation = entry
+            if expiration is None or (
+                generation == self._generation and time.monotonic() < expiration
+            ):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return data
+            del self.entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, data: Any) -> None:
+        """
+        Cache the data of the key, evict the least recently used entries if needed
+
+        :param key: Cache key returned by key()
+        :param data: Json data of the response
+        :return:
+        """
+        if data is None or self.max_size <= 0:
+            return
+
+        expiration = (
+            None if self.is_immutable(key[1], data) else time.monotonic() + self.ttl
+        )  # type: Optional[float]
+        self.entries[key] = (data, expiration, self._generation)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def update_current(self, number: int, block_hash: Optional[str] = None) -> None:
+        """
+        Invalidate the mutable entries if the current block changed
+
+        :param number: Current block number
+        :param block_hash: Current block hash (optional, default None)
+        :return:
+        """
+        if number == self.block_number and block_hash == self.block_hash:
+            return
+
+        if self.block_number is not None and number <= self.block_number:
+            logger.debug("Rollback to block %d, clear cache", number)
+            self.entries.clear()
+        self.block_number = number
+        self.block_hash = block_hash
+        self._generation += 1
+
+    async def follow(self, ws: Any) -> None:
+        """
+        Update the current block from the blocks of a bma.ws.block connection until it is closed
+
+        :param ws: WSConnection instance of bma.ws.block
+        :return:
+        """
+        while True:
+            block = await ws.receive_json()
+            self.update_current(block["number"], block.get("hash"))
+
+    def clear(self) -> None:
+        """
+        Remove all the entries
+
+        :return:
+        """
+        self.entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Return the rate of the lookups served from the cache
+
+        :return:
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self.entries)
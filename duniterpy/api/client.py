@@ -15,16 +15,42 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import asyncio
 import json
 import logging
-from typing import Callable, Union, Any, Optional, Dict
+import random
+import ssl
+import time
+import weakref
+from urllib.parse import urlencode
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Union,
+    Any,
+    Optional,
+    Dict,
+    Sequence,
+    Tuple,
+)
 
 import aiohttp
 import jsonschema
-from aiohttp import ClientResponse, ClientSession, ClientWebSocketResponse
+from aiohttp import (
+    ClientResponse,
+    ClientSession,
+    ClientTimeout,
+    ClientWebSocketResponse,
+    TCPConnector,
+)
 from aiohttp.client import _WSRequestContextManager
 import duniterpy.api.endpoint as endpoint
-from .errors import DuniterError
+from .cache import CacheKey, ResponseCache
+from .errors import DuniterError, HTTPStatusError
+from .policies import IDEMPOTENT_METHODS, RETRY_ERRORS, RateLimiter, RetryPolicy
+from .tracing import Tracer, endpoint_label, path_label
+from .stream import STREAM_CHUNK_SIZE, iter_items
 
 logger = logging.getLogger("duniter")
 
@@ -36,6 +62,17 @@ RESPONSE_AIOHTTP = "aiohttp"
 # Connection type constants
 CONNECTION_TYPE_AIOHTTP = 1
 
+# Response validation mode constants
+VALIDATE_OFF = "off"
+VALIDATE_SAMPLED = "sampled"
+VALIDATE_FULL = "full"
+
+# Default timeout of the http requests
+DEFAULT_TIMEOUT = ClientTimeout(total=15)
+
+# Max number of compiled validators kept in the registry
+VALIDATORS_MAX_SIZE = 1024
+
 # jsonschema validator
 ERROR_SCHEMA = {
     "type": "object",
@@ -43,6 +80,50 @@ ERROR_SCHEMA = {
     "required": ["ucode", "message"],
 }
 
+# compiled validators registry: id(schema) => (schema, validator)
+_validators = {}  # type: Dict[int, Tuple[dict, Any]]
+
+
+def get_validator(schema: dict) -> Any:
+    """
+    Return the compiled jsonschema validator of the schema
+
+    The schema is checked and compiled on first use only, then the validator
+    (with its resolved $ref definitions) is reused for each response.
+
+    :param schema: dict for jsonschema
+    :return: the jsonschema validator instance
+    """
+    entry = _validators.get(id(schema))
+    # the schema is kept in the entry, so its id can not be reused by another dict
+    if entry is not None and entry[0] is schema:
+        return entry[1]
+
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    validator = validator_class(schema)
+
+    if len(_validators) >= VALIDATORS_MAX_SIZE:
+        _validators.clear()
+    _validators[id(schema)] = (schema, validator)
+
+    return validator
+
+
+def validate(data: Any, schema: dict) -> None:
+    """
+    Validate data against the schema with the compiled validator
+
+    Raise the same error as jsonschema.validate() if data is not valid
+
+    :param data: the json data
+    :param schema: dict for jsonschema
+    :return:
+    """
+    error = jsonschema.exceptions.best_match(get_validator(schema).iter_errors(data))
+    if error is not None:
+        raise error
+
 
 def parse_text(text: str, schema: dict) -> Any:
     """
@@ -54,7 +135,7 @@ def parse_text(text: str, schema: dict) -> Any:
     """
     try:
         data = json.loads(text)
-        jsonschema.validate(data, schema)
+        validate(data, schema)
     except (TypeError, json.decoder.JSONDecodeError) as e:
         raise jsonschema.ValidationError("Could not parse json") from e
 
@@ -70,7 +151,7 @@ def parse_error(text: str) -> dict:
     """
     try:
         data = json.loads(text)
-        jsonschema.validate(data, ERROR_SCHEMA)
+        validate(data, ERROR_SCHEMA)
     except (TypeError, json.decoder.JSONDecodeError) as e:
         raise jsonschema.ValidationError(
             "Could not parse json : {0}".format(str(e))
@@ -79,6 +160,16 @@ def parse_error(text: str) -> dict:
     return data
 
 
+def is_mutation(query: str) -> bool:
+    """
+    Return True if the GraphQL query string is a mutation
+
+    :param query: GraphQL query string
+    :return:
+    """
+    return query.lstrip().startswith("mutation")
+
+
 async def parse_response(response: ClientResponse, schema: dict) -> Any:
     """
     Validate and parse the BMA answer
@@ -91,7 +182,7 @@ async def parse_response(response: ClientResponse, schema: dict) -> Any:
         data = await response.json()
         response.close()
         if schema is not None:
-            jsonschema.validate(data, schema)
+            validate(data, schema)
         return data
     except (TypeError, json.decoder.JSONDecodeError) as e:
         raise jsonschema.ValidationError(
@@ -99,6 +190,133 @@ async def parse_response(response: ClientResponse, schema: dict) -> Any:
         ) from e
 
 
+class SessionPool:
+    """
+    Pool of aiohttp sessions shared by Client instances
+
+    One session (and its connection pool) is kept per endpoint host and per event loop,
+    so that all the clients talking to the same node reuse the same keep-alive connections.
+    """
+
+    def __init__(
+        self,
+        limit_per_host: int = 10,
+        ttl_dns_cache: Optional[int] = 300,
+        keepalive_timeout: float = 60.0,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> None:
+        """
+        Init SessionPool instance
+
+        :param limit_per_host: Max simultaneous connections to one endpoint host (optional, default 10)
+        :param ttl_dns_cache: DNS cache time to live in seconds, None to cache forever (optional, default 300)
+        :param keepalive_timeout: Idle keep-alive connection timeout in seconds (optional, default 60)
+        :param ssl_context: SSL context shared by all secured connections (optional, default system context)
+        """
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.ssl_context = (
+            ssl.create_default_context() if ssl_context is None else ssl_context
+        )
+        # sessions are bound to an event loop, so they are stored by loop
+        self._sessions = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+        # count of the users of each session, by loop
+        self._users = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+    @staticmethod
+    def key(_endpoint: endpoint.Endpoint) -> Tuple[str, str, int]:
+        """
+        Return the pool key of the endpoint: (http scheme, server, port)
+
+        :param _endpoint: Endpoint instance
+        :return:
+        """
+        conn_handler = _endpoint.conn_handler(None)  # type: ignore
+        return conn_handler.http_scheme, conn_handler.server, conn_handler.port
+
+    def get_session(self, _endpoint: endpoint.Endpoint) -> ClientSession:
+        """
+        Return the shared session of the endpoint host, create it if needed
+
+        The session stays open until release() is called by each of its users,
+        or until the pool is closed.
+
+        :param _endpoint: Endpoint instance
+        :return:
+        """
+        loop = asyncio.get_event_loop()
+        sessions = self._sessions.setdefault(loop, {})
+        users = self._users.setdefault(loop, {})
+        key = self.key(_endpoint)
+
+        session = sessions.get(key)
+        if session is None or session.closed:
+            users[key] = 0
+            connector = TCPConnector(
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=self.ssl_context,
+            )
+            session = ClientSession(connector=connector)
+            sessions[key] = session
+        users[key] += 1
+
+        return session
+
+    async def release(self, _endpoint: endpoint.Endpoint) -> None:
+        """
+        Release the session of the endpoint host, close it if it has no more users
+
+        :param _endpoint: Endpoint instance
+        :return:
+        """
+        loop = asyncio.get_event_loop()
+        users = self._users.get(loop, {})
+        key = self.key(_endpoint)
+        if key not in users:
+            return
+        users[key] -= 1
+        if users[key] == 0:
+            del users[key]
+            session = self._sessions.get(loop, {}).pop(key, None)
+            if session is not None:
+                await session.close()
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for sessions in self._sessions.values())
+
+    async def close(self) -> None:
+        """
+        Close all the sessions of the current event loop
+
+        :return:
+        """
+        loop = asyncio.get_event_loop()
+        self._users.pop(loop, None)
+        sessions = self._sessions.pop(loop, {})
+        for session in sessions.values():
+            await session.close()
+
+
+# process wide default session pool
+_session_pool = None  # type: Optional[SessionPool]
+
+
+def get_session_pool() -> SessionPool:
+    """
+    Return the process wide default SessionPool instance
+
+    :return:
+    """
+    global _session_pool  # pylint: disable=global-statement
+    if _session_pool is None:
+        _session_pool = SessionPool()
+    return _session_pool
+
+
 class WSConnection:
     """
     From the documentation of the aiohttp_library, the web socket connection
@@ -118,11 +336,20 @@ class WSConnection:
           await ws.receive_str()
     """
 
-    def __init__(self, connection: _WSRequestContextManager) -> None:
+    def __init__(
+        self,
+        connection: _WSRequestContextManager,
+        tracer: Optional[Tracer] = None,
+        endpoint_label_: str = "",
+        path_label_: str = "",
+    ) -> None:
         """
         Init WSConnection instance
 
         :param connection: Connection instance of the connection library
+        :param tracer: Tracer instance receiving the messages events (optional, default None)
+        :param endpoint_label_: Endpoint label of the events (optional, default "")
+        :param path_label_: Path label of the events (optional, default "")
         """
         if not isinstance(connection, _WSRequestContextManager):
             raise Exception(
@@ -134,6 +361,9 @@ class WSConnection:
         self.connection_type = CONNECTION_TYPE_AIOHTTP
         self._connection = connection  # type: _WSRequestContextManager
         self.connection = None  # type: Optional[ClientWebSocketResponse]
+        self.tracer = tracer
+        self.endpoint_label = endpoint_label_
+        self.path_label = path_label_
 
     async def send_str(self, data: str) -> None:
         """
@@ -146,6 +376,10 @@ class WSConnection:
             raise Exception("Connection property is empty")
 
         await self.connection.send_str(data)
+        if self.tracer is not None:
+            self.tracer.ws_message(
+                self.endpoint_label, self.path_label, "out", len(data)
+            )
         return None
 
     async def receive_str(self, timeout: Optional[float] = None) -> str:
@@ -158,7 +392,29 @@ class WSConnection:
         if self.connection is None:
             raise Exception("Connection property is empty")
 
-        return await self.connection.receive_str(timeout=timeout)
+        data = await self.connection.receive_str(timeout=timeout)
+        if self.tracer is not None:
+            self.tracer.ws_message(
+                self.endpoint_label, self.path_label, "in", len(data)
+            )
+        return data
+
+    async def receive(self, timeout: Optional[float] = None) -> aiohttp.WSMessage:
+        """
+        Wait for a message of any type from the web socket connection
+
+        :param timeout: Timeout in seconds
+        :return:
+        """
+        if self.connection is None:
+            raise Exception("Connection property is empty")
+
+        message = await self.connection.receive(timeout=timeout)
+        if self.tracer is not None and message.type == aiohttp.WSMsgType.TEXT:
+            self.tracer.ws_message(
+                self.endpoint_label, self.path_label, "in", len(message.data)
+            )
+        return message
 
     async def receive_json(self, timeout: Optional[float] = None) -> Any:
         """
@@ -170,6 +426,9 @@ class WSConnection:
         if self.connection is None:
             raise Exception("Connection property is empty")
 
+        if self.tracer is not None:
+            return json.loads(await self.receive_str(timeout=timeout))
+
         return await self.connection.receive_json(timeout=timeout)
 
     async def init_connection(self):
@@ -202,15 +461,27 @@ class API:
         self,
         connection_handler: endpoint.ConnectionHandler,
         headers: Optional[dict] = None,
+        timeout: Optional[ClientTimeout] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        tracer: Optional[Tracer] = None,
     ) -> None:
         """
         Asks a module in order to create the url used then by derivated classes.
 
         :param connection_handler: Connection handler
         :param headers: Headers dictionary (optional, default None)
+        :param timeout: Timeouts of the requests (optional, default DEFAULT_TIMEOUT)
+        :param retry_policy: RetryPolicy instance of the idempotent requests (optional, default no retry)
+        :param rate_limiter: RateLimiter instance of the requests (optional, default None)
+        :param tracer: Tracer instance receiving the requests events (optional, default None)
         """
         self.connection_handler = connection_handler
         self.headers = {} if headers is None else headers
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.tracer = tracer
 
     def reverse_url(self, scheme: str, path: str) -> str:
         """
@@ -252,22 +523,13 @@ class API:
             "Request : %s", self.reverse_url(self.connection_handler.http_scheme, path)
         )
         url = self.reverse_url(self.connection_handler.http_scheme, path)
-        response = await self.connection_handler.session.get(
-            url,
-            params=kwargs,
-            headers=self.headers,
-            proxy=self.connection_handler.proxy,
-            timeout=15,
-        )
+        response = await self.send("GET", url, path, params=kwargs)
         if response.status != 200:
             try:
                 error_data = parse_error(await response.text())
                 raise DuniterError(error_data)
             except (TypeError, jsonschema.ValidationError) as e:
-                raise ValueError(
-                    "status code != 200 => %d (%s)"
-                    % (response.status, (await response.text()))
-                ) from e
+                raise HTTPStatusError(response.status, await response.text()) from e
 
         return response
 
@@ -282,12 +544,11 @@ class API:
             kwargs["self"] = kwargs.pop("self_")
 
         logging.debug("POST : %s", kwargs)
-        response = await self.connection_handler.session.post(
+        response = await self.send(
+            "POST",
             self.reverse_url(self.connection_handler.http_scheme, path),
+            path,
             data=kwargs,
-            headers=self.headers,
-            proxy=self.connection_handler.proxy,
-            timeout=15,
         )
 
         if response.status != 200:
@@ -295,10 +556,7 @@ class API:
                 error_data = parse_error(await response.text())
                 raise DuniterError(error_data)
             except (TypeError, jsonschema.ValidationError) as e:
-                raise ValueError(
-                    "status code != 200 => %d (%s)"
-                    % (response.status, (await response.text()))
-                ) from e
+                raise HTTPStatusError(response.status, await response.text()) from e
 
         return response
 
@@ -308,6 +566,7 @@ class API:
         path: str = "",
         data: Optional[dict] = None,
         _json: Optional[dict] = None,
+        idempotent: Optional[bool] = None,
     ) -> ClientResponse:
         """
         Generic requests wrapper on aiohttp
@@ -316,30 +575,142 @@ class API:
         :param path: the path added to endpoint
         :param data: data for form POST request
         :param _json: json for json POST request
+        :param idempotent: True if the request can be retried (optional, default True for IDEMPOTENT_METHODS)
         :rtype: aiohttp.ClientResponse
         """
         url = self.reverse_url(self.connection_handler.http_scheme, path)
+        headers = self.headers
 
         if data is not None:
             logging.debug("%s : %s, data=%s", method, url, data)
         elif _json is not None:
             logging.debug("%s : %s, json=%s", method, url, _json)
-            # http header to send json body
-            self.headers["Content-Type"] = "application/json"
+            # http header to send json body, the API instance headers are shared
+            headers = dict(self.headers, **{"Content-Type": "application/json"})
         else:
             logging.debug("%s : %s", method, url)
 
-        response = await self.connection_handler.session.request(
+        response = await self.send(
             method,
             url,
+            path,
+            idempotent,
             data=data,
             json=_json,
-            headers=self.headers,
-            proxy=self.connection_handler.proxy,
-            timeout=15,
+            headers=headers,
         )
         return response
 
+    async def send(
+        self,
+        method: str,
+        url: str,
+        path: str = "",
+        idempotent: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> ClientResponse:
+        """
+        Send a request with the rate limiter, and retry the idempotent ones with the retry policy
+
+        The idempotent requests are retried after a connection error, a timeout,
+        or a response status of the retry policy. Others are sent once.
+        GraphQL queries are sent with POST but are idempotent, unlike mutations.
+
+        :param method: the request http method
+        :param url: the request url
+        :param path: the path added to endpoint, for the tracer (optional, default "")
+        :param idempotent: True if the request can be retried (optional, default True for IDEMPOTENT_METHODS)
+        :param kwargs: Other arguments of aiohttp.ClientSession.request()
+        :rtype: aiohttp.ClientResponse
+        """
+        kwargs.setdefault("headers", self.headers)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_policy = self.retry_policy if idempotent else None
+
+        retry = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(self.connection_handler)
+            try:
+                if self.tracer is None:
+                    response = await self.connection_handler.session.request(
+                        method,
+                        url,
+                        proxy=self.connection_handler.proxy,
+                        timeout=self.timeout,
+                        **kwargs,
+                    )
+                else:
+                    response = await self._traced_request(method, url, path, **kwargs)
+            except RETRY_ERRORS as exception:
+                if retry_policy is None or retry >= retry_policy.max_retries:
+                    raise
+                delay = retry_policy.delay(retry)
+                logging.debug("Retry %s in %.2f s after %r", url, delay, exception)
+            else:
+                if (
+                    retry_policy is None
+                    or response.status not in retry_policy.statuses
+                    or retry >= retry_policy.max_retries
+                ):
+                    return response
+                delay = retry_policy.delay(retry, response.headers.get("Retry-After"))
+                if response.status == 429 and self.rate_limiter is not None:
+                    # hold all the requests to the node
+                    self.rate_limiter.pause(self.connection_handler, delay)
+                response.release()
+                logging.debug(
+                    "Retry %s in %.2f s after status %d", url, delay, response.status
+                )
+
+            retry += 1
+            await asyncio.sleep(delay)
+
+    async def _traced_request(
+        self, method: str, url: str, path: str, **kwargs: Any
+    ) -> ClientResponse:
+        """
+        Send one request and report it to the tracer
+
+        :param method: the request http method
+        :param url: the request url
+        :param path: the path added to endpoint
+        :param kwargs: Other arguments of aiohttp.ClientSession.request()
+        :rtype: aiohttp.ClientResponse
+        """
+        tracer = self.tracer  # type: Any
+        _endpoint_label = endpoint_label(self.connection_handler)
+        _path_label = path_label(path)
+        sent_bytes = 0
+        if kwargs.get("json") is not None:
+            sent_bytes = len(json.dumps(kwargs["json"]))
+        elif kwargs.get("data"):
+            sent_bytes = len(urlencode(kwargs["data"]))
+
+        tracer.request_start(method, _endpoint_label, _path_label)
+        started = time.perf_counter()
+        status = None
+        try:
+            response = await self.connection_handler.session.request(
+                method,
+                url,
+                proxy=self.connection_handler.proxy,
+                timeout=self.timeout,
+                **kwargs,
+            )
+            status = response.status
+        finally:
+            tracer.request_end(
+                method,
+                _endpoint_label,
+                _path_label,
+                status,
+                time.perf_counter() - started,
+                sent_bytes,
+            )
+        return response
+
     async def connect_ws(self, path: str) -> WSConnection:
         """
         Connect to a websocket in order to use API parameters
@@ -357,7 +728,10 @@ class API:
         connection = WSConnection(
             self.connection_handler.session.ws_connect(
                 url, proxy=self.connection_handler.proxy, autoclose=False
-            )
+            ),
+            self.tracer,
+            endpoint_label(self.connection_handler),
+            path_label(path),
         )
 
         # init aiohttp connection
@@ -376,13 +750,43 @@ class Client:
         _endpoint: Union[str, endpoint.Endpoint],
         session: Optional[ClientSession] = None,
         proxy: Optional[str] = None,
+        session_pool: Optional[SessionPool] = None,
+        validation: str = VALIDATE_FULL,
+        validation_sample_rate: float = 0.1,
+        cache: Optional[ResponseCache] = None,
+        coalesce: bool = False,
+        timeout: Optional[ClientTimeout] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        tracer: Optional[Tracer] = None,
     ) -> None:
         """
         Init Client instance
 
+        Without session, the session of the endpoint host is borrowed from a session pool,
+        so the clients of the same node share their keep-alive connections.
+        Without session pool, the process wide pool of get_session_pool() is used.
+        A borrowed session is released by Client.close(), and closed by the pool
+        when its last client releases it.
+
+        The validation mode of the responses against their schema can be VALIDATE_FULL (every response),
+        VALIDATE_SAMPLED (a random part of the responses, see validation_sample_rate) or VALIDATE_OFF.
+
+        With coalesce, concurrent identical calls share the request and its parsed result,
+        which must then not be modified by the callers.
+
         :param _endpoint: Endpoint string in duniter format
         :param session: Aiohttp client session (optional, default None)
         :param proxy: Proxy server as hostname:port (optional, default None)
+        :param session_pool: SessionPool instance to borrow the session from (optional, default get_session_pool())
+        :param validation: Response validation mode (optional, default VALIDATE_FULL)
+        :param validation_sample_rate: Rate of validated responses in VALIDATE_SAMPLED mode (optional, default 0.1)
+        :param cache: ResponseCache instance of the json GET responses (optional, default None)
+        :param coalesce: Share one in-flight request between identical GET and GraphQL query calls (optional, default False)
+        :param timeout: Default timeouts of the requests (optional, default DEFAULT_TIMEOUT)
+        :param retry_policy: RetryPolicy instance of the idempotent requests (optional, default no retry)
+        :param rate_limiter: RateLimiter instance, can be shared by several clients (optional, default None)
+        :param tracer: Tracer instance receiving the requests and web socket events (optional, default None)
         """
         if isinstance(_endpoint, str):
             # Endpoint Protocol detection
@@ -395,13 +799,115 @@ class Client:
                 "{0} endpoint in not supported".format(self.endpoint.api)
             )
 
+        if validation not in (VALIDATE_OFF, VALIDATE_SAMPLED, VALIDATE_FULL):
+            raise ValueError("Unknown validation mode {0}".format(validation))
+
+        self.session_pool = session_pool
+        # True until the session borrowed from the pool is released by close()
+        self._release_session = False
         # if no user session...
         if session is None:
-            # open a session
-            self.session = ClientSession()
+            if session_pool is None:
+                # share the session of the endpoint host with the other clients
+                session_pool = self.session_pool = get_session_pool()
+            # borrow the shared session of the endpoint host
+            self.session = session_pool.get_session(self.endpoint)
+            self._release_session = True
         else:
             self.session = session
+            self.session_pool = None
         self.proxy = proxy
+        self.validation = validation
+        self.validation_sample_rate = validation_sample_rate
+        self.cache = cache
+        self.coalesce = coalesce
+        # in-flight request tasks by request key
+        self._in_flight = {}  # type: Dict[Tuple[Any, ...], asyncio.Future]
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.tracer = tracer
+        # API instance of the requests with the client timeout
+        self._api = None  # type: Optional[API]
+
+    def api(self, timeout: Optional[ClientTimeout] = None) -> API:
+        """
+        Return an API instance of the endpoint with the client settings
+
+        The same instance is returned for the client timeout.
+
+        :param timeout: Timeouts of the requests (optional, default client timeout)
+        :return:
+        """
+        if timeout is not None and timeout != self.timeout:
+            return API(
+                self.endpoint.conn_handler(self.session, self.proxy),
+                timeout=timeout,
+                retry_policy=self.retry_policy,
+                rate_limiter=self.rate_limiter,
+                tracer=self.tracer,
+            )
+
+        if self._api is None:
+            self._api = API(self.endpoint.conn_handler(self.session, self.proxy))
+        # the client settings can be changed after init
+        self._api.timeout = self.timeout
+        self._api.retry_policy = self.retry_policy
+        self._api.rate_limiter = self.rate_limiter
+        self._api.tracer = self.tracer
+        return self._api
+
+    async def _parse_response(
+        self, response: ClientResponse, path: str, schema: Optional[dict] = None
+    ) -> Any:
+        """
+        Decode the json response, validate it if a schema is given, and report the durations to the tracer
+
+        :param response: Response of aiohttp request
+        :param path: Path of the request
+        :param schema: The expected response structure (optional, default no validation)
+        :return: the json data
+        """
+        if self.tracer is None:
+            if schema is None:
+                return await response.json()
+            return await parse_response(response, schema)
+
+        labels = (endpoint_label(self.api().connection_handler), path_label(path))
+        body = await response.read()
+        started = time.perf_counter()
+        if schema is None:
+            data = await response.json()
+        else:
+            try:
+                data = await response.json()
+                response.close()
+            except (TypeError, json.decoder.JSONDecodeError) as e:
+                raise jsonschema.ValidationError(
+                    "Could not parse json : {0}".format(str(e))
+                ) from e
+        self.tracer.response_read(*labels, len(body), time.perf_counter() - started)
+
+        if schema is not None:
+            started = time.perf_counter()
+            try:
+                validate(data, schema)
+            finally:
+                self.tracer.validation(*labels, time.perf_counter() - started)
+        return data
+
+    def must_validate(self, schema: Optional[dict]) -> bool:
+        """
+        Return True if the response must be validated against the schema in the current validation mode
+
+        :param schema: Json Schema of the response or None
+        :return:
+        """
+        if schema is None or self.validation == VALIDATE_OFF:
+            return False
+        if self.validation == VALIDATE_SAMPLED:
+            return random.random() < self.validation_sample_rate
+        return True
 
     async def get(
         self,
@@ -409,44 +915,188 @@ class Client:
         params: Optional[dict] = None,
         rtype: str = RESPONSE_JSON,
         schema: Optional[dict] = None,
+        timeout: Optional[ClientTimeout] = None,
     ) -> Any:
         """
         GET request on endpoint host + url_path
 
+        With a cache, json responses are served from it when possible. A response
+        is only cached once validated against the schema, or without schema if the
+        validation is off, so the cached responses need no new validation.
+
+        Cached data is shared by all the callers of the cache and is returned
+        as is, not copied: it must be treated as read-only.
+
         :param url_path: Url encoded path following the endpoint
         :param params: Url query string parameters dictionary (optional, default None)
         :param rtype: Response type (optional, default RESPONSE_JSON)
         :param schema: Json Schema to validate response (optional, default None)
+        :param timeout: Timeouts of the request (optional, default client timeout)
         :return:
         """
         if params is None:
             params = dict()
 
-        client = API(self.endpoint.conn_handler(self.session, self.proxy))
+        cache_key = None
+        if self.cache is not None and rtype == RESPONSE_JSON:
+            # without validation, the responses validated or not are equivalent
+            cache_key = self.cache.key(
+                self.endpoint,
+                url_path,
+                params,
+                None if self.validation == VALIDATE_OFF else schema,
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if self.coalesce and rtype != RESPONSE_AIOHTTP:
+            key = (
+                "GET",
+                url_path,
+                tuple(sorted(params.items())),
+                rtype,
+                id(schema),
+            )  # type: Tuple[Any, ...]
+            return await self._single_flight(
+                key,
+                lambda: self._get(url_path, params, rtype, schema, cache_key, timeout),
+            )
+
+        return await self._get(url_path, params, rtype, schema, cache_key, timeout)
+
+    async def _get(
+        self,
+        url_path: str,
+        params: dict,
+        rtype: str,
+        schema: Optional[dict],
+        cache_key: Optional[CacheKey],
+        timeout: Optional[ClientTimeout] = None,
+    ) -> Any:
+        """
+        Send the GET request of get() and cache the validated json response
+
+        :param url_path: Url encoded path following the endpoint
+        :param params: Url query string parameters dictionary
+        :param rtype: Response type
+        :param schema: Json Schema to validate response or None
+        :param cache_key: Cache key of the response or None
+        :param timeout: Timeouts of the request or None for the client timeout
+        :return:
+        """
+        client = self.api(timeout)
 
         # get aiohttp response
         response = await client.requests_get(url_path, **params)
 
-        # if schema supplied...
-        if schema is not None:
+        data = None  # type: Any
+        # if schema supplied and validation required...
+        if schema is not None and self.must_validate(schema):
             # validate response
-            await parse_response(response, schema)
+            data = await self._parse_response(response, url_path, schema)
 
         # return the chosen type
         result = response  # type: Any
         if rtype == RESPONSE_TEXT:
             result = await response.text()
         elif rtype == RESPONSE_JSON:
-            result = await response.json()
+            # do not decode the json data twice
+            result = (
+                await self._parse_response(response, url_path) if data is None else data
+            )
+            # a response skipped by the sampled validation is not cached
+            validated = (
+                schema is None or self.validation == VALIDATE_OFF or data is not None
+            )
+            if self.cache is not None and cache_key is not None and validated:
+                self.cache.put(cache_key, result)
 
         return result
 
+    async def _single_flight(
+        self, key: Tuple[Any, ...], request: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the result of the in-flight request with the same key, or send the request
+
+        The request runs in its own task, so it is not cancelled
+        if one of the waiting callers is cancelled.
+
+        :param key: Key of identical requests
+        :param request: Function returning the request coroutine
+        :return:
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(request())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._end_flight(key, done))
+
+        return await asyncio.shield(future)
+
+    def _end_flight(self, key: Tuple[Any, ...], future: asyncio.Future) -> None:
+        """
+        Forget a finished in-flight request
+
+        :param key: Key of identical requests
+        :param future: Finished request task
+        :return:
+        """
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # the error is raised to the callers, avoid the "never retrieved" warning
+        # if all of them were cancelled
+        if not future.cancelled():
+            future.exception()
+
+    async def get_stream(
+        self,
+        url_path: str,
+        path: Sequence[str] = (),
+        params: Optional[dict] = None,
+        schema: Optional[dict] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        timeout: Optional[ClientTimeout] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        GET request on endpoint host + url_path and yield the items of a json array of the response
+
+        The response is parsed as it arrives, so memory usage is bounded by the size of one item,
+        whatever the size of the response.
+
+        :param url_path: Url encoded path following the endpoint
+        :param path: Object keys leading to the array in the response (optional, default top level array)
+        :param params: Url query string parameters dictionary (optional, default None)
+        :param schema: Json Schema to validate each item (optional, default None)
+        :param chunk_size: Size of the chunks read from the response (optional, default 65536)
+        :param timeout: Timeouts of the request (optional, default client timeout)
+        :return:
+        """
+        if params is None:
+            params = dict()
+
+        client = self.api(timeout)
+
+        # get aiohttp response
+        response = await client.requests_get(url_path, **params)
+
+        try:
+            async for item in iter_items(response.content, path, chunk_size):
+                # if schema supplied and validation required...
+                if schema is not None and self.must_validate(schema):
+                    validate(item, schema)
+                yield item
+        finally:
+            response.release()
+
     async def post(
         self,
         url_path: str,
         params: Optional[dict] = None,
         rtype: str = RESPONSE_JSON,
         schema: Optional[dict] = None,
+        timeout: Optional[ClientTimeout] = None,
     ) -> Any:
         """
         POST request on endpoint host + url_path
@@ -455,27 +1105,32 @@ class Client:
         :param params: Url query string parameters dictionary (optional, default None)
         :param rtype: Response type (optional, default RESPONSE_JSON)
         :param schema: Json Schema to validate response (optional, default None)
+        :param timeout: Timeouts of the request (optional, default client timeout)
         :return:
         """
         if params is None:
             params = dict()
 
-        client = API(self.endpoint.conn_handler(self.session, self.proxy))
+        client = self.api(timeout)
 
         # get aiohttp response
         response = await client.requests_post(url_path, **params)
 
-        # if schema supplied...
-        if schema is not None:
+        data = None  # type: Any
+        # if schema supplied and validation required...
+        if schema is not None and self.must_validate(schema):
             # validate response
-            await parse_response(response, schema)
+            data = await self._parse_response(response, url_path, schema)
 
         # return the chosen type
         result = response  # type: Any
         if rtype == RESPONSE_TEXT:
             result = await response.text()
         elif rtype == RESPONSE_JSON:
-            result = await response.json()
+            # do not decode the json data twice
+            result = (
+                await self._parse_response(response, url_path) if data is None else data
+            )
 
         return result
 
@@ -485,6 +1140,7 @@ class Client:
         variables: Optional[dict] = None,
         rtype: str = RESPONSE_JSON,
         schema: Optional[dict] = None,
+        timeout: Optional[ClientTimeout] = None,
     ) -> Any:
         """
         GraphQL query or mutation request on endpoint
@@ -493,6 +1149,40 @@ class Client:
         :param variables: Variables for the query (optional, default None)
         :param rtype: Response type (optional, default RESPONSE_JSON)
         :param schema: Json Schema to validate response (optional, default None)
+        :param timeout: Timeouts of the request (optional, default client timeout)
+        :return:
+        """
+        # mutations are never shared
+        if self.coalesce and rtype != RESPONSE_AIOHTTP and not is_mutation(query):
+            key = (
+                "QUERY",
+                query,
+                json.dumps(variables, sort_keys=True),
+                rtype,
+                id(schema),
+            )
+            return await self._single_flight(
+                key, lambda: self._query(query, variables, rtype, schema, timeout)
+            )
+
+        return await self._query(query, variables, rtype, schema, timeout)
+
+    async def _query(
+        self,
+        query: str,
+        variables: Optional[dict],
+        rtype: str,
+        schema: Optional[dict],
+        timeout: Optional[ClientTimeout] = None,
+    ) -> Any:
+        """
+        Send the GraphQL request of query()
+
+        :param query: GraphQL query string
+        :param variables: Variables for the query or None
+        :param rtype: Response type
+        :param schema: Json Schema to validate response or None
+        :param timeout: Timeouts of the request or None for the client timeout
         :return:
         """
         payload = {"query": query}  # type: Dict[str, Union[str, dict]]
@@ -500,15 +1190,18 @@ class Client:
         if variables is not None:
             payload["variables"] = variables
 
-        client = API(self.endpoint.conn_handler(self.session, self.proxy))
+        client = self.api(timeout)
 
         # get aiohttp response
-        response = await client.requests("POST", _json=payload)
+        response = await client.requests(
+            "POST", _json=payload, idempotent=not is_mutation(query)
+        )
 
-        # if schema supplied...
-        if schema is not None:
+        data = None  # type: Any
+        # if schema supplied and validation required...
+        if schema is not None and self.must_validate(schema):
             # validate response
-            await parse_response(response, schema)
+            data = await self._parse_response(response, "", schema)
 
         # return the chosen type
         result = response  # type: Any
@@ -516,7 +1209,9 @@ class Client:
             result = await response.text()
         elif rtype == RESPONSE_JSON:
             try:
-                result = await response.json()
+                result = (
+                    await self._parse_response(response, "") if data is None else data
+                )
             except aiohttp.client_exceptions.ContentTypeError as exception:
                 logging.error("Response is not a json format: %s", exception)
                 # return response to debug...
@@ -529,16 +1224,22 @@ class Client:
         :param path: the url path
         :return:
         """
-        client = API(self.endpoint.conn_handler(self.session, self.proxy))
+        client = self.api()
         return await client.connect_ws(path)
 
     async def close(self):
         """
         Close aiohttp session
 
+        A session borrowed from a SessionPool is released, it stays open for its other clients.
+
         :return:
         """
-        await self.session.close()
+        if self.session_pool is None:
+            await self.session.close()
+        elif self._release_session:
+            self._release_session = False
+            await self.session_pool.release(self.endpoint)
 
     def __call__(self, _function: Callable, *args: Any, **kwargs: Any) -> Any:
         """
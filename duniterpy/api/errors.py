@@ -32,6 +32,22 @@ class DuniterError(Exception):
         self.message = data["message"]
 
 
+class HTTPStatusError(ValueError):
+    """
+    Handle http error response without duniter error data
+    """
+
+    def __init__(self, status: int, text: str) -> None:
+        """
+        Init instance from the response
+
+        :param status: Http status code of the response
+        :param text: Body of the response
+        """
+        super().__init__("status code != 200 => %d (%s)" % (status, text))
+        self.status = status
+
+
 UNKNOWN = 1001
 UNHANDLED = 1002
 SIGNATURE_DOES_NOT_MATCH = 1003
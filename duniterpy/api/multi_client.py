@@ -0,0 +1,514 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import jsonschema
+from aiohttp import ClientError
+
+from duniterpy.api import endpoint
+
+from .client import (
+    RESPONSE_JSON,
+    VALIDATE_FULL,
+    Client,
+    SessionPool,
+    WSConnection,
+    get_session_pool,
+    is_mutation,
+)
+from .errors import DuniterError
+from .stream import STREAM_CHUNK_SIZE
+from .tracing import Tracer
+
+logger = logging.getLogger("duniter/multi_client")
+
+# Default timeout of one attempt in seconds
+DEFAULT_TIMEOUT = 15.0
+# Default count of nodes tried by a request
+DEFAULT_MAX_ATTEMPTS = 3
+# weight of the last observation in the latency and error rate moving averages
+SMOOTHING = 0.3
+# latency in seconds assumed for the nodes without response yet,
+# before any node has answered
+DEFAULT_LATENCY = 1.0
+# response durations kept by node to compute the hedging delay
+DURATIONS_WINDOW = 100
+# hedging delay in seconds before enough durations are known
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+# consecutive failures opening the circuit of a node
+FAILURE_THRESHOLD = 5
+# delay in seconds before a request is tried again on an open circuit node
+RESET_TIMEOUT = 30.0
+
+# errors of a node which trigger a failover to the next one
+FAILOVER_ERRORS = (
+    ClientError,
+    OSError,
+    ValueError,
+    asyncio.TimeoutError,
+    jsonschema.ValidationError,
+)
+
+
+class NodeState:
+    """
+    Node of a MultiClient, with its health statistics and circuit breaker
+    """
+
+    def __init__(self, client: Client) -> None:
+        """
+        Init NodeState instance
+
+        :param client: Client instance of the node
+        """
+        self.client = client
+        self.in_flight = 0
+        # moving average of the responses durations in seconds, None before the first response
+        self.latency = None  # type: Optional[float]
+        # moving average of the failures, from 0 to 1
+        self.error_rate = 0.0
+        self.durations = deque(maxlen=DURATIONS_WINDOW)  # type: Deque[float]
+        # consecutive failures
+        self.failures = 0
+        # time of the circuit opening, None if closed
+        self.opened_at = None  # type: Optional[float]
+        # True while a request probes the node with a half open circuit
+        self.probing = False
+
+    @property
+    def endpoint(self) -> endpoint.Endpoint:
+        return self.client.endpoint
+
+    def score(self, default_latency: float) -> float:
+        """
+        Return the expected wait of a new request, lower is better
+
+        :param default_latency: Latency of the node if it has no response yet
+        :return:
+        """
+        latency = default_latency if self.latency is None else self.latency
+        return (self.in_flight + 1) * latency / (1.0 - self.error_rate / 2)
+
+    def is_available(self, now: float, reset_timeout: float) -> bool:
+        """
+        Return True if the circuit is closed, or open since reset_timeout (half open)
+        and not already probed by a request
+
+        :param now: Current time.monotonic() value
+        :param reset_timeout: Delay in seconds before trying an open circuit node
+        :return:
+        """
+        if self.opened_at is None:
+            return True
+        return not self.probing and now - self.opened_at >= reset_timeout
+
+    def hedge_delay(self, quantile: float, minimum: float) -> float:
+        """
+        Return the delay before sending a hedged request, from the quantile of the durations
+
+        :param quantile: Quantile of the durations, from 0 to 1
+        :param minimum: Minimum delay in seconds
+        :return:
+        """
+        if len(self.durations) < 10:
+            return DEFAULT_HEDGE_DELAY
+        durations = sorted(self.durations)
+        index = min(int(quantile * len(durations)), len(durations) - 1)
+        return max(durations[index], minimum)
+
+    def success(self, duration: float) -> None:
+        """
+        Record a response and close the circuit
+
+        :param duration: Response duration in seconds
+        :return:
+        """
+        if self.latency is None:
+            self.latency = duration
+        else:
+            self.latency += SMOOTHING * (duration - self.latency)
+        self.durations.append(duration)
+        self.error_rate -= SMOOTHING * self.error_rate
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self, now: float, threshold: int) -> None:
+        """
+        Record a failure, open the circuit after threshold consecutive failures
+
+        :param now: Current time.monotonic() value
+        :param threshold: Count of consecutive failures opening the circuit
+        :return:
+        """
+        self.error_rate += SMOOTHING * (1.0 - self.error_rate)
+        self.failures += 1
+        if self.failures >= threshold:
+            if self.opened_at is None:
+                logger.warning("Circuit opened for %s", self.endpoint.inline())
+            self.opened_at = now
+
+
+class MultiClient:
+    """
+    API client over several BMA and GVA endpoints
+
+    Each request is routed to the node with the lowest expected wait, from its requests
+    in flight, its latency and its error rate moving averages. If the node has not answered
+    after the hedging quantile of its response durations, a duplicate request is sent
+    to the next node and the first response wins. Failed requests are retried on the next
+    nodes. After failure_threshold consecutive failures, the circuit of a node opens:
+    it gets no more requests until reset_timeout has elapsed, then a single request probes it
+    and closes it on success.
+
+    A DuniterError is the answer of a healthy node: it is raised without failover.
+
+    GET and POST requests are sent to the BMA nodes, GraphQL queries to the GVA nodes.
+    POST requests and GraphQL mutations are never hedged, nor retried after a timeout.
+
+    MultiClient has the request methods of Client, so it can be given to the API functions:
+
+        client = MultiClient([BMAS_ENDPOINT_1, BMAS_ENDPOINT_2, BMAS_ENDPOINT_3])
+        current = await client(bma.blockchain.current)
+        await client.close()
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[Union[str, endpoint.Endpoint]],
+        session_pool: Optional[SessionPool] = None,
+        proxy: Optional[str] = None,
+        validation: str = VALIDATE_FULL,
+        validation_sample_rate: float = 0.1,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = MIN_HEDGE_DELAY,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        tracer: Optional[Tracer] = None,
+    ) -> None:
+        """
+        Init MultiClient instance
+
+        :param endpoints: Endpoints or endpoint strings in duniter format
+        :param session_pool: SessionPool instance of the clients (optional, default shared pool)
+        :param proxy: Proxy server as hostname:port (optional, default None)
+        :param validation: Response validation mode (optional, default VALIDATE_FULL)
+        :param validation_sample_rate: Rate of validated responses in VALIDATE_SAMPLED mode (optional, default 0.1)
+        :param timeout: Timeout of one attempt in seconds (optional, default 15)
+        :param max_attempts: Max count of nodes tried by a request, hedges included (optional, default 3)
+        :param hedge: Send hedged requests (optional, default True)
+        :param hedge_quantile: Quantile of the node durations before hedging (optional, default 0.95)
+        :param min_hedge_delay: Minimum delay in seconds before hedging (optional, default 0.05)
+        :param failure_threshold: Consecutive failures opening the circuit of a node (optional, default 5)
+        :param reset_timeout: Delay in seconds before trying an open circuit node again (optional, default 30)
+        :param tracer: Tracer instance of the clients (optional, default None)
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.session_pool = get_session_pool() if session_pool is None else session_pool
+        self.nodes = [
+            NodeState(
+                Client(
+                    _endpoint,
+                    proxy=proxy,
+                    session_pool=self.session_pool,
+                    validation=validation,
+                    validation_sample_rate=validation_sample_rate,
+                    tracer=tracer,
+                )
+            )
+            for _endpoint in endpoints
+        ]
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    def ranked_nodes(self, gva: bool = False) -> List[NodeState]:
+        """
+        Return the available nodes of the API, best first
+
+        If all the circuits are open, all the nodes are returned, oldest opened first
+        and probed ones last.
+
+        :param gva: True for the GVA nodes, False for the BMA nodes (optional, default False)
+        :return:
+        """
+        nodes = [
+            node
+            for node in self.nodes
+            if isinstance(node.endpoint, endpoint.GVAEndpoint) == gva
+        ] or self.nodes
+        now = time.monotonic()
+        available = [
+            node for node in nodes if node.is_available(now, self.reset_timeout)
+        ]
+        if not available:
+            return sorted(nodes, key=lambda node: (node.probing, node.opened_at or 0.0))
+        # nodes without response yet are given the median latency of the measured
+        # nodes, and are tried before the measured ones on equal score
+        latencies = [node.latency for node in nodes if node.latency is not None]
+        default_latency = statistics.median(latencies) if latencies else DEFAULT_LATENCY
+        return sorted(
+            available,
+            key=lambda node: (
+                node.score(default_latency),
+                node.in_flight,
+                node.latency is not None,
+            ),
+        )
+
+    async def request(
+        self,
+        send: Callable[[Client], Awaitable[Any]],
+        gva: bool = False,
+        hedge: bool = True,
+        idempotent: bool = True,
+    ) -> Any:
+        """
+        Send a request to the best node, with hedging and failover, and return the first response
+
+        A request which is not idempotent is neither hedged nor sent to another node after
+        a timeout, as the node may have processed it.
+
+        :param send: Function sending the request with a Client instance
+        :param gva: True to send the request to the GVA nodes (optional, default False)
+        :param hedge: False to disable hedging of this request (optional, default True)
+        :param idempotent: False if the request can not be sent again (optional, default True)
+        :return:
+        """
+        remaining = deque(self.ranked_nodes(gva)[: self.max_attempts])
+        hedge = hedge and idempotent and self.hedge
+        tasks = {}  # type: Dict[asyncio.Future, NodeState]
+        error = ConnectionError("No node answered")  # type: BaseException
+        try:
+            while remaining or tasks:
+                if not tasks:
+                    node = remaining.popleft()
+                    tasks[asyncio.ensure_future(self._attempt(node, send))] = node
+
+                delay = None
+                if hedge and remaining and len(tasks) == 1:
+                    node = next(iter(tasks.values()))
+                    delay = node.hedge_delay(self.hedge_quantile, self.min_hedge_delay)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    node = remaining.popleft()
+                    logger.debug("Hedged request to %s", node.endpoint.inline())
+                    tasks[asyncio.ensure_future(self._attempt(node, send))] = node
+                    continue
+
+                result = None
+                success = False
+                for task in done:
+                    del tasks[task]
+                    try:
+                        result = task.result()
+                        success = True
+                    except FAILOVER_ERRORS as exception:
+                        if not idempotent and isinstance(
+                            exception, asyncio.TimeoutError
+                        ):
+                            raise
+                        error = exception
+                if success:
+                    return result
+                # a DuniterError or an unexpected error is raised by task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        raise error
+
+    async def _attempt(
+        self, node: NodeState, send: Callable[[Client], Awaitable[Any]]
+    ) -> Any:
+        """
+        Send the request to a node and update its statistics
+
+        :param node: NodeState instance
+        :param send: Function sending the request with a Client instance
+        :return:
+        """
+        node.in_flight += 1
+        node.probing = node.opened_at is not None
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(send(node.client), self.timeout)
+        except DuniterError:
+            node.success(time.monotonic() - started)
+            raise
+        except FAILOVER_ERRORS as exception:
+            logger.debug("Request to %s failed: %s", node.endpoint.inline(), exception)
+            node.failure(time.monotonic(), self.failure_threshold)
+            raise
+        finally:
+            node.in_flight -= 1
+            node.probing = False
+
+        node.success(time.monotonic() - started)
+        return result
+
+    async def get(
+        self,
+        url_path: str,
+        params: Optional[dict] = None,
+        rtype: str = RESPONSE_JSON,
+        schema: Optional[dict] = None,
+    ) -> Any:
+        """
+        GET request on the best BMA node + url_path
+
+        :param url_path: Url encoded path following the endpoint
+        :param params: Url query string parameters dictionary (optional, default None)
+        :param rtype: Response type (optional, default RESPONSE_JSON)
+        :param schema: Json Schema to validate response (optional, default None)
+        :return:
+        """
+        return await self.request(
+            lambda client: client.get(url_path, params, rtype, schema)
+        )
+
+    async def get_stream(
+        self,
+        url_path: str,
+        path: Sequence[str] = (),
+        params: Optional[dict] = None,
+        schema: Optional[dict] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> AsyncIterator[Any]:
+        """
+        GET request on the best BMA node + url_path and yield the items of a json array of the response
+
+        Streams are neither hedged nor retried.
+
+        :param url_path: Url encoded path following the endpoint
+        :param path: Object keys leading to the array in the response (optional, default top level array)
+        :param params: Url query string parameters dictionary (optional, default None)
+        :param schema: Json Schema to validate each item (optional, default None)
+        :param chunk_size: Size of the chunks read from the response (optional, default 65536)
+        :return:
+        """
+        client = self.ranked_nodes()[0].client
+        async for item in client.get_stream(url_path, path, params, schema, chunk_size):
+            yield item
+
+    async def post(
+        self,
+        url_path: str,
+        params: Optional[dict] = None,
+        rtype: str = RESPONSE_JSON,
+        schema: Optional[dict] = None,
+    ) -> Any:
+        """
+        POST request on the best BMA node + url_path, without hedging
+
+        POST is not an idempotent method: the request is not sent to another node after a timeout.
+
+        :param url_path: Url encoded path following the endpoint
+        :param params: Url query string parameters dictionary (optional, default None)
+        :param rtype: Response type (optional, default RESPONSE_JSON)
+        :param schema: Json Schema to validate response (optional, default None)
+        :return:
+        """
+        return await self.request(
+            lambda client: client.post(url_path, params, rtype, schema),
+            idempotent=False,
+        )
+
+    async def query(
+        self,
+        query: str,
+        variables: Optional[dict] = None,
+        rtype: str = RESPONSE_JSON,
+        schema: Optional[dict] = None,
+    ) -> Any:
+        """
+        GraphQL query or mutation request on the best GVA node
+
+        Mutations are handled like POST requests: neither hedged nor sent to another node after a timeout.
+
+        :param query: GraphQL query string
+        :param variables: Variables for the query (optional, default None)
+        :param rtype: Response type (optional, default RESPONSE_JSON)
+        :param schema: Json Schema to validate response (optional, default None)
+        :return:
+        """
+        return await self.request(
+            lambda client: client.query(query, variables, rtype, schema),
+            gva=True,
+            idempotent=not is_mutation(query),
+        )
+
+    async def connect_ws(self, path: str = "") -> WSConnection:
+        """
+        Connect to a websocket of the best BMA node
+
+        :param path: the url path
+        :return:
+        """
+        return await self.ranked_nodes()[0].client.connect_ws(path)
+
+    async def close(self) -> None:
+        """
+        Close the clients
+
+        The sessions borrowed from the session pool are released,
+        the pool closes each of them when its last client releases it.
+
+        :return:
+        """
+        for node in self.nodes:
+            await node.client.close()
+
+    def __call__(self, _function: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Call the _function given with the args given
+        So we can call many packages wrapping the REST API
+
+        :param _function: The function to call
+        :param args: The parameters
+        :param kwargs: The key/value parameters
+        :return:
+        """
+        return _function(self, *args, **kwargs)
@@ -0,0 +1,203 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import email.utils
+import random
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from aiohttp import ClientConnectionError
+
+from .endpoint import ConnectionHandler
+
+# Http methods which can be sent again without side effect
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Http status codes of the responses worth a retry
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# errors of the requests worth a retry
+RETRY_ERRORS = (ClientConnectionError, asyncio.TimeoutError)
+
+
+class RetryPolicy:
+    """
+    Retries of the idempotent requests, with exponential backoff and full jitter
+
+    The delay before the retry n (from 0) is a random value between 0
+    and min(max_backoff, backoff * 2 ** n). The Retry-After header of a response
+    overrides it, up to max_backoff.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        statuses: Sequence[int] = RETRY_STATUSES,
+    ) -> None:
+        """
+        Init RetryPolicy instance
+
+        :param max_retries: Max count of retries of a request (optional, default 3)
+        :param backoff: Delay bound of the first retry in seconds (optional, default 0.5)
+        :param max_backoff: Max delay before a retry in seconds (optional, default 10)
+        :param statuses: Http status codes retried (optional, default RETRY_STATUSES)
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = tuple(statuses)
+
+    def delay(self, retry: int, retry_after: Optional[str] = None) -> float:
+        """
+        Return the delay in seconds before the retry
+
+        :param retry: Number of the retry, from 0
+        :param retry_after: Value of the Retry-After header of the response (optional, default None)
+        :return:
+        """
+        if retry_after is not None:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**retry))
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """
+    Return the delay in seconds of a Retry-After header value, or None if invalid
+
+    :param value: Delay in seconds or http date
+    :return:
+    """
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+class TokenBucket:
+    """
+    Token bucket of one endpoint host
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        Init TokenBucket instance
+
+        :param rate: Tokens added by second
+        :param burst: Max count of tokens
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self) -> float:
+        """
+        Take a token and return the delay in seconds before it is available
+
+        Tokens can be taken in advance, so the waiting requests are served in order.
+
+        :return:
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(delay, self.paused_until - now)
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter, with one bucket per endpoint host
+
+    One instance can be shared by several clients to limit the requests to each node.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        """
+        Init RateLimiter instance
+
+        :param rate: Max requests by second to one endpoint host
+        :param burst: Max requests sent at once to one endpoint host (optional, default rate)
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.burst = max(rate if burst is None else burst, 1.0)
+        self.buckets = {}  # type: Dict[Tuple[str, str, int], TokenBucket]
+
+    @staticmethod
+    def key(connection_handler: ConnectionHandler) -> Tuple[str, str, int]:
+        """
+        Return the bucket key of the endpoint host: (http scheme, server, port)
+
+        :param connection_handler: Connection handler of the endpoint
+        :return:
+        """
+        return (
+            connection_handler.http_scheme,
+            connection_handler.server,
+            connection_handler.port,
+        )
+
+    def bucket(self, connection_handler: ConnectionHandler) -> TokenBucket:
+        """
+        Return the bucket of the endpoint host, create it if needed
+
+        :param connection_handler: Connection handler of the endpoint
+        :return:
+        """
+        key = self.key(connection_handler)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    async def acquire(self, connection_handler: ConnectionHandler) -> None:
+        """
+        Wait until a request can be sent to the endpoint host
+
+        :param connection_handler: Connection handler of the endpoint
+        :return:
+        """
+        delay = self.bucket(connection_handler).reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, connection_handler: ConnectionHandler, delay: float) -> None:
+        """
+        Hold the requests to the endpoint host during delay, after a 429 response
+
+        :param connection_handler: Connection handler of the endpoint
+        :param delay: Delay in seconds
+        :return:
+        """
+        bucket = self.bucket(connection_handler)
+        bucket.paused_until = max(bucket.paused_until, time.monotonic() + delay)
@@ -0,0 +1,237 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from aiohttp import StreamReader
+
+# size of the chunks read from the response
+STREAM_CHUNK_SIZE = 65536
+
+DECODER = json.JSONDecoder()
+WHITESPACE_REGEX = re.compile(r"[ \t\n\r]*")
+SEPARATOR_REGEX = re.compile(r"[ \t\n\r]*,?[ \t\n\r]*")
+STRING_REGEX = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+# characters between structural tokens (numbers, literals, separators)
+OTHER_REGEX = re.compile(r'[^{}\[\]"]+')
+PRIMITIVE_REGEX = re.compile(r"[^,\]}\s]+")
+CONTAINER_TOKEN_REGEX = re.compile(r'[{}\[\]"]')
+
+
+class JsonItemsParser:
+    """
+    Incremental parser of the items of a json array
+
+    The array is located by its path, the list of object keys leading to it
+    (empty path for a top level array). Data is fed by chunks and each complete item
+    is decoded alone, so only the item being received is held in memory.
+    Other values of the document are skipped without being decoded.
+    """
+
+    def __init__(self, path: Sequence[str] = ()) -> None:
+        """
+        Init JsonItemsParser instance
+
+        :param path: Object keys leading to the array (optional, default top level array)
+        """
+        self.path = list(path)
+        self.buffer = ""
+        self.pos = 0
+        # open containers outside the array, as [kind, current key] entries
+        self.stack = []  # type: List[list]
+        self.found = False
+        self.done = False
+        # item being scanned inside the array
+        self.item_start = None  # type: Optional[int]
+        self.item_scan = 0
+        self.item_depth = 0
+
+    def feed(self, data: str) -> List[Any]:
+        """
+        Parse data and return the list of items completed by this chunk
+
+        :param data: Next chunk of the json document
+        :return:
+        """
+        # drop consumed data
+        offset = self.pos if self.item_start is None else self.item_start
+        self.buffer = self.buffer[offset:] + data
+        self.pos -= offset
+        if self.item_start is not None:
+            self.item_start -= offset
+            self.item_scan -= offset
+
+        items = []
+        buffer = self.buffer
+        while not self.done:
+            if self.item_start is not None:
+                # item split across chunks
+                end = self._scan_item()
+                if end is None:
+                    break
+                items.append(json.loads(buffer[self.item_start : end]))
+                self.item_start = None
+                self.pos = end
+            elif self.found:
+                pos = SEPARATOR_REGEX.match(buffer, self.pos).end()  # type: ignore
+                self.pos = pos
+                if pos >= len(buffer):
+                    break
+                if buffer[pos] == "]":
+                    self.pos = pos + 1
+                    self.done = True
+                    break
+                # fast path, the whole item is in the buffer
+                try:
+                    if buffer[pos] in '{["':
+                        item, end = DECODER.raw_decode(buffer, pos)
+                    else:
+                        # a number can be cut by the end of the chunk
+                        end = PRIMITIVE_REGEX.match(buffer, pos).end()  # type: ignore
+                        item = json.loads(buffer[pos:end])
+                except ValueError:
+                    end = len(buffer)
+                if end >= len(buffer):
+                    # incomplete item, scan it until its end is received
+                    self.item_start = self.item_scan = pos
+                    self.item_depth = 0
+                    continue
+                items.append(item)
+                self.pos = end
+            elif not self._step():
+                break
+        return items
+
+    def close(self) -> None:
+        """
+        Check the array has been fully parsed at the end of the document
+
+        :return:
+        """
+        if self.done:
+            return
+        if self.found:
+            raise ValueError("Unexpected end of json array")
+        raise ValueError("No json array found at path {0}".format(self.path))
+
+    def _step(self) -> bool:
+        """
+        Parse the next token before the array, return False if more data is needed
+
+        :return:
+        """
+        buffer = self.buffer
+        pos = WHITESPACE_REGEX.match(buffer, self.pos).end()  # type: ignore
+        self.pos = pos
+        if pos >= len(buffer):
+            return False
+        char = buffer[pos]
+
+        if char in "{[":
+            if char == "[" and [entry[1] for entry in self.stack] == self.path:
+                self.found = True
+            else:
+                self.stack.append([char, None])
+            self.pos = pos + 1
+        elif char in "}]":
+            if self.stack:
+                self.stack.pop()
+            self.pos = pos + 1
+        elif char == '"':
+            match = STRING_REGEX.match(buffer, pos)
+            if match is None:
+                return False
+            end = match.end()
+            if self.stack and self.stack[-1][0] == "{":
+                # object key if followed by a colon
+                after = WHITESPACE_REGEX.match(buffer, end).end()  # type: ignore
+                if after >= len(buffer):
+                    return False
+                if buffer[after] == ":":
+                    self.stack[-1][1] = json.loads(match.group())
+                    end = after + 1
+            self.pos = end
+        else:
+            self.pos = OTHER_REGEX.match(buffer, pos).end()  # type: ignore
+        return True
+
+    def _scan_item(self) -> Optional[int]:
+        """
+        Continue the scan of the current item, return its end or None if more data is needed
+
+        :return:
+        """
+        buffer = self.buffer
+        start = self.item_start  # type: Any
+        char = buffer[start]
+        if char == '"':
+            match = STRING_REGEX.match(buffer, start)
+            return None if match is None else match.end()
+        if char not in "{[":
+            match = PRIMITIVE_REGEX.match(buffer, start)
+            if match is None or match.end() >= len(buffer):
+                return None
+            return match.end()
+
+        pos = self.item_scan
+        while True:
+            match = CONTAINER_TOKEN_REGEX.search(buffer, pos)
+            if match is None:
+                self.item_scan = len(buffer)
+                return None
+            pos = match.start()
+            token = match.group()
+            if token == '"':
+                string = STRING_REGEX.match(buffer, pos)
+                if string is None:
+                    # wait for the end of the string
+                    self.item_scan = pos
+                    return None
+                pos = string.end()
+                continue
+            pos += 1
+            self.item_depth += 1 if token in "{[" else -1
+            if self.item_depth == 0:
+                return pos
+
+
+async def iter_items(
+    content: StreamReader,
+    path: Sequence[str] = (),
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> AsyncIterator[Any]:
+    """
+    Yield the items of the json array at path from a response content stream
+
+    :param content: aiohttp response content
+    :param path: Object keys leading to the array (optional, default top level array)
+    :param chunk_size: Size of the chunks read (optional, default 65536)
+    :return:
+    """
+    parser = JsonItemsParser(path)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in content.iter_chunked(chunk_size):
+        for item in parser.feed(decoder.decode(chunk)):
+            yield item
+        if parser.done:
+            return
+    for item in parser.feed(decoder.decode(b"", final=True)):
+        yield item
+    parser.close()
@@ -0,0 +1,446 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import bisect
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .endpoint import ConnectionHandler
+
+# Upper bounds in seconds of the duration histograms buckets
+DURATION_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Path segments kept in the path labels, after the module and function segments
+PATH_WORDS = frozenset(
+    (
+        "newcomers",
+        "certs",
+        "joiners",
+        "actives",
+        "leavers",
+        "revoked",
+        "excluded",
+        "ud",
+        "tx",
+        "heads",
+        "blocks",
+        "times",
+        "pending",
+    )
+)
+
+NUMBER_REGEX = re.compile(r"^[0-9]+$")
+
+# Metrics of MetricsCollector: name => (type, help)
+METRICS = {
+    "duniterpy_requests_total": ("counter", "Count of the http requests"),
+    "duniterpy_request_errors_total": (
+        "counter",
+        "Count of the http requests without response",
+    ),
+    "duniterpy_requests_in_flight": ("gauge", "Count of the http requests sent"),
+    "duniterpy_request_duration_seconds": (
+        "histogram",
+        "Duration of the http requests until the response headers",
+    ),
+    "duniterpy_request_sent_bytes_total": (
+        "counter",
+        "Size of the http request bodies",
+    ),
+    "duniterpy_response_received_bytes_total": (
+        "counter",
+        "Size of the json http response bodies",
+    ),
+    "duniterpy_json_decode_duration_seconds": (
+        "histogram",
+        "Duration of the json decoding of the http responses",
+    ),
+    "duniterpy_validation_duration_seconds": (
+        "histogram",
+        "Duration of the json schema validation of the http responses",
+    ),
+    "duniterpy_ws_messages_total": ("counter", "Count of the web socket messages"),
+    "duniterpy_ws_bytes_total": ("counter", "Size of the web socket messages"),
+}
+
+LabelsType = Tuple[Tuple[str, str], ...]
+
+
+def endpoint_label(connection_handler: ConnectionHandler) -> str:
+    """
+    Return the endpoint label of a connection handler: server:port
+
+    :param connection_handler: Connection handler of the endpoint
+    :return:
+    """
+    return "{0}:{1}".format(connection_handler.server, connection_handler.port)
+
+
+def path_label(path: str) -> str:
+    """
+    Return the path label of a request path, without its variable parts
+
+    The module and function segments are kept, numbers are replaced by ":number"
+    and the other parameters (pubkeys, uids, hashes...) by ":param".
+
+    :param path: Request path following the endpoint
+    :return:
+    """
+    segments = path.strip("/").split("/")
+    for index in range(2, len(segments)):
+        segment = segments[index]
+        if NUMBER_REGEX.match(segment):
+            segments[index] = ":number"
+        elif segment not in PATH_WORDS:
+            segments[index] = ":param"
+    return "/".join(segments)
+
+
+class Tracer:
+    """
+    Receiver of the instrumentation events of Client, API and WSConnection
+
+    Methods do nothing: override the ones of the events to record.
+    Endpoint labels are server:port strings, path labels come from path_label().
+    """
+
+    def request_start(self, method: str, endpoint: str, path: str) -> None:
+        """
+        Called when an http request is sent
+
+        :param method: Http method
+        :param endpoint: Endpoint label
+        :param path: Path label
+        :return:
+        """
+
+    def request_end(
+        self,
+        method: str,
+        endpoint: str,
+        path: str,
+        status: Optional[int],
+        duration: float,
+        sent_bytes: int,
+    ) -> None:
+        """
+        Called when the response headers of an http request are received, or on error
+
+        :param method: Http method
+        :param endpoint: Endpoint label
+        :param path: Path label
+        :param status: Http status code of the response, None on error
+        :param duration: Duration of the request in seconds
+        :param sent_bytes: Size of the request body
+        :return:
+        """
+
+    def response_read(
+        self, endpoint: str, path: str, received_bytes: int, decode_duration: float
+    ) -> None:
+        """
+        Called when the body of a json response is read and decoded
+
+        :param endpoint: Endpoint label
+        :param path: Path label
+        :param received_bytes: Size of the response body
+        :param decode_duration: Duration of the json decoding in seconds
+        :return:
+        """
+
+    def validation(self, endpoint: str, path: str, duration: float) -> None:
+        """
+        Called when a response is validated against its json schema
+
+        :param endpoint: Endpoint label
+        :param path: Path label
+        :param duration: Duration of the validation in seconds
+        :return:
+        """
+
+    def ws_message(self, endpoint: str, path: str, direction: str, size: int) -> None:
+        """
+        Called for each message sent or received on a web socket connection
+
+        :param endpoint: Endpoint label
+        :param path: Path label of the web socket
+        :param direction: "in" or "out"
+        :param size: Size of the message
+        :return:
+        """
+
+
+class Histogram:
+    """
+    Histogram of observed values with fixed buckets
+    """
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS) -> None:
+        """
+        Init Histogram instance
+
+        :param buckets: Sorted upper bounds of the buckets (optional, default DURATION_BUCKETS)
+        """
+        self.buckets = tuple(buckets)
+        # the last count is the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Add a value
+
+        :param value: Observed value
+        :return:
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        """
+        Return the count of values lower than or equal to each bucket bound, +Inf last
+
+        :return:
+        """
+        total = 0
+        counts = []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+    def quantile(self, q: float) -> float:
+        """
+        Return the estimated quantile, by linear interpolation in its bucket
+
+        :param q: Quantile from 0 to 1
+        :return:
+        """
+        if self.count == 0:
+            return math.nan
+        rank = q * self.count
+        lower = 0.0
+        previous = 0
+        for bound, total in zip(self.buckets, self.cumulative_counts()):
+            if total >= rank:
+                if total == previous:
+                    return bound
+                return lower + (bound - lower) * (rank - previous) / (total - previous)
+            lower, previous = bound, total
+        # in the +Inf bucket
+        return self.buckets[-1]
+
+
+class MetricsCollector(Tracer):
+    """
+    Tracer keeping counters and histograms of the events in memory
+
+    Usage:
+
+        metrics = MetricsCollector()
+        client = Client(BMAS_ENDPOINT, tracer=metrics)
+        ...
+        print(metrics.export())
+    """
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS) -> None:
+        """
+        Init MetricsCollector instance
+
+        :param buckets: Upper bounds of the duration histograms buckets (optional, default DURATION_BUCKETS)
+        """
+        self.buckets = tuple(buckets)
+        # name => labels => value, for the counters and gauges
+        self.values = {}  # type: Dict[str, Dict[LabelsType, float]]
+        # name => labels => Histogram
+        self.histograms = {}  # type: Dict[str, Dict[LabelsType, Histogram]]
+
+    def add(self, name: str, labels: LabelsType, value: float = 1) -> None:
+        """
+        Add value to a counter or gauge
+
+        :param name: Metric name
+        :param labels: Labels as (name, value) pairs
+        :param value: Value added (optional, default 1)
+        :return:
+        """
+        values = self.values.setdefault(name, {})
+        values[labels] = values.get(labels, 0) + value
+
+    def observe(self, name: str, labels: LabelsType, value: float) -> None:
+        """
+        Add a value to a histogram
+
+        :param name: Metric name
+        :param labels: Labels as (name, value) pairs
+        :param value: Observed value
+        :return:
+        """
+        histograms = self.histograms.setdefault(name, {})
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def get(self, name: str, **labels: str) -> Union[float, Histogram, None]:
+        """
+        Return the value or histogram of a metric with labels, None if not recorded
+
+        :param name: Metric name
+        :param labels: Labels of the metric, in the order of the metric
+        :return:
+        """
+        key = tuple(labels.items())
+        if METRICS[name][0] == "histogram":
+            return self.histograms.get(name, {}).get(key)
+        return self.values.get(name, {}).get(key)
+
+    def request_start(self, method: str, endpoint: str, path: str) -> None:
+        self.add("duniterpy_requests_in_flight", (("endpoint", endpoint),))
+
+    def request_end(
+        self,
+        method: str,
+        endpoint: str,
+        path: str,
+        status: Optional[int],
+        duration: float,
+        sent_bytes: int,
+    ) -> None:
+        self.add("duniterpy_requests_in_flight", (("endpoint", endpoint),), -1)
+        labels = (("method", method), ("endpoint", endpoint), ("path", path))
+        if status is None:
+            self.add("duniterpy_request_errors_total", labels)
+        else:
+            self.add("duniterpy_requests_total", labels + (("status", str(status)),))
+        self.observe("duniterpy_request_duration_seconds", labels, duration)
+        if sent_bytes:
+            self.add("duniterpy_request_sent_bytes_total", labels, sent_bytes)
+
+    def response_read(
+        self, endpoint: str, path: str, received_bytes: int, decode_duration: float
+    ) -> None:
+        labels = (("endpoint", endpoint), ("path", path))
+        self.add("duniterpy_response_received_bytes_total", labels, received_bytes)
+        self.observe("duniterpy_json_decode_duration_seconds", labels, decode_duration)
+
+    def validation(self, endpoint: str, path: str, duration: float) -> None:
+        self.observe(
+            "duniterpy_validation_duration_seconds",
+            (("endpoint", endpoint), ("path", path)),
+            duration,
+        )
+
+    def ws_message(self, endpoint: str, path: str, direction: str, size: int) -> None:
+        labels = (("endpoint", endpoint), ("path", path), ("direction", direction))
+        self.add("duniterpy_ws_messages_total", labels)
+        self.add("duniterpy_ws_bytes_total", labels, size)
+
+    def export(self) -> str:
+        """
+        Return the metrics in the Prometheus text exposition format
+
+        :return:
+        """
+        lines = []
+        for name, (metric_type, description) in METRICS.items():
+            if name not in self.values and name not in self.histograms:
+                continue
+            lines.append("# HELP {0} {1}".format(name, description))
+            lines.append("# TYPE {0} {1}".format(name, metric_type))
+            for labels, value in self.values.get(name, {}).items():
+                lines.append(
+                    "{0}{1} {2}".format(
+                        name, format_labels(labels), format_value(value)
+                    )
+                )
+            for labels, histogram in self.histograms.get(name, {}).items():
+                for bound, count in zip(
+                    histogram.buckets + (math.inf,), histogram.cumulative_counts()
+                ):
+                    lines.append(
+                        "{0}_bucket{1} {2}".format(
+                            name,
+                            format_labels(labels + (("le", format_value(bound)),)),
+                            count,
+                        )
+                    )
+                lines.append(
+                    "{0}_sum{1} {2}".format(
+                        name, format_labels(labels), format_value(histogram.sum)
+                    )
+                )
+                lines.append(
+                    "{0}_count{1} {2}".format(
+                        name, format_labels(labels), histogram.count
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+
+def format_value(value: float) -> str:
+    """
+    Return a sample value in the Prometheus text format
+
+    :param value: Sample value
+    :return:
+    """
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(labels: LabelsType) -> str:
+    """
+    Return labels in the Prometheus text format
+
+    :param labels: Labels as (name, value) pairs
+    :return:
+    """
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{0}="{1}"'.format(
+                name,
+                value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+            )
+            for name, value in labels
+        )
+        + "}"
+    )
@@ -16,9 +16,9 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import logging
-from . import network, requests
+from . import client, network, requests
 
-__all__ = ["network", "requests"]
+__all__ = ["client", "network", "requests"]
 
 PROTOCOL_VERSION = 1
 
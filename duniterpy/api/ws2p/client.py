@@ -0,0 +1,366 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import ClientError, WSMsgType
+
+from duniterpy.api.client import (
+    VALIDATE_FULL,
+    VALIDATE_OFF,
+    VALIDATE_SAMPLED,
+    WSConnection,
+    validate,
+)
+from . import requests
+
+logger = logging.getLogger("duniter/ws2p")
+
+# Default timeout of a request in seconds
+DEFAULT_REQUEST_TIMEOUT = 30.0
+
+# Default max count of messages waiting in a subscriber queue
+DEFAULT_QUEUE_SIZE = 1000
+
+# Errors of a lost connection
+CONNECTION_ERRORS = (ClientError, OSError, asyncio.TimeoutError)
+
+# Message types of a closed connection
+CLOSE_MESSAGE_TYPES = (WSMsgType.CLOSE, WSMsgType.CLOSING, WSMsgType.CLOSED)
+
+
+class WS2PError(Exception):
+    """
+    Error response of a WS2P request
+    """
+
+
+class WS2PClient:
+    """
+    Multiplexed WS2P request client over one handshaked web socket connection
+
+    A background task reads every message of the connection. Responses are routed
+    to the waiting requests by their resId, so many requests can be in flight at once.
+    The other messages (HEAD, documents, requests of the remote node) are pushed
+    to the subscriber queues.
+
+    Usage:
+
+        async with WS2PClient(ws) as ws2p_client:
+            current, block = await asyncio.gather(
+                ws2p_client.get_current(), ws2p_client.get_block(30000)
+            )
+    """
+
+    def __init__(
+        self,
+        ws: WSConnection,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        validation: str = VALIDATE_FULL,
+        validation_sample_rate: float = 0.1,
+    ) -> None:
+        """
+        Init WS2PClient instance
+
+        The handshake must be done on the connection before the requests.
+
+        :param ws: Web socket connection instance
+        :param timeout: Default timeout of a request in seconds (optional, default 30)
+        :param validation: Response validation mode (optional, default VALIDATE_FULL)
+        :param validation_sample_rate: Rate of validated responses in VALIDATE_SAMPLED mode (optional, default 0.1)
+        """
+        if validation not in (VALIDATE_OFF, VALIDATE_SAMPLED, VALIDATE_FULL):
+            raise ValueError("Unknown validation mode {0}".format(validation))
+
+        self.ws = ws
+        self.timeout = timeout
+        self.validation = validation
+        self.validation_sample_rate = validation_sample_rate
+        self.closed = False
+        # response futures by request id
+        self.pending = {}  # type: Dict[str, asyncio.Future]
+        self.subscribers = []  # type: List[asyncio.Queue]
+        self._request_ids = itertools.count(random.getrandbits(32))
+        self._reader = None  # type: Optional[asyncio.Future]
+
+    def start(self) -> None:
+        """
+        Start the background reader task
+
+        :return:
+        """
+        if self._reader is None:
+            self._reader = asyncio.ensure_future(self._read())
+
+    async def close(self, close_connection: bool = True) -> None:
+        """
+        Stop the reader task, fail the pending requests and close the connection
+
+        :param close_connection: Close the web socket connection (optional, default True)
+        :return:
+        """
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        self._fail(ConnectionError("WS2P client closed"))
+        if close_connection:
+            await self.ws.close()
+
+    async def wait_closed(self) -> None:
+        """
+        Wait until the connection is closed or lost
+
+        :return:
+        """
+        if self._reader is not None:
+            await asyncio.wait([self._reader])
+
+    async def __aenter__(self) -> "WS2PClient":
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    def subscribe(self, maxsize: int = DEFAULT_QUEUE_SIZE) -> asyncio.Queue:
+        """
+        Return a queue receiving the messages which are not responses
+
+        When the queue is full, the oldest message is dropped.
+        None is put in the queue when the connection is closed.
+
+        :param maxsize: Max count of messages in the queue (optional, default 1000)
+        :return:
+        """
+        queue = asyncio.Queue(maxsize)  # type: asyncio.Queue
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """
+        Stop pushing messages to the queue
+
+        :param queue: Queue returned by subscribe()
+        :return:
+        """
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    async def request(
+        self,
+        build: Callable[..., str],
+        *args: Any,
+        schema: Optional[dict] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Send a request and return the body of its response
+
+        :param build: Function of the requests module returning the request string
+        :param args: Arguments of build after the request id
+        :param schema: Json Schema of the response (optional, default None)
+        :param timeout: Timeout in seconds (optional, default client timeout)
+        :return:
+        """
+        if self.closed:
+            raise ConnectionError("WS2P client closed")
+
+        request_id = self._next_request_id()
+        future = asyncio.get_event_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            await self.ws.send_str(build(request_id, *args))
+            response = await asyncio.wait_for(
+                future, self.timeout if timeout is None else timeout
+            )
+        finally:
+            self.pending.pop(request_id, None)
+
+        if "err" in response:
+            raise WS2PError(response["err"])
+        if self.must_validate(schema):
+            validate(response, schema)  # type: ignore
+        return response["body"]
+
+    async def get_current(self, timeout: Optional[float] = None) -> dict:
+        """
+        Return the current block
+
+        :param timeout: Timeout in seconds (optional, default client timeout)
+        :return:
+        """
+        return await self.request(
+            requests.get_current,
+            schema=requests.BLOCK_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    async def get_block(self, number: int, timeout: Optional[float] = None) -> dict:
+        """
+        Return the block with number
+
+        :param number: Block number
+        :param timeout: Timeout in seconds (optional, default client timeout)
+        :return:
+        """
+        return await self.request(
+            requests.get_block,
+            number,
+            schema=requests.BLOCK_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    async def get_blocks(
+        self, from_number: int, count: int, timeout: Optional[float] = None
+    ) -> List[dict]:
+        """
+        Return count blocks from from_number
+
+        :param from_number: Number of the first block
+        :param count: Count of blocks
+        :param timeout: Timeout in seconds (optional, default client timeout)
+        :return:
+        """
+        return await self.request(
+            requests.get_blocks,
+            from_number,
+            count,
+            schema=requests.BLOCKS_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    async def get_requirements_pending(
+        self, min_cert: int, timeout: Optional[float] = None
+    ) -> dict:
+        """
+        Return the requirements of the pending identities with min_cert certifications
+
+        :param min_cert: Minimum count of pending certifications
+        :param timeout: Timeout in seconds (optional, default client timeout)
+        :return:
+        """
+        return await self.request(
+            requests.get_requirements_pending,
+            min_cert,
+            schema=requests.REQUIREMENTS_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    def must_validate(self, schema: Optional[dict]) -> bool:
+        """
+        Return True if the response must be validated against the schema in the current validation mode
+
+        :param schema: Json Schema of the response or None
+        :return:
+        """
+        if schema is None or self.validation == VALIDATE_OFF:
+            return False
+        if self.validation == VALIDATE_SAMPLED:
+            return random.random() < self.validation_sample_rate
+        return True
+
+    def _next_request_id(self) -> str:
+        """
+        Return a request id unique among the pending requests
+
+        :return:
+        """
+        request_id = "{0:08x}".format(next(self._request_ids) % 2**32)
+        while request_id in self.pending:
+            request_id = "{0:08x}".format(next(self._request_ids) % 2**32)
+        return request_id
+
+    async def _read(self) -> None:
+        """
+        Read the messages of the connection until it is closed
+
+        :return:
+        """
+        error = ConnectionError("WS2P client closed")
+        try:
+            while True:
+                ws_message = await self.ws.receive()
+                if ws_message.type in CLOSE_MESSAGE_TYPES:
+                    error = ConnectionError("WS2P connection closed by the peer")
+                    break
+                if ws_message.type == WSMsgType.ERROR:
+                    error = ConnectionError(
+                        "WS2P connection lost: {0}".format(ws_message.data)
+                    )
+                    error.__cause__ = ws_message.data
+                    break
+                if ws_message.type != WSMsgType.TEXT:
+                    logger.debug("Ignored %s message", ws_message.type.name)
+                    continue
+                try:
+                    message = json.loads(ws_message.data)
+                except json.decoder.JSONDecodeError:
+                    logger.debug("Invalid json message: %s", ws_message.data)
+                    continue
+                self._dispatch(message)
+        except CONNECTION_ERRORS as exception:
+            error = ConnectionError("WS2P connection lost: {0}".format(exception))
+            error.__cause__ = exception
+        finally:
+            self._fail(error)
+
+    def _dispatch(self, message: Any) -> None:
+        """
+        Route a response to its request, or push a message to the subscribers
+
+        :param message: Parsed json message
+        :return:
+        """
+        if isinstance(message, dict) and "resId" in message:
+            future = self.pending.get(message["resId"])
+            if future is None or future.done():
+                logger.debug("Response to unknown request %s", message["resId"])
+            else:
+                future.set_result(message)
+            return
+
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def _fail(self, error: Exception) -> None:
+        """
+        Mark the client as closed, fail the pending requests and notify the subscribers
+
+        :param error: Exception set on the pending requests
+        :return:
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
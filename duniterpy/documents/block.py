@@ -18,7 +18,17 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import base64
 import hashlib
 import re
-from typing import TypeVar, Type, Optional, List, Sequence
+from typing import (
+    TypeVar,
+    Type,
+    Optional,
+    List,
+    Sequence,
+    Dict,
+    Any,
+    Callable,
+    Tuple,
+)
 from .block_uid import BlockUID
 from .certification import Certification
 from .revocation import Revocation
@@ -26,13 +36,98 @@ from .identity import Identity
 from .document import Document, MalformedDocumentError
 from .membership import Membership
 from .transaction import Transaction
-from ..constants import PUBKEY_REGEX, BLOCK_HASH_REGEX
+from ..constants import PUBKEY_REGEX, BLOCK_HASH_REGEX, SIGNATURE_REGEX
 
 
 # required to type hint cls in classmethod
 BlockType = TypeVar("BlockType", bound="Block")
 
 
+def raw_block_documents(name: str, context: tuple, span: Tuple[int, int]) -> list:
+    """
+    Return the sub-documents instances of a section of a raw block document
+
+    :param name: Name of the section attribute
+    :param context: Tuple (version, currency, previous hash, signed raw document) of the block
+    :param span: Offsets (start, end) of the section entries in the document
+    :return:
+    """
+    version, currency, prev_hash, signed_raw = context
+    start, end = span
+    if start == end:
+        return []
+    entries = signed_raw[start:end].splitlines(True)
+    if name == "identities":
+        return [Identity.from_inline(version, currency, i) for i in entries]
+    if name in ("joiners", "actives", "leavers"):
+        membership_type = "OUT" if name == "leavers" else "IN"
+        return [
+            Membership.from_inline(version, currency, membership_type, i)
+            for i in entries
+        ]
+    if name == "revoked":
+        return [Revocation.from_inline(version, currency, i) for i in entries]
+    if name == "certifications":
+        return [
+            Certification.from_inline(version, currency, prev_hash, i) for i in entries
+        ]
+
+    transactions = []
+    n = 0
+    while n < len(entries):
+        header_data = Transaction.re_header.match(entries[n])
+        if header_data is None:
+            raise MalformedDocumentError("Compact transaction ({0})".format(entries[n]))
+        issuers_num = int(header_data.group(2))
+        inputs_num = int(header_data.group(3))
+        unlocks_num = int(header_data.group(4))
+        outputs_num = int(header_data.group(5))
+        has_comment = int(header_data.group(6))
+        sup_lines = 2
+        tx_max = (
+            n
+            + sup_lines
+            + issuers_num * 2
+            + inputs_num
+            + unlocks_num
+            + outputs_num
+            + has_comment
+        )
+        transactions.append(
+            Transaction.from_compact(currency, "".join(entries[n:tx_max]))
+        )
+        n = tx_max
+    return transactions
+
+
+def json_block_documents(name: str, context: tuple, entries: list) -> list:
+    """
+    Return the sub-documents instances of a section of a parsed json block
+
+    :param name: Name of the section attribute
+    :param context: Tuple (version, currency, inner hash) of the block
+    :param entries: Parsed json entries of the section
+    :return:
+    """
+    version, currency, inner_hash = context
+    if name == "identities":
+        return [Identity.from_inline(version, currency, i + "\n") for i in entries]
+    if name in ("joiners", "actives", "leavers"):
+        membership_type = "OUT" if name == "leavers" else "IN"
+        return [
+            Membership.from_inline(version, currency, membership_type, i + "\n")
+            for i in entries
+        ]
+    if name == "revoked":
+        return [Revocation.from_inline(version, currency, i + "\n") for i in entries]
+    if name == "certifications":
+        return [
+            Certification.from_inline(version, currency, inner_hash, i + "\n")
+            for i in entries
+        ]
+    return [Transaction.from_bma_history(currency, i) for i in entries]
+
+
 class Block(Document):
     """
     The class Block handles Block documents.
@@ -117,6 +212,50 @@ class Block(Document):
     )
     re_nonce = re.compile("Nonce: ([0-9]+)\n")
 
+    # sections of the block document in order: attribute name => field name
+    sections = {
+        "identities": "Identities",
+        "joiners": "Joiners",
+        "actives": "Actives",
+        "leavers": "Leavers",
+        "revoked": "Revoked",
+        "excluded": "Excluded",
+        "certifications": "Certifications",
+        "transactions": "Transactions",
+    }
+    # attribute name => header line of the section, with the line feed of the previous line
+    sections_headers = {
+        name: "\n{0}:\n".format(field_name) for name, field_name in sections.items()
+    }
+    # fields from Version to MembersCount
+    re_header = re.compile(
+        "Version: (?P<version>[0-9]+)\n"
+        "Type: Block\n"
+        "Currency: (?P<currency>[^\n]+)\n"
+        "Number: (?P<number>[0-9]+)\n"
+        "PoWMin: (?P<powmin>[0-9]+)\n"
+        "Time: (?P<time>[0-9]+)\n"
+        "MedianTime: (?P<mediantime>[0-9]+)\n"
+        "(?:UniversalDividend: (?P<ud>[0-9]+)\n)?"
+        "UnitBase: (?P<unit_base>[0-9]+)\n"
+        "Issuer: (?P<issuer>{pubkey_regex})\n"
+        "IssuersFrame: (?P<issuers_frame>[0-9]+)\n"
+        "IssuersFrameVar: (?P<issuers_frame_var>0|-?[1-9]\\d{{0,18}})\n"
+        "DifferentIssuersCount: (?P<different_issuers_count>[0-9]+)\n"
+        "(?:PreviousHash: (?P<prev_hash>{block_hash_regex})\n"
+        "PreviousIssuer: (?P<prev_issuer>{pubkey_regex})\n)?"
+        "(?P<parameters>Parameters: [^\n]*\n)?"
+        "MembersCount: (?P<members_count>[0-9]+)\n".format(
+            pubkey_regex=PUBKEY_REGEX, block_hash_regex=BLOCK_HASH_REGEX
+        )
+    )
+    # fields from InnerHash to Signature
+    re_footer = re.compile(
+        "InnerHash: ({block_hash_regex})\nNonce: ([0-9]+)\n({signature_regex})\n".format(
+            block_hash_regex=BLOCK_HASH_REGEX, signature_regex=SIGNATURE_REGEX
+        )
+    )
+
     fields_parsers = {
         **Document.fields_parsers,
         **{
@@ -247,18 +386,30 @@ class Block(Document):
         self.transactions = transactions
         self.inner_hash = inner_hash
         self.nonce = nonce
+        # sub-documents lists not built yet (see set_pending_documents)
+        self._pending_documents = None  # type: Optional[tuple]
 
     @property
     def blockUID(self) -> BlockUID:
         return BlockUID(self.number, self.proof_of_work())
 
     @classmethod
-    def from_parsed_json(cls: Type[BlockType], parsed_json_block: dict) -> BlockType:
-        """return a block from the python structure produced when parsing json"""
+    def from_parsed_json(
+        cls: Type[BlockType], parsed_json_block: dict, lazy: bool = False
+    ) -> BlockType:
+        """
+        Return a block from the python structure produced when parsing json
+
+        If lazy is True, the sub-documents (identities, memberships, revocations,
+        certifications and transactions) are only built on first access of the attribute.
+
+        :param parsed_json_block: Parsed json block
+        :param lazy: Build sub-documents on first access (optional, default False)
+        :return:
+        """
         b = parsed_json_block  # alias for readability
-        version = b["version"]
-        currency = b["currency"]
-        arguments = {  # arguments used to create block
+        # arguments used to create block
+        arguments = {  # type: Dict[str, Any]
             "version": b["version"],
             "currency": b["currency"],
             "number": b["number"],
@@ -275,14 +426,7 @@ class Block(Document):
             "prev_issuer": b["previousIssuer"],
             "parameters": b["parameters"],
             "members_count": b["membersCount"],
-            "identities": b["identities"],
-            "joiners": b["joiners"],
-            "actives": b["actives"],
-            "leavers": b["leavers"],
-            "revokations": b["revoked"],
             "excluded": b["excluded"],
-            "certifications": b["certifications"],
-            "transactions": b["transactions"],
             "inner_hash": b["inner_hash"],
             "nonce": b["nonce"],
             "signature": b["signature"],
@@ -290,48 +434,200 @@ class Block(Document):
         # parameters: Optional[Sequence[str]]
         if arguments["parameters"]:
             arguments["parameters"] = arguments["parameters"].split(":")
-        # identities: List[Identity]
-        arguments["identities"] = [
-            Identity.from_inline(version, currency, i + "\n")
-            for i in arguments["identities"]
-        ]
-        # joiners: List[Membership]
-        arguments["joiners"] = [
-            Membership.from_inline(version, currency, "IN", i + "\n")
-            for i in arguments["joiners"]
-        ]
-        # actives: List[Membership]
-        arguments["actives"] = [
-            Membership.from_inline(version, currency, "IN", i + "\n")
-            for i in arguments["actives"]
-        ]
-        # leavers: List[Membership]
-        arguments["leavers"] = [
-            Membership.from_inline(version, currency, "OUT", i + "\n")
-            for i in arguments["leavers"]
-        ]
-        # revokations: List[Revocation]
-        arguments["revokations"] = [
-            Revocation.from_inline(version, currency, i + "\n")
-            for i in arguments["revokations"]
-        ]
-        # certifications: List[Certification]
-        arguments["certifications"] = [
-            Certification.from_inline(
-                version, currency, arguments["inner_hash"], i + "\n"
-            )
-            for i in arguments["certifications"]
-        ]
-        # transactions: List[Transaction]
-        arguments["transactions"] = [
-            Transaction.from_bma_history(currency, i) for i in arguments["transactions"]
-        ]
+
+        # sub-documents entries by attribute name
+        entries = {name: b[name] for name in cls.sections if name != "excluded"}
+        context = (b["version"], b["currency"], b["inner_hash"])
+        if lazy:
+            documents = {name: [] for name in entries}  # type: Dict[str, list]
+        else:
+            documents = {
+                name: json_block_documents(name, context, name_entries)
+                for name, name_entries in entries.items()
+            }
+        arguments.update(documents)
+        # the revoked attribute is set from the revokations argument
+        arguments["revokations"] = arguments.pop("revoked")
 
         # now that the arguments are ready, return the block
-        return cls(**arguments)
+        block = cls(**arguments)
+
+        if lazy:
+            block.set_pending_documents(json_block_documents, context, entries)
+
+        return block
 
     @classmethod
-    def from_signed_raw(cls: Type[BlockType], signed_raw: str) -> BlockType:
+    def from_signed_raw(
+        cls: Type[BlockType], signed_raw: str, lazy: bool = False
+    ) -> BlockType:
+        """
+        Return Block instance from signed raw document
+
+        The document is tokenized once: the header fields are matched by one regular expression,
+        then each section is located by its header line and kept as (start, end) offsets
+        into the document, up to the InnerHash line of the footer.
+        If lazy is True, the sub-documents of a section (identities, memberships, revocations,
+        certifications and transactions) are only built on first access of the attribute,
+        from the offsets of the section.
+
+        :param signed_raw: Signed raw document
+        :param lazy: Build sub-documents on first access (optional, default False)
+        :return:
+        """
+        (
+            version,
+            currency,
+            number,
+            powmin,
+            time,
+            mediantime,
+            ud,
+            unit_base,
+            issuer,
+            issuers_frame,
+            issuers_frame_var,
+            different_issuers_count,
+            prev_hash,
+            prev_issuer,
+            parameters,
+            members_count,
+            offset,
+        ) = Block.parse_raw_header(signed_raw)
+
+        # offsets of the sections headers lines, located in order from the end
+        # of the MembersCount line (transactions is the last section)
+        starts = []  # type: List[int]
+        index = offset - 1
+        for name, header in Block.sections_headers.items():
+            index = signed_raw.find(header, index)
+            if index < 0:
+                raise MalformedDocumentError(Block.sections[name])
+            starts.append(index + 1)
+            # the final line feed of the header starts the search of the next one
+            index += len(header) - 1
+
+        # the footer starts at the last InnerHash line, extra lines can follow it
+        footer = signed_raw.rfind("\nInnerHash: ", index) + 1
+        if footer == 0:
+            raise MalformedDocumentError("InnerHash")
+
+        # section name => offsets (start, end) of the section entries
+        spans = {}  # type: Dict[str, Tuple[int, int]]
+        ends = starts[1:] + [footer]
+        for (name, header), start, end in zip(
+            Block.sections_headers.items(), starts, ends
+        ):
+            spans[name] = (start + len(header) - 1, end)
+
+        footer_match = Block.re_footer.match(signed_raw, footer)
+        if footer_match is None:
+            # parse each line to raise the error of the invalid field
+            lines = signed_raw[footer:].splitlines(True) + ["", ""]
+            Block.parse_field("InnerHash", lines[0])
+            Block.parse_field("Nonce", lines[1])
+            Block.parse_field("Signature", lines[2])
+            raise MalformedDocumentError("Signature")
+        inner_hash = footer_match.group(1)
+        nonce = int(footer_match.group(2))
+        signature = footer_match.group(3)
+
+        excluded = []
+        start, end = spans.pop("excluded")
+        for line in signed_raw[start:end].splitlines(True):
+            exclusion_match = Block.re_exclusion.match(line)
+            if exclusion_match is not None:
+                excluded.append(exclusion_match.group(1))
+
+        # common context of the sub-documents
+        context = (version, currency, prev_hash, signed_raw)
+
+        if lazy:
+            documents = {name: [] for name in spans}  # type: Dict[str, List[Any]]
+        else:
+            documents = {
+                name: raw_block_documents(name, context, span)
+                for name, span in spans.items()
+            }
+
+        block = cls(
+            version,
+            currency,
+            number,
+            powmin,
+            time,
+            mediantime,
+            ud,
+            unit_base,
+            issuer,
+            issuers_frame,
+            issuers_frame_var,
+            different_issuers_count,
+            prev_hash,
+            prev_issuer,
+            parameters,
+            members_count,
+            documents["identities"],
+            documents["joiners"],
+            documents["actives"],
+            documents["leavers"],
+            documents["revoked"],
+            excluded,
+            documents["certifications"],
+            documents["transactions"],
+            inner_hash,
+            nonce,
+            signature,
+        )
+
+        if lazy:
+            block.set_pending_documents(raw_block_documents, context, spans)
+
+        return block
+
+    @staticmethod
+    def parse_raw_header(signed_raw: str) -> tuple:
+        """
+        Return the header fields of a raw block document, followed by the offset of its end
+
+        The fields are matched at once by re_header. If it fails, the header is parsed
+        line by line to raise the MalformedDocumentError of the invalid field.
+
+        :param signed_raw: Signed raw document
+        :return:
+        """
+        header_match = Block.re_header.match(signed_raw)
+        if header_match is not None:
+            fields = header_match.groupdict()
+            number = int(fields["number"])
+            parameters_match = None
+            if fields["parameters"] is not None:
+                parameters_match = Block.re_parameters.match(fields["parameters"])
+            # the previous block fields are only in the blocks after the block zero,
+            # the parameters only in the block zero
+            if (fields["prev_hash"] is None) == (number == 0) and (
+                parameters_match is not None
+            ) == (number == 0):
+                return (
+                    int(fields["version"]),
+                    fields["currency"],
+                    number,
+                    int(fields["powmin"]),
+                    int(fields["time"]),
+                    int(fields["mediantime"]),
+                    None if fields["ud"] is None else int(fields["ud"]),
+                    int(fields["unit_base"]),
+                    fields["issuer"],
+                    fields["issuers_frame"],
+                    fields["issuers_frame_var"],
+                    fields["different_issuers_count"],
+                    fields["prev_hash"],
+                    fields["prev_issuer"],
+                    None if parameters_match is None else parameters_match.groups(),
+                    int(fields["members_count"]),
+                    header_match.end(),
+                )
+
         lines = signed_raw.splitlines(True)
         n = 0
 
@@ -358,7 +654,6 @@ class Block(Document):
 
         ud_match = Block.re_universaldividend.match(lines[n])
         ud = None
-        unit_base = 0
         if ud_match is not None:
             ud = int(Block.parse_field("UD", lines[n]))
             n += 1
@@ -393,113 +688,13 @@ class Block(Document):
                     raise MalformedDocumentError("Parameters")
                 parameters = params_match.groups()
                 n += 1
-            except AttributeError:
+            except (AttributeError, IndexError):
                 raise MalformedDocumentError("Parameters") from AttributeError
 
         members_count = int(Block.parse_field("MembersCount", lines[n]))
         n += 1
 
-        identities = []
-        joiners = []
-        actives = []
-        leavers = []
-        revoked = []
-        excluded = []
-        certifications = []
-        transactions = []
-
-        if Block.re_identities.match(lines[n]) is not None:
-            n += 1
-            while Block.re_joiners.match(lines[n]) is None:
-                selfcert = Identity.from_inline(version, currency, lines[n])
-                identities.append(selfcert)
-                n += 1
-
-        if Block.re_joiners.match(lines[n]):
-            n += 1
-            while Block.re_actives.match(lines[n]) is None:
-                membership = Membership.from_inline(version, currency, "IN", lines[n])
-                joiners.append(membership)
-                n += 1
-
-        if Block.re_actives.match(lines[n]):
-            n += 1
-            while Block.re_leavers.match(lines[n]) is None:
-                membership = Membership.from_inline(version, currency, "IN", lines[n])
-                actives.append(membership)
-                n += 1
-
-        if Block.re_leavers.match(lines[n]):
-            n += 1
-            while Block.re_revoked.match(lines[n]) is None:
-                membership = Membership.from_inline(version, currency, "OUT", lines[n])
-                leavers.append(membership)
-                n += 1
-
-        if Block.re_revoked.match(lines[n]):
-            n += 1
-            while Block.re_excluded.match(lines[n]) is None:
-                revokation = Revocation.from_inline(version, currency, lines[n])
-                revoked.append(revokation)
-                n += 1
-
-        if Block.re_excluded.match(lines[n]):
-            n += 1
-            while Block.re_certifications.match(lines[n]) is None:
-                exclusion_match = Block.re_exclusion.match(lines[n])
-                if exclusion_match is not None:
-                    exclusion = exclusion_match.group(1)
-                    excluded.append(exclusion)
-                n += 1
-
-        if Block.re_certifications.match(lines[n]):
-            n += 1
-            while Block.re_transactions.match(lines[n]) is None:
-                certification = Certification.from_inline(
-                    version, currency, prev_hash, lines[n]
-                )
-                certifications.append(certification)
-                n += 1
-
-        if Block.re_transactions.match(lines[n]):
-            n += 1
-            while not Block.re_hash.match(lines[n]):
-                tx_lines = ""
-                header_data = Transaction.re_header.match(lines[n])
-                if header_data is None:
-                    raise MalformedDocumentError(
-                        "Compact transaction ({0})".format(lines[n])
-                    )
-                issuers_num = int(header_data.group(2))
-                inputs_num = int(header_data.group(3))
-                unlocks_num = int(header_data.group(4))
-                outputs_num = int(header_data.group(5))
-                has_comment = int(header_data.group(6))
-                sup_lines = 2
-                tx_max = (
-                    n
-                    + sup_lines
-                    + issuers_num * 2
-                    + inputs_num
-                    + unlocks_num
-                    + outputs_num
-                    + has_comment
-                )
-                for index in range(n, tx_max):
-                    tx_lines += lines[index]
-                n += tx_max - n
-                transaction = Transaction.from_compact(currency, tx_lines)
-                transactions.append(transaction)
-
-        inner_hash = Block.parse_field("InnerHash", lines[n])
-        n += 1
-
-        nonce = int(Block.parse_field("Nonce", lines[n]))
-        n += 1
-
-        signature = Block.parse_field("Signature", lines[n])
-
-        return cls(
+        return (
             version,
             currency,
             number,
@@ -516,19 +711,51 @@ class Block(Document):
             prev_issuer,
             parameters,
             members_count,
-            identities,
-            joiners,
-            actives,
-            leavers,
-            revoked,
-            excluded,
-            certifications,
-            transactions,
-            inner_hash,
-            nonce,
-            signature,
+            sum(len(line) for line in lines[:n]),
         )
 
+    def set_pending_documents(
+        self, build: Callable[[str, tuple, Any], list], context: tuple, entries: dict
+    ) -> None:
+        """
+        Defer the build of the sub-documents lists until their first access
+
+        :param build: Function returning the documents list from (name, context, entries)
+        :param context: Context passed to the build function
+        :param entries: Dict of attribute name => entries to build the documents from
+        :return:
+        """
+        for name in entries:
+            del self.__dict__[name]
+        self._pending_documents = (build, context, entries)
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Build a pending sub-documents list on first access
+
+        :param name: Attribute name
+        :return:
+        """
+        pending = self.__dict__.get("_pending_documents")
+        if pending is None or name not in pending[2]:
+            raise AttributeError(
+                "'{0}' object has no attribute '{1}'".format(type(self).__name__, name)
+            )
+        build, context, entries = pending
+        documents = build(name, context, entries[name])
+        for document in documents:
+            if self.version < document.version:
+                raise MalformedDocumentError(
+                    "Block version is too low : {0} < {1}".format(
+                        self.version, document.version
+                    )
+                )
+        setattr(self, name, documents)
+        # the remaining entries are copied, as the pending state can be shared by a copy of the block
+        remaining = {key: value for key, value in entries.items() if key != name}
+        self._pending_documents = (build, context, remaining) if remaining else None
+        return documents
+
     def raw(self) -> str:
         doc = """Version: {version}
 Type: Block
@@ -16,10 +16,9 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import re
+import sys
 from typing import TypeVar, List, Any, Type, Optional, Dict, Union, Tuple
 
-import pypeg2
-
 from duniterpy.grammars.output import Condition
 from .block_uid import BlockUID
 from .document import Document, MalformedDocumentError
@@ -70,8 +69,11 @@ class InputSource:
     .. note:: Compact :
         INDEX:SOURCE:FINGERPRINT:AMOUNT
 
+    Instances must not be modified once hashed, as the hash is cached.
     """
 
+    __slots__ = ("amount", "base", "source", "origin_id", "index", "_hash")
+
     re_inline = re.compile(
         "([0-9]+):([0-9]):(?:(?:(D):({pubkey_regex}):({block_id_regex}))|(?:(T):({transaction_hash_regex}):\
 ([0-9]+)))".format(
@@ -99,6 +101,7 @@ class InputSource:
         self.source = source
         self.origin_id = origin_id
         self.index = index
+        self._hash = None  # type: Optional[int]
 
     def __eq__(self, other: Any) -> bool:
         """
@@ -115,7 +118,19 @@ class InputSource:
         )
 
     def __hash__(self) -> int:
-        return hash((self.amount, self.base, self.source, self.origin_id, self.index))
+        if self._hash is None:
+            self._hash = hash(
+                (self.amount, self.base, self.source, self.origin_id, self.index)
+            )
+        return self._hash
+
+    def __getstate__(self) -> tuple:
+        # the cached hash is not valid in another process
+        return self.amount, self.base, self.source, self.origin_id, self.index
+
+    def __setstate__(self, state: tuple) -> None:
+        self.amount, self.base, self.source, self.origin_id, self.index = state
+        self._hash = None
 
     @classmethod
     def from_inline(cls: Type[InputSourceType], inline: str) -> InputSourceType:
@@ -140,7 +155,8 @@ class InputSource:
             origin_id = data.group(5 + source_offset)
             index = int(data.group(6 + source_offset))
 
-        return cls(amount, base, source, origin_id, index)
+        # pubkeys and transaction hashes are shared by many sources
+        return cls(amount, base, source, sys.intern(origin_id), index)
 
     def inline(self) -> str:
         """
@@ -160,8 +176,12 @@ OutputSourceType = TypeVar("OutputSourceType", bound="OutputSource")
 class OutputSource:
     """
     A Transaction OUTPUT
+
+    Instances must not be modified once hashed, as the hash is cached.
     """
 
+    __slots__ = ("amount", "base", "condition", "_hash")
+
     re_inline = re.compile("([0-9]+):([0-9]):(.*)")
 
     def __init__(self, amount: int, base: int, condition: str) -> None:
@@ -175,6 +195,7 @@ class OutputSource:
         self.amount = amount
         self.base = base
         self.condition = self.condition_from_text(condition)
+        self._hash = None  # type: Optional[int]
 
     def __eq__(self, other: Any) -> bool:
         """
@@ -189,7 +210,17 @@ class OutputSource:
         )
 
     def __hash__(self) -> int:
-        return hash((self.amount, self.base, self.condition))
+        if self._hash is None:
+            self._hash = hash((self.amount, self.base, self.condition))
+        return self._hash
+
+    def __getstate__(self) -> tuple:
+        # the cached hash is not valid in another process
+        return self.amount, self.base, self.condition
+
+    def __setstate__(self, state: tuple) -> None:
+        self.amount, self.base, self.condition = state
+        self._hash = None
 
     @classmethod
     def from_inline(cls: Type[OutputSourceType], inline: str) -> OutputSourceType:
@@ -215,7 +246,7 @@ class OutputSource:
         :return:
         """
         return "{0}:{1}:{2}".format(
-            self.amount, self.base, pypeg2.compose(self.condition, output.Condition)
+            self.amount, self.base, output.compose_condition(self.condition)
         )
 
     def inline_condition(self) -> str:
@@ -224,18 +255,20 @@ class OutputSource:
 
         :return:
         """
-        return pypeg2.compose(self.condition, output.Condition)
+        return output.compose_condition(self.condition)
 
     @staticmethod
     def condition_from_text(text) -> Condition:
         """
         Return a Condition instance with PEG grammar from text
 
+        Parsed conditions are frozen and shared between outputs with the same condition text.
+
         :param text: PEG parsable string
         :return:
         """
         try:
-            condition = pypeg2.parse(text, output.Condition)
+            condition = output.intern_condition(text)
         except SyntaxError:
             # Invalid conditions are possible, see https://github.com/duniter/duniter/issues/1156
             # In such a case, they are store as empty PEG grammar object and considered unlockable
@@ -252,6 +285,8 @@ class SIGParameter:
     A Transaction UNLOCK SIG parameter
     """
 
+    __slots__ = ("index",)
+
     re_sig = re.compile("SIG\\(([0-9]+)\\)")
 
     def __init__(self, index: int) -> None:
@@ -308,6 +343,8 @@ class XHXParameter:
     A Transaction UNLOCK XHX parameter
     """
 
+    __slots__ = ("integer",)
+
     re_xhx = re.compile("XHX\\(([0-9]+)\\)")
 
     def __init__(self, integer: int) -> None:
@@ -397,6 +434,8 @@ class Unlock:
     A Transaction UNLOCK
     """
 
+    __slots__ = ("index", "parameters")
+
     re_inline = re.compile("([0-9]+):((?:SIG\\([0-9]+\\)|XHX\\([0-9]+\\)|\\s)+)")
 
     def __init__(
@@ -417,15 +456,10 @@ class Unlock:
         """
         if not isinstance(other, Unlock):
             return NotImplemented
-
-        params_equals = True
-        for spar, opar in zip(self.parameters, other.parameters):
-            if spar != opar:
-                params_equals = False
-        return self.index == other.index and params_equals
+        return self.index == other.index and self.parameters == other.parameters
 
     def __hash__(self) -> int:
-        return hash((self.index, self.parameters))
+        return hash((self.index, tuple(self.parameters)))
 
     @classmethod
     def from_inline(cls: Type[UnlockType], inline: str) -> UnlockType:
@@ -976,7 +1010,7 @@ class SimpleTransaction(Transaction):
             if getattr(o.condition, "right", None):
                 simple = False
                 # if left is not SIG...
-            elif type(o.condition.left) is not output.SIG:
+            elif not isinstance(o.condition.left, output.SIG):
                 simple = False
 
         return simple
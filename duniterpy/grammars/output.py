@@ -15,12 +15,16 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import Optional, TypeVar, Type, Any, Union
+from functools import lru_cache
+from typing import Optional, TypeVar, Type, Any, Union, Tuple
 
 from pypeg2 import re, attr, Keyword, Enum, contiguous, maybe_some, whitespace, K
 
 from ..constants import PUBKEY_REGEX, HASH_REGEX
 
+# parsed conditions kept by intern_condition()
+CONDITIONS_CACHE_SIZE = 4096
+
 
 class Pubkey(str):
     """
@@ -349,14 +353,14 @@ class Condition:
         if not isinstance(other, Condition):
             return NotImplemented
         return (
-            self.value == other.value
+            condition_value(self) == condition_value(other)
             and self.left == other.left
             and self.right == other.right
             and self.op == other.op
         )
 
     def __hash__(self) -> int:
-        return hash((self.value, self.left, self.right, self.op))
+        return hash((condition_value(self), self.left, self.right, self.op))
 
     def __str__(self) -> str:
         return self.value
@@ -392,7 +396,7 @@ class Condition:
         :param grammar: Grammar
         :param attr_of: Attribute of...
         """
-        if type(self.left) is Condition:
+        if isinstance(self.left, Condition):
             left = "({0})".format(
                 parser.compose(self.left, grammar=grammar, attr_of=attr_of)
             )
@@ -401,7 +405,7 @@ class Condition:
 
         if getattr(self, "op", None):
 
-            if type(self.right) is Condition:
+            if isinstance(self.right, Condition):
                 right = "({0})".format(
                     parser.compose(self.right, grammar=grammar, attr_of=attr_of)
                 )
@@ -423,3 +427,241 @@ Condition.grammar = contiguous(
         attr("right", [SIG, XHX, CSV, CLTV, ("(", Condition, ")")]),
     ),
 )
+
+
+# Hand-written parser and composer of the grammar above
+#
+# They give the same results as pypeg2.parse(text, Condition) and
+# pypeg2.compose(condition, Condition), pypeg2 being kept as the reference grammar:
+# - function arguments are words (\w+), pypeg2 ignoring the regex of str subclasses
+# - operators are surrounded by at least one whitespace character
+# - with chained operators, op and right are the last ones
+#   and value is the list of the whitespace strings around the operators
+
+SIG_CONDITION_REGEX = re.compile(r"\s*SIG\((\w+)\)\s*\Z")
+WORD_REGEX = re.compile(r"\w+")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+FUNCTIONS = (
+    ("SIG(", SIG, "pubkey", Pubkey),
+    ("XHX(", XHX, "sha_hash", Hash),
+    ("CSV(", CSV, "time", Int),
+    ("CLTV(", CLTV, "timestamp", Int),
+)
+OPERATORS = {keyword: Operator(keyword) for keyword in ("&&", "||", "AND", "OR")}
+
+
+def _parse_operand(text: str, pos: int) -> Optional[Tuple[Any, int]]:
+    """
+    Parse a function or a parenthesized condition at pos, return it with its end or None
+
+    :param text: Condition text
+    :param pos: Start position
+    :return:
+    """
+    for prefix, function_type, name, argument_type in FUNCTIONS:
+        if text.startswith(prefix, pos):
+            match = WORD_REGEX.match(text, pos + len(prefix))
+            if match is None or not text.startswith(")", match.end()):
+                return None
+            function = function_type()
+            setattr(function, name, argument_type(match.group()))
+            return function, match.end() + 1
+
+    if text.startswith("(", pos):
+        result = _parse_condition(text, pos + 1)
+        if result is None or not text.startswith(")", result[1]):
+            return None
+        return result[0], result[1] + 1
+    return None
+
+
+def _parse_condition(text: str, pos: int) -> Optional[Tuple[Condition, int]]:
+    """
+    Parse a condition at pos, return it with its end or None
+
+    :param text: Condition text
+    :param pos: Start position
+    :return:
+    """
+    operand = _parse_operand(text, pos)
+    if operand is None:
+        return None
+    condition = Condition()
+    condition.left, pos = operand
+
+    spaces = []
+    while True:
+        before = WHITESPACE_REGEX.match(text, pos)
+        if before is None:
+            break
+        keyword = Operator.regex.match(text, before.end())
+        if keyword is None or keyword.group() not in OPERATORS:
+            break
+        after = WHITESPACE_REGEX.match(text, keyword.end())
+        if after is None:
+            break
+        operand = _parse_operand(text, after.end())
+        if operand is None:
+            break
+        condition.op = OPERATORS[keyword.group()]
+        condition.right, pos = operand
+        spaces += [before.group(), after.group()]
+
+    if spaces:
+        condition.value = spaces  # type: ignore
+    return condition, pos
+
+
+def parse_condition(text: str) -> Condition:
+    """
+    Return a Condition instance from text
+
+    Raise SyntaxError if text is not a valid condition.
+
+    :param text: Condition text
+    :return:
+    """
+    # most conditions are a single signature
+    match = SIG_CONDITION_REGEX.match(text)
+    if match is not None:
+        sig = SIG()
+        sig.pubkey = Pubkey(match.group(1))
+        return Condition.token(sig)
+
+    space = WHITESPACE_REGEX.match(text)
+    result = _parse_condition(text, 0 if space is None else space.end())
+    if result is not None:
+        condition, end = result
+        space = WHITESPACE_REGEX.match(text, end)
+        if (end if space is None else space.end()) == len(text):
+            return condition
+    raise SyntaxError("Invalid condition: {0!r}".format(text))
+
+
+def condition_value(condition: Condition) -> Any:
+    """
+    Return the value of the condition, as a tuple if it is the list of the whitespaces around operators
+
+    :param condition: Condition instance
+    :return:
+    """
+    value = condition.value
+    return tuple(value) if isinstance(value, list) else value
+
+
+class Frozen:
+    """
+    Immutable node of a condition tree returned by freeze()
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            "Frozen {0} can not be modified".format(type(self).__name__)
+        )
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(
+            "Frozen {0} can not be modified".format(type(self).__name__)
+        )
+
+
+class FrozenSIG(Frozen, SIG):
+    """
+    Immutable SIG function
+    """
+
+
+class FrozenCSV(Frozen, CSV):
+    """
+    Immutable CSV function
+    """
+
+
+class FrozenCLTV(Frozen, CLTV):
+    """
+    Immutable CLTV function
+    """
+
+
+class FrozenXHX(Frozen, XHX):
+    """
+    Immutable XHX function
+    """
+
+
+class FrozenCondition(Frozen, Condition):
+    """
+    Immutable Condition expression
+    """
+
+
+# class of the frozen nodes by class of the nodes
+FROZEN_CLASSES = {
+    SIG: FrozenSIG,
+    CSV: FrozenCSV,
+    CLTV: FrozenCLTV,
+    XHX: FrozenXHX,
+    Condition: FrozenCondition,
+}
+
+
+def freeze(node: Any) -> Any:
+    """
+    Make a condition tree immutable and return it
+
+    The nodes become instances of the Frozen subclass of their class,
+    setting one of their attributes raises AttributeError.
+
+    :param node: Condition instance or a function of the condition
+    :return:
+    """
+    if isinstance(node, Condition):
+        freeze(node.left)
+        freeze(node.right)
+        node.value = condition_value(node)
+    frozen_class = FROZEN_CLASSES.get(type(node))
+    if frozen_class is not None:
+        node.__class__ = frozen_class
+    return node
+
+
+@lru_cache(maxsize=CONDITIONS_CACHE_SIZE)
+def intern_condition(text: str) -> Condition:
+    """
+    Return the immutable Condition instance of text, shared with all the callers using the same text
+
+    The tree is frozen (see freeze()), use parse_condition() to get a tree to modify.
+    Raise SyntaxError if text is not a valid condition.
+
+    :param text: Condition text
+    :return:
+    """
+    return freeze(parse_condition(text))
+
+
+def compose_condition(condition: Any) -> str:
+    """
+    Return the condition as string format
+
+    :param condition: Condition instance or a function of the condition
+    :return:
+    """
+    if isinstance(condition, Condition):
+        left = compose_condition(condition.left)
+        if isinstance(condition.left, Condition):
+            left = "({0})".format(left)
+        if not getattr(condition, "op", None):
+            return left
+        right = compose_condition(condition.right)
+        if isinstance(condition.right, Condition):
+            right = "({0})".format(right)
+        return "{0} {1} {2}".format(left, compose_condition(condition.op), right)
+
+    if hasattr(condition, "compose"):
+        return condition.compose()
+    if WORD_REGEX.match(str(condition)) is None:
+        raise ValueError(
+            "{0!r} does not match {1}".format(condition, WORD_REGEX.pattern)
+        )
+    return str(condition)
@@ -0,0 +1,253 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# monetary analytics over a series of blocks, as numpy arrays
+# requires the analytics extra : pip install duniterpy[analytics]
+# example usage :
+# ```
+# from duniterpy.helpers.blockchain import BlockchainStore
+# from duniterpy.helpers.analytics import BlockSeries
+# series = BlockSeries.from_blocks(BlockchainStore(folder).json_blocks())
+# series.save("series.npz")
+# series.monetary_mass()[-1] # current monetary mass in cents
+# series.relative(amounts, numbers) # amounts in universal dividends
+# starts, volumes = series.volumes(86400 * 30) # transactions volume by 30 days period
+# ```
+
+from typing import Any, Iterable, Optional, Tuple, Union
+
+import numpy
+
+from ..documents import Block
+
+# columns of the series, stored as int64 arrays, in init arguments order
+COLUMNS = (
+    "number",
+    "mediantime",
+    "ud",
+    "unit_base",
+    "members_count",
+    "transactions_count",
+    "outputs_amount",
+)
+
+
+class BlockSeries:
+    """
+    Columns of block values, one row per block
+
+    Amounts are in cents. ud is the dividend amount of the block in its unit base, 0 without dividend.
+    outputs_amount is the sum of the transactions outputs of the block, change outputs included.
+    """
+
+    def __init__(
+        self,
+        number: Any,
+        mediantime: Any,
+        ud: Any,
+        unit_base: Any,
+        members_count: Any,
+        transactions_count: Any,
+        outputs_amount: Any,
+    ) -> None:
+        """
+        Init BlockSeries instance from columns arrays
+
+        :param number: Block numbers
+        :param mediantime: Median times
+        :param ud: Dividend amounts in unit base, 0 without dividend
+        :param unit_base: Unit bases
+        :param members_count: Members counts
+        :param transactions_count: Transactions counts
+        :param outputs_amount: Transactions outputs amounts in cents
+        """
+        self.number = numpy.asarray(number, dtype=numpy.int64)
+        self.mediantime = numpy.asarray(mediantime, dtype=numpy.int64)
+        self.ud = numpy.asarray(ud, dtype=numpy.int64)
+        self.unit_base = numpy.asarray(unit_base, dtype=numpy.int64)
+        self.members_count = numpy.asarray(members_count, dtype=numpy.int64)
+        self.transactions_count = numpy.asarray(transactions_count, dtype=numpy.int64)
+        self.outputs_amount = numpy.asarray(outputs_amount, dtype=numpy.int64)
+
+    def __len__(self) -> int:
+        return len(self.number)
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[Union[Block, dict]]) -> "BlockSeries":
+        """
+        Return BlockSeries instance from Block instances or parsed json blocks
+
+        Parsed json blocks are read without building the documents.
+
+        :param blocks: Iterable of blocks in order
+        :return:
+        """
+        rows = []
+        for block in blocks:
+            if isinstance(block, dict):
+                outputs = [
+                    output.split(":", 2)
+                    for transaction in block["transactions"]
+                    for output in transaction["outputs"]
+                ]
+                rows.append(
+                    (
+                        block["number"],
+                        block["medianTime"],
+                        block["dividend"] or 0,
+                        block["unitbase"],
+                        block["membersCount"],
+                        len(block["transactions"]),
+                        sum(
+                            int(amount) * 10 ** int(base) for amount, base, _ in outputs
+                        ),
+                    )
+                )
+            else:
+                rows.append(
+                    (
+                        block.number,
+                        block.mediantime,
+                        block.ud or 0,
+                        block.unit_base,
+                        block.members_count,
+                        len(block.transactions),
+                        sum(
+                            output.amount * 10**output.base
+                            for transaction in block.transactions
+                            for output in transaction.outputs
+                        ),
+                    )
+                )
+
+        table = numpy.array(rows, dtype=numpy.int64).reshape(-1, len(COLUMNS))
+        return cls(*table.T)
+
+    def save(self, path: str) -> None:
+        """
+        Save the columns to a numpy .npz file
+
+        :param path: File path
+        :return:
+        """
+        numpy.savez(path, **{name: getattr(self, name) for name in COLUMNS})
+
+    @classmethod
+    def load(cls, path: str) -> "BlockSeries":
+        """
+        Return BlockSeries instance from a file written by save()
+
+        :param path: File path
+        :return:
+        """
+        with numpy.load(path) as data:
+            return cls(**{name: data[name] for name in COLUMNS})
+
+    def dividends(self) -> numpy.ndarray:
+        """
+        Return the dividend value in cents of each block, 0 without dividend
+
+        :return:
+        """
+        return self.ud * 10**self.unit_base
+
+    def current_dividend(self) -> numpy.ndarray:
+        """
+        Return the value in cents of the last dividend at each block, 0 before the first one
+
+        :return:
+        """
+        dividends = self.dividends()
+        # index of the last block with a dividend, carried forward
+        last = numpy.maximum.accumulate(
+            numpy.where(dividends > 0, numpy.arange(len(dividends)), 0)
+        )
+        return dividends[last]
+
+    def monetary_mass(self) -> numpy.ndarray:
+        """
+        Return the monetary mass in cents at each block
+
+        Each dividend creates dividend * members count cents.
+
+        :return:
+        """
+        return numpy.cumsum(self.dividends() * self.members_count)
+
+    def unit_base_changes(self) -> numpy.ndarray:
+        """
+        Return the numbers of the blocks changing the unit base
+
+        :return:
+        """
+        return self.number[1:][numpy.diff(self.unit_base) != 0]
+
+    def positions(self, numbers: Any) -> numpy.ndarray:
+        """
+        Return the row positions of block numbers
+
+        :param numbers: Block number or array of block numbers
+        :return:
+        """
+        positions = numpy.searchsorted(self.number, numbers)
+        if numpy.any(numpy.take(self.number, positions, mode="clip") != numbers):
+            raise ValueError("Block numbers not in the series")
+        return positions
+
+    def relative(self, amounts: Any, numbers: Optional[Any] = None) -> numpy.ndarray:
+        """
+        Return amounts in cents as amounts of universal dividends at block numbers
+
+        :param amounts: Amount or array of amounts in cents
+        :param numbers: Block number or array of block numbers (optional, default last block)
+        :return:
+        """
+        dividends = self.current_dividend()
+        if numbers is None:
+            current = dividends[-1]
+        else:
+            current = dividends[self.positions(numbers)]
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            return numpy.where(current > 0, numpy.divide(amounts, current), numpy.nan)
+
+    def per_period(
+        self, values: numpy.ndarray, period: int
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Return the start times of the periods and the sums of values by period
+
+        Periods are aligned on multiples of period seconds of the median time,
+        which never decreases. Only periods with blocks are returned.
+
+        :param values: Array of values, one per block
+        :param period: Period duration in seconds
+        :return:
+        """
+        periods = self.mediantime // period
+        starts, first_rows = numpy.unique(periods, return_index=True)
+        if len(starts) == 0:
+            return starts, numpy.asarray(values)[:0]
+        return starts * period, numpy.add.reduceat(values, first_rows)
+
+    def volumes(self, period: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Return the start times of the periods and the transactions outputs amount by period
+
+        :param period: Period duration in seconds
+        :return:
+        """
+        return self.per_period(self.outputs_amount, period)
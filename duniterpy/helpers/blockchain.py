@@ -25,15 +25,43 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # b.number # should return 0
 # next(bc).number # should return 1 (and so on)
 # ```
+#
+# for random access, import the chunks once in an indexed store :
+# ```
+# from duniterpy.helpers.blockchain import BlockchainStore
+# store = BlockchainStore.from_chunks(chunks_folder, store_folder)
+# store.block(250004) # gets block without parsing the whole chunk
+# store.blocks(0, 100) # gets blocks iterator from 0 to 99
+# ```
 
 
+import bisect
+import contextlib
 import json
+import mmap
+import os
 import pathlib
+import shutil
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Iterator, List, Optional, Union
+
 from ..documents import Block
 
 CHUNK_SIZE = 250
 DEFAULT_PATH = ".config/duniter/duniter_default/g1/"
 
+# store files: json blocks (one per line), offsets index and hashes index
+STORE_DATA_FILENAME = "blocks.jsonl"
+STORE_OFFSETS_FILENAME = "offsets.idx"
+STORE_HASHES_FILENAME = "hashes.idx"
+HASH_SIZE = 32  # binary size of a block hash
+NUMBER_SIZE = 8  # binary size of a block number in the hashes index
+HASHES_RECORD_SIZE = HASH_SIZE + NUMBER_SIZE
+TMP_SUFFIX = ".tmp"  # suffix of the store folder during an import
+OLD_SUFFIX = ".old"  # suffix of the previous store folder while it is replaced
+
 
 class JsonBlockchain:
     def __init__(self, folder):
@@ -104,9 +132,370 @@ def load_json(path=DEFAULT_PATH):
     return jbc
 
 
-def load(path=DEFAULT_PATH):
+def load(path=DEFAULT_PATH, prefetch=0, max_workers=None):
     """returns an iterator allowing to browse all the blockchain
-    in practice, it will load chunk by chunk and only keep one in memory at a time"""
+    in practice, it will load chunk by chunk and only keep one in memory at a time
+
+    if prefetch > 0, the next prefetch chunks are read and decoded ahead
+    in parallel (see prefetch_blockchain)"""
+    if prefetch > 0:
+        folder = pathlib.Path("~").joinpath(path).expanduser()  # expand path
+        return prefetch_blockchain(folder, prefetch, max_workers)
     jbc = load_json(path)
     bc = Blockchain(jbc)  # convert it to an iterator over blocks
     return bc  # returns
+
+
+def chunk_paths(folder: pathlib.Path) -> Iterator[pathlib.Path]:
+    """
+    Iterate over chunk file paths in order, until a chunk file is missing
+
+    :param folder: Folder of the chunk_*-250.json files
+    :return:
+    """
+    chunk_number = 0
+    while True:
+        path = folder.joinpath(
+            "chunk_" + str(chunk_number) + "-" + str(CHUNK_SIZE) + ".json"
+        )
+        if not path.exists():
+            return
+        yield path
+        chunk_number += 1
+
+
+def decode_chunk(data: bytes) -> List[Block]:
+    """
+    Return the blocks of a json chunk file content
+
+    :param data: Chunk file content
+    :return:
+    """
+    return [Block.from_parsed_json(b) for b in json.loads(data)["blocks"]]
+
+
+def prefetch_blockchain(
+    folder: pathlib.Path, prefetch: int = 4, max_workers: Optional[int] = None
+) -> Iterator[Block]:
+    """
+    Iterate over the blocks of the chunk files of folder, reading and decoding chunks ahead
+
+    Chunk files are read by a pool of prefetch threads, each one handing the content
+    to a process pool for json decoding and Block construction.
+    Blocks are yielded in order and at most prefetch chunks are held in memory ahead.
+
+    :param folder: Folder of the chunk_*-250.json files
+    :param prefetch: Number of chunks loaded ahead (optional, default 4)
+    :param max_workers: Number of decoding processes (optional, default cpu count)
+    :return:
+    """
+    if prefetch < 1:
+        raise ValueError("prefetch must be greater than zero")
+
+    # readers are shut down first, as they wait for decoders results
+    with ProcessPoolExecutor(max_workers=max_workers) as decoders, ThreadPoolExecutor(
+        max_workers=prefetch
+    ) as readers:
+
+        def load_chunk(path: pathlib.Path) -> List[Block]:
+            # read in the thread, decode in a worker process
+            return decoders.submit(decode_chunk, path.read_bytes()).result()
+
+        paths = chunk_paths(folder)
+        futures = deque()  # type: Deque[Future]
+        try:
+            while True:
+                # fill the prefetch buffer
+                for path in paths:
+                    futures.append(readers.submit(load_chunk, path))
+                    if len(futures) >= prefetch:
+                        break
+                if not futures:
+                    break
+                yield from futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+class HashesIndex:
+    """
+    Hashes index of a store, read through mmap
+
+    The index file holds fixed size records (binary block hash, block number),
+    sorted by hash, so a block number is found by binary search without loading the index.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """
+        Open the hashes index file
+
+        :param path: Path of the index file
+        """
+        with contextlib.ExitStack() as stack:
+            self.file = stack.enter_context(open(str(path), "rb"))
+            self.data = None  # type: Optional[mmap.mmap]
+            self.size = path.stat().st_size // HASHES_RECORD_SIZE
+            if self.size > 0:
+                self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            # keep the file open
+            stack.pop_all()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> bytes:
+        """
+        Return the binary hash of the record at index, used by bisect
+
+        :param index: Record index
+        :return:
+        """
+        if not 0 <= index < self.size or self.data is None:
+            raise IndexError(index)
+        start = index * HASHES_RECORD_SIZE
+        return self.data[start : start + HASH_SIZE]
+
+    def get(self, block_hash: bytes) -> Optional[int]:
+        """
+        Return the number of the block with the binary block_hash, or None if not indexed
+
+        :param block_hash: Binary block hash
+        :return:
+        """
+        index = bisect.bisect_left(self, block_hash)
+        if index == self.size or self[index] != block_hash:
+            return None
+        start = index * HASHES_RECORD_SIZE + HASH_SIZE
+        return int.from_bytes(
+            self.data[start : start + NUMBER_SIZE], "little"  # type: ignore
+        )
+
+    def close(self) -> None:
+        """
+        Close the index file
+
+        :return:
+        """
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+
+class BlockchainStore:
+    """
+    Local blockchain store, indexed by block number and block hash
+
+    Blocks are stored as compact json lines in a single data file read through mmap.
+    The offsets index (block number -> offset) and the hashes index (block hash -> number,
+    sorted by hash) are read through mmap too, so the store opens without loading them.
+    Access by number is O(1) and access by hash O(log n), without parsing a whole chunk.
+    """
+
+    def __init__(self, folder: Union[str, pathlib.Path]) -> None:
+        """
+        Open the store in folder
+
+        :param folder: Folder of the store files, as created by from_chunks()
+        """
+        self.folder = pathlib.Path(folder)
+        # the files already opened are closed if one of them fails to open
+        with contextlib.ExitStack() as stack:
+            self.offsets_file = stack.enter_context(
+                open(str(self.folder.joinpath(STORE_OFFSETS_FILENAME)), "rb")
+            )
+            self.offsets_data = stack.enter_context(
+                mmap.mmap(self.offsets_file.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+            # offsets[number] is the start of block number, last entry is the data size
+            self.offsets = memoryview(self.offsets_data).cast("Q")
+            stack.callback(self.offsets.release)
+            self.hashes = HashesIndex(self.folder.joinpath(STORE_HASHES_FILENAME))
+            stack.callback(self.hashes.close)
+            self.file = stack.enter_context(
+                open(str(self.folder.joinpath(STORE_DATA_FILENAME)), "rb")
+            )
+            self.data = None  # type: Optional[mmap.mmap]
+            if self.offsets[-1] > 0:
+                self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            # keep the files open until close()
+            stack.pop_all()
+
+    @classmethod
+    def from_chunks(
+        cls, chunks_folder: Union[str, pathlib.Path], folder: Union[str, pathlib.Path]
+    ) -> "BlockchainStore":
+        """
+        Import Duniter json chunk files into a new store and return it
+
+        Chunks are read once, in order, from chunk_0-250.json until a chunk file is missing.
+        The store files are written in a temporary folder, renamed to folder at the end
+        of the import, so a failed import leaves the folder unchanged and the data file
+        is never replaced without its indexes. A previous store in folder is moved aside
+        then removed once the new store is in place.
+
+        :param chunks_folder: Folder of the chunk_*-250.json files
+        :param folder: Folder of the store files, replaced by the new store
+        :return:
+        """
+        chunks_folder = pathlib.Path(chunks_folder)
+        folder = pathlib.Path(folder)
+        folder.parent.mkdir(parents=True, exist_ok=True)
+        tmp_folder = folder.with_name(folder.name + TMP_SUFFIX)
+        old_folder = folder.with_name(folder.name + OLD_SUFFIX)
+        # remove the leftovers of an interrupted import
+        for leftover in (tmp_folder, old_folder):
+            if leftover.exists():
+                shutil.rmtree(str(leftover))
+        tmp_folder.mkdir()
+
+        paths = {
+            filename: tmp_folder.joinpath(filename)
+            for filename in (
+                STORE_DATA_FILENAME,
+                STORE_HASHES_FILENAME,
+                STORE_OFFSETS_FILENAME,
+            )
+        }
+        try:
+            offsets = array("Q", [0])
+            # hashes index records: binary hash, block number
+            records = []  # type: List[bytes]
+            with open(str(paths[STORE_DATA_FILENAME]), "wb") as data:
+                for path in chunk_paths(chunks_folder):
+                    with open(str(path), encoding="utf-8") as f:
+                        blocks = json.load(f)["blocks"]
+                    for json_block in blocks:
+                        number = len(offsets) - 1
+                        if json_block["number"] != number:
+                            raise ValueError(
+                                "Block {0} found instead of block {1} in {2}".format(
+                                    json_block["number"], number, path
+                                )
+                            )
+                        block_hash = json_block.get("hash")
+                        if block_hash is None:
+                            block_hash = Block.from_parsed_json(
+                                json_block
+                            ).proof_of_work()
+                        records.append(
+                            bytes.fromhex(block_hash)
+                            + number.to_bytes(NUMBER_SIZE, "little")
+                        )
+                        line = json.dumps(json_block, separators=(",", ":")) + "\n"
+                        offsets.append(offsets[-1] + data.write(line.encode("utf-8")))
+
+            records.sort()
+            with open(str(paths[STORE_HASHES_FILENAME]), "wb") as f:
+                f.write(b"".join(records))
+            with open(str(paths[STORE_OFFSETS_FILENAME]), "wb") as f:
+                offsets.tofile(f)
+
+            if folder.exists():
+                os.rename(str(folder), str(old_folder))
+            os.rename(str(tmp_folder), str(folder))
+        finally:
+            if tmp_folder.exists():
+                shutil.rmtree(str(tmp_folder))
+        if old_folder.exists():
+            shutil.rmtree(str(old_folder))
+
+        return cls(folder)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def json_block(self, number: int) -> dict:
+        """
+        Return the parsed json of block number
+
+        :param number: Block number
+        :return:
+        """
+        if not 0 <= number < len(self) or self.data is None:
+            raise IndexError("Block {0} not in store".format(number))
+        return json.loads(
+            self.data[self.offsets[number] : self.offsets[number + 1]].decode("utf-8")
+        )
+
+    def block(self, number: int) -> Block:
+        """
+        Return block number as a duniterpy block document
+
+        :param number: Block number
+        :return:
+        """
+        return Block.from_parsed_json(self.json_block(number))
+
+    def number(self, block_hash: str) -> Optional[int]:
+        """
+        Return the number of the block with block_hash, or None if not in store
+
+        :param block_hash: Block hash (hexadecimal)
+        :return:
+        """
+        try:
+            binary_hash = bytes.fromhex(block_hash)
+        except ValueError:
+            return None
+        return self.hashes.get(binary_hash)
+
+    def block_by_hash(self, block_hash: str) -> Optional[Block]:
+        """
+        Return the block with block_hash, or None if not in store
+
+        :param block_hash: Block hash (hexadecimal)
+        :return:
+        """
+        number = self.number(block_hash)
+        if number is None:
+            return None
+        return self.block(number)
+
+    def json_blocks(self, start: int = 0, end: Optional[int] = None) -> Iterator[dict]:
+        """
+        Iterate over parsed json blocks from start to end (excluded)
+
+        :param start: First block number (optional, default 0)
+        :param end: Last block number excluded (optional, default store length)
+        :return:
+        """
+        end = len(self) if end is None else min(end, len(self))
+        for number in range(max(start, 0), end):
+            yield self.json_block(number)
+
+    def blocks(self, start: int = 0, end: Optional[int] = None) -> Iterator[Block]:
+        """
+        Iterate over blocks from start to end (excluded)
+
+        :param start: First block number (optional, default 0)
+        :param end: Last block number excluded (optional, default store length)
+        :return:
+        """
+        for json_block in self.json_blocks(start, end):
+            yield Block.from_parsed_json(json_block)
+
+    def __iter__(self) -> Iterator[Block]:
+        return self.blocks()
+
+    def close(self) -> None:
+        """
+        Close the store files
+
+        :return:
+        """
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+        self.hashes.close()
+        self.offsets.release()
+        self.offsets_data.close()
+        self.offsets_file.close()
+
+    def __enter__(self) -> "BlockchainStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,444 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# export blocks to columnar tables
+# one file per table : blocks, transactions, inputs, outputs, certifications, memberships
+# parquet files if pyarrow is installed (pip install duniterpy[export]),
+# json lines files of column chunks otherwise
+# example usage :
+# ```
+# from duniterpy.helpers.blockchain import load
+# from duniterpy.helpers.export import export_blocks, read_columns
+# export_blocks(load(), "export")
+# columns = read_columns("export/outputs.jsonl", ["amount", "base"]) # without pyarrow
+# ```
+
+import contextlib
+import json
+import pathlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..documents import Block
+from .utxo import source_owner
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMAT_PARQUET = "parquet"
+FORMAT_JSONL = "jsonl"
+
+# rows per table buffered before writing a row group
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+INT = "int64"
+STRING = "string"
+STRINGS = "list<string>"
+
+# columns names and types by table name
+TABLES = {
+    "blocks": [
+        ("number", INT),
+        ("hash", STRING),
+        ("version", INT),
+        ("time", INT),
+        ("mediantime", INT),
+        ("issuer", STRING),
+        ("prev_hash", STRING),
+        ("powmin", INT),
+        ("ud", INT),
+        ("unit_base", INT),
+        ("members_count", INT),
+        ("different_issuers_count", INT),
+    ],
+    "transactions": [
+        ("block_number", INT),
+        ("position", INT),
+        ("hash", STRING),
+        ("version", INT),
+        ("blockstamp", STRING),
+        ("locktime", INT),
+        ("issuers", STRINGS),
+        ("comment", STRING),
+    ],
+    "inputs": [
+        ("block_number", INT),
+        ("transaction_hash", STRING),
+        ("position", INT),
+        ("amount", INT),
+        ("base", INT),
+        ("source", STRING),
+        ("origin_id", STRING),
+        ("origin_index", INT),
+    ],
+    "outputs": [
+        ("block_number", INT),
+        ("transaction_hash", STRING),
+        ("position", INT),
+        ("amount", INT),
+        ("base", INT),
+        ("condition", STRING),
+        ("owner", STRING),
+    ],
+    "certifications": [
+        ("block_number", INT),
+        ("pubkey_from", STRING),
+        ("pubkey_to", STRING),
+        ("timestamp", INT),
+    ],
+    "memberships": [
+        ("block_number", INT),
+        ("section", STRING),
+        ("issuer", STRING),
+        ("uid", STRING),
+        ("membership_ts", STRING),
+        ("identity_ts", STRING),
+    ],
+}
+
+
+class JsonColumnsWriter:
+    """
+    Pure python writer of a table as a json lines file
+
+    The first line is the table schema, each next line is a row group
+    as an object of columns values lists.
+    """
+
+    def __init__(self, path: pathlib.Path, schema: List[Tuple[str, str]]) -> None:
+        """
+        Init JsonColumnsWriter instance
+
+        :param path: File path
+        :param schema: List of (column name, type)
+        """
+        with contextlib.ExitStack() as stack:
+            self.file = stack.enter_context(open(path, "w", encoding="utf-8"))
+            self.file.write(json.dumps({"columns": schema}) + "\n")
+            # keep the file open until close()
+            stack.pop_all()
+
+    def write(self, columns: Dict[str, list]) -> None:
+        """
+        Write a row group
+
+        :param columns: Columns values lists by name
+        :return:
+        """
+        self.file.write(json.dumps(columns, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Writer of a table as a parquet file, with pyarrow
+    """
+
+    def __init__(self, path: pathlib.Path, schema: List[Tuple[str, str]]) -> None:
+        """
+        Init ParquetWriter instance
+
+        :param path: File path
+        :param schema: List of (column name, type)
+        """
+        types = {
+            INT: pyarrow.int64(),
+            STRING: pyarrow.string(),
+            STRINGS: pyarrow.list_(pyarrow.string()),
+        }
+        self.schema = pyarrow.schema(
+            [(name, types[column_type]) for name, column_type in schema]
+        )
+        self.writer = pyarrow.parquet.ParquetWriter(str(path), self.schema)
+
+    def write(self, columns: Dict[str, list]) -> None:
+        """
+        Write a row group
+
+        :param columns: Columns values lists by name
+        :return:
+        """
+        self.writer.write_table(pyarrow.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ColumnarExporter:
+    """
+    Export blocks and their documents to columnar tables, one file per table
+
+    Rows are buffered by table and written by row groups of row_group_size rows,
+    so memory usage does not depend on the count of exported blocks.
+    """
+
+    def __init__(
+        self,
+        folder: Union[str, pathlib.Path],
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        file_format: Optional[str] = None,
+    ) -> None:
+        """
+        Init ColumnarExporter instance
+
+        :param folder: Folder of the tables files, created if needed
+        :param row_group_size: Rows per row group (optional, default 10000)
+        :param file_format: "parquet" or "jsonl" (optional, default parquet if pyarrow is installed)
+        """
+        if file_format is None:
+            file_format = FORMAT_JSONL if pyarrow is None else FORMAT_PARQUET
+        if file_format == FORMAT_PARQUET and pyarrow is None:
+            raise ValueError("pyarrow is required to export to parquet")
+        if file_format not in (FORMAT_PARQUET, FORMAT_JSONL):
+            raise ValueError("Unknown format {0}".format(file_format))
+
+        self.folder = pathlib.Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.file_format = file_format
+        writer_class = (
+            ParquetWriter if file_format == FORMAT_PARQUET else JsonColumnsWriter
+        )
+        # the writers already built are closed if one of them fails
+        with contextlib.ExitStack() as stack:
+            self.writers = {}
+            for name, schema in TABLES.items():
+                writer = writer_class(self.path(name), schema)
+                stack.callback(writer.close)
+                self.writers[name] = writer
+            stack.pop_all()
+        self.rows = {name: [] for name in TABLES}  # type: Dict[str, List[tuple]]
+
+    def path(self, table: str) -> pathlib.Path:
+        """
+        Return the file path of a table
+
+        :param table: Table name
+        :return:
+        """
+        return self.folder.joinpath("{0}.{1}".format(table, self.file_format))
+
+    def add(self, block: Union[Block, dict]) -> None:
+        """
+        Add the rows of a block and of its documents
+
+        The "hash" field of a parsed json block is exported when present,
+        instead of computing the proof of work hash.
+
+        :param block: Block instance or parsed json block
+        :return:
+        """
+        block_hash = None
+        if isinstance(block, dict):
+            block_hash = block.get("hash")
+            block = Block.from_parsed_json(block, lazy=True)
+        if block_hash is None:
+            block_hash = block.proof_of_work()
+        number = block.number
+
+        self._append(
+            "blocks",
+            (
+                number,
+                block_hash,
+                block.version,
+                block.time,
+                block.mediantime,
+                block.issuer,
+                block.prev_hash,
+                block.powmin,
+                block.ud,
+                block.unit_base,
+                block.members_count,
+                int(block.different_issuers_count),
+            ),
+        )
+
+        for position, transaction in enumerate(block.transactions):
+            transaction_hash = transaction.sha_hash
+            self._append(
+                "transactions",
+                (
+                    number,
+                    position,
+                    transaction_hash,
+                    transaction.version,
+                    str(transaction.blockstamp),
+                    int(transaction.locktime),
+                    transaction.issuers,
+                    transaction.comment,
+                ),
+            )
+            for index, input_source in enumerate(transaction.inputs):
+                self._append(
+                    "inputs",
+                    (
+                        number,
+                        transaction_hash,
+                        index,
+                        input_source.amount,
+                        input_source.base,
+                        input_source.source,
+                        input_source.origin_id,
+                        input_source.index,
+                    ),
+                )
+            for index, output_source in enumerate(transaction.outputs):
+                condition = output_source.inline_condition()
+                self._append(
+                    "outputs",
+                    (
+                        number,
+                        transaction_hash,
+                        index,
+                        output_source.amount,
+                        output_source.base,
+                        condition,
+                        source_owner(condition),
+                    ),
+                )
+
+        for certification in block.certifications:
+            self._append(
+                "certifications",
+                (
+                    number,
+                    certification.pubkey_from,
+                    certification.pubkey_to,
+                    certification.timestamp.number,
+                ),
+            )
+        for section in ("joiners", "actives", "leavers"):
+            for membership in getattr(block, section):
+                self._append(
+                    "memberships",
+                    (
+                        number,
+                        section,
+                        membership.issuer,
+                        membership.uid,
+                        str(membership.membership_ts),
+                        str(membership.identity_ts),
+                    ),
+                )
+
+    def close(self) -> None:
+        """
+        Write the buffered rows and close the files
+
+        :return:
+        """
+        for name in TABLES:
+            self._flush(name)
+            self.writers[name].close()
+
+    def __enter__(self) -> "ColumnarExporter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _append(self, table: str, row: tuple) -> None:
+        """
+        Buffer a row, write a row group when the buffer is full
+
+        :param table: Table name
+        :param row: Row values in columns order
+        :return:
+        """
+        rows = self.rows[table]
+        rows.append(row)
+        if len(rows) >= self.row_group_size:
+            self._flush(table)
+
+    def _flush(self, table: str) -> None:
+        """
+        Write the buffered rows of a table as a row group
+
+        :param table: Table name
+        :return:
+        """
+        rows = self.rows[table]
+        if not rows:
+            return
+        names = [name for name, _ in TABLES[table]]
+        self.writers[table].write(
+            {name: list(values) for name, values in zip(names, zip(*rows))}
+        )
+        self.rows[table] = []
+
+
+def export_blocks(
+    blocks: Iterable[Union[Block, dict]],
+    folder: Union[str, pathlib.Path],
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    file_format: Optional[str] = None,
+) -> None:
+    """
+    Export blocks to columnar tables files in folder, see ColumnarExporter
+
+    :param blocks: Iterable of Block instances or parsed json blocks
+    :param folder: Folder of the tables files
+    :param row_group_size: Rows per row group (optional, default 10000)
+    :param file_format: "parquet" or "jsonl" (optional, default parquet if pyarrow is installed)
+    :return:
+    """
+    with ColumnarExporter(folder, row_group_size, file_format) as exporter:
+        for block in blocks:
+            exporter.add(block)
+
+
+def iter_row_groups(
+    path: Union[str, pathlib.Path], columns: Optional[List[str]] = None
+) -> Iterator[Dict[str, list]]:
+    """
+    Yield the row groups of a json lines table file, as columns values lists by name
+
+    :param path: File path
+    :param columns: Names of the columns to read (optional, default all)
+    :return:
+    """
+    with open(path, encoding="utf-8") as file:
+        schema = json.loads(file.readline())["columns"]
+        names = [name for name, _ in schema] if columns is None else columns
+        for line in file:
+            row_group = json.loads(line)
+            yield {name: row_group[name] for name in names}
+
+
+def read_columns(
+    path: Union[str, pathlib.Path], columns: Optional[List[str]] = None
+) -> Dict[str, list]:
+    """
+    Return the columns of a json lines table file, as values lists by name
+
+    :param path: File path
+    :param columns: Names of the columns to read (optional, default all)
+    :return:
+    """
+    with open(path, encoding="utf-8") as file:
+        schema = json.loads(file.readline())["columns"]
+    names = [name for name, _ in schema] if columns is None else columns
+    result = {name: [] for name in names}  # type: Dict[str, list]
+    for row_group in iter_row_groups(path, names):
+        for name in names:
+            result[name].extend(row_group[name])
+    return result
@@ -15,26 +15,45 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Iterable, Optional
 
-from duniterpy.api import bma
-from duniterpy.api.client import Client
+from aiohttp import ClientError, ClientSession
+
+from duniterpy.api import bma, endpoint
+from duniterpy.api.client import API, Client
 from duniterpy.documents.peer import Peer, MalformedDocumentError
 from duniterpy.documents.ws2p.heads import HeadV2
 from itertools import groupby
 
 from duniterpy.key import VerifyingKey
 
+# global timeout of the endpoints probe in seconds
+DEFAULT_PROBE_TIMEOUT = 3.0
+
+# path requested to probe an endpoint, by api
+PROBE_PATHS = {
+    "BASIC_MERKLED_API": "node/summary",
+    "BMAS": "node/summary",
+    "GVA": "",
+    "GVASUB": "",
+}
+
 
-async def get_available_nodes(client: Client) -> List[List[Dict[str, Any]]]:
+async def get_available_nodes(
+    client: Client,
+    probe: bool = False,
+    probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+    threads: int = 0,
+) -> List[List[Dict[str, Any]]]:
     """
     Get available nodes grouped and sorted by descending blockstamp
 
-    Each entry is a list of nodes (HeadV2 instance, inline endpoint list) sharing the same blockstamp:
+    Each entry is a list of nodes (HeadV2 instance, inline endpoint list, latency) sharing the same blockstamp:
 
         [
-            [{"head": HeadV2, "endpoints": [str, ...]}, ...],
-            [{"head": HeadV2, "endpoints": [str, ...]}, ...],
+            [{"head": HeadV2, "endpoints": [str, ...], "latency": float}, ...],
+            [{"head": HeadV2, "endpoints": [str, ...], "latency": float}, ...],
             ...
         ]
 
@@ -45,15 +64,24 @@ async def get_available_nodes(client: Client) -> List[List[Dict[str, Any]]]:
 
     If node is down, you can select another node.
 
+    With probe, all the endpoints are requested concurrently within probe_timeout seconds.
+    Unreachable endpoints and nodes are removed, endpoints are sorted by response time,
+    and nodes of a group by the response time of their fastest endpoint, stored in "latency".
+    Without probe, "latency" is None.
+
     Warning : only nodes with BMAS, BASIC_MERKLED_API, GVA and GVASUB endpoint are selected
               and only those endpoints are available in the endpoint list
 
     :param client: Client instance
+    :param probe: Probe the endpoints reachability and latency (optional, default False)
+    :param probe_timeout: Global timeout of the probe in seconds (optional, default 3)
+    :param threads: Number of threads verifying the signatures (optional, default 0)
     :return:
     """
     # capture heads and peers
-    heads_response = await client(bma.network.ws2p_heads)
-    peers_response = await client(bma.network.peers)
+    heads_response, peers_response = await asyncio.gather(
+        client(bma.network.ws2p_heads), client(bma.network.peers)
+    )
 
     # get heads instances from WS2P messages
     heads = []
@@ -61,66 +89,138 @@ async def get_available_nodes(client: Client) -> List[List[Dict[str, Any]]]:
         head, _ = HeadV2.from_inline(entry["messageV2"], entry["sigV2"])
         heads.append(head)
 
-    # sort by blockstamp by descending order
-    heads = sorted(heads, key=lambda x: x.blockstamp, reverse=True)
-
-    # group heads by blockstamp
-    groups = []
-    for _, group in groupby(heads, key=lambda x: x.blockstamp):
-        nodes = []
-        for head in list(group):
-
-            # if head signature not valid...
-            if VerifyingKey(head.pubkey).verify_ws2p_head(head) is False:
-                # skip this node
-                continue
-
-            bma_peers = [
-                bma_peer
-                for bma_peer in peers_response["peers"]
-                if bma_peer["pubkey"] == head.pubkey
-            ]
-
-            # if no peer found...
-            if len(bma_peers) == 0:
-                # skip this node
-                continue
-
-            bma_peer = bma_peers[0]
-
-            try:
-                peer = Peer.from_bma(bma_peer)
-            # if bad peer... (mostly bad formatted endpoints)
-            except MalformedDocumentError:
-                # skip this node
-                continue
-
-            # set signature in Document
-            peer.signatures = [bma_peer["signature"]]
-            #  if peer signature not valid
-            if VerifyingKey(head.pubkey).verify_document(peer) is False:
-                # skip this node
-                continue
-
-            # filter endpoints to get only BMAS, BASIC_MERKLED_API, GVA or GVASUB
-            endpoints = [
-                endpoint
-                for endpoint in bma_peers[0]["endpoints"]
-                if endpoint.startswith("BMAS")
-                or endpoint.startswith("BASIC_MERKLED_API")
-                or endpoint.startswith("GVA")
-                or endpoint.startswith("GVASUB")
-            ]
-            if len(endpoints) == 0:
-                # skip this node
-                continue
-
-            # add node to group nodes
-            nodes.append({"head": head, "endpoints": endpoints})
-
-        # if nodes in group...
-        if len(nodes) > 0:
-            # add group to groups
-            groups.append(nodes)
-
-    return groups
+    # skip heads with an invalid signature
+    heads_valid = VerifyingKey.verify_many(
+        ((head.pubkey, head.inline(), head.signature) for head in heads), threads
+    )
+
+    # first peer document by pubkey
+    bma_peers = {}  # type: Dict[str, dict]
+    for bma_peer in peers_response["peers"]:
+        bma_peers.setdefault(bma_peer["pubkey"], bma_peer)
+
+    candidates = []
+    for head, head_valid in zip(heads, heads_valid):
+        bma_peer = bma_peers.get(head.pubkey)
+        # if head signature not valid or no peer found...
+        if not head_valid or bma_peer is None:
+            # skip this node
+            continue
+
+        try:
+            peer = Peer.from_bma(bma_peer)
+        # if bad peer... (mostly bad formatted endpoints)
+        except MalformedDocumentError:
+            # skip this node
+            continue
+
+        # filter endpoints to get only BMAS, BASIC_MERKLED_API, GVA or GVASUB
+        endpoints = [
+            inline
+            for inline in bma_peer["endpoints"]
+            if inline.startswith("BMAS")
+            or inline.startswith("BASIC_MERKLED_API")
+            or inline.startswith("GVA")
+            or inline.startswith("GVASUB")
+        ]
+        if len(endpoints) == 0:
+            # skip this node
+            continue
+
+        candidates.append((head, peer.raw(), bma_peer["signature"], endpoints))
+
+    # skip nodes with an invalid peer signature
+    peers_valid = VerifyingKey.verify_many(
+        ((head.pubkey, raw, signature) for head, raw, signature, _ in candidates),
+        threads,
+    )
+    nodes = [
+        {"head": head, "endpoints": endpoints, "latency": None}
+        for (head, _, _, endpoints), peer_valid in zip(candidates, peers_valid)
+        if peer_valid
+    ]
+
+    if probe:
+        latencies = await probe_endpoints(
+            client.session,
+            [inline for node in nodes for inline in node["endpoints"]],
+            probe_timeout,
+            client.proxy,
+        )
+        reachable = {
+            inline: latency
+            for inline, latency in latencies.items()
+            if latency is not None
+        }
+        reachable_nodes = []
+        for node in nodes:
+            endpoints = sorted(
+                (inline for inline in node["endpoints"] if inline in reachable),
+                key=reachable.__getitem__,
+            )
+            if endpoints:
+                node["endpoints"] = endpoints
+                node["latency"] = reachable[endpoints[0]]
+                reachable_nodes.append(node)
+        nodes = reachable_nodes
+
+    # sort by blockstamp by descending order, then by latency
+    nodes.sort(key=lambda node: node["latency"] or 0.0)
+    nodes.sort(key=lambda node: node["head"].blockstamp, reverse=True)
+
+    # group nodes by blockstamp
+    return [
+        list(group)
+        for _, group in groupby(nodes, key=lambda node: node["head"].blockstamp)
+    ]
+
+
+async def probe_endpoints(
+    session: ClientSession,
+    endpoints: Iterable[str],
+    timeout: float,
+    proxy: Optional[str] = None,
+) -> Dict[str, Optional[float]]:
+    """
+    Request the endpoints concurrently and return their response time in seconds
+
+    The response time of an endpoint is None if it is not supported, unreachable,
+    returns a server error or does not respond within timeout seconds.
+
+    :param session: Aiohttp client session
+    :param endpoints: Inline BMAS, BASIC_MERKLED_API, GVA or GVASUB endpoints
+    :param timeout: Global timeout in seconds
+    :param proxy: Proxy server as hostname:port (optional, default None)
+    :return:
+    """
+    loop = asyncio.get_event_loop()
+    latencies = {}  # type: Dict[str, Optional[float]]
+
+    async def request(inline: str, url: str) -> None:
+        started = loop.time()
+        try:
+            async with session.get(url, proxy=proxy) as response:
+                if response.status < 500:
+                    latencies[inline] = loop.time() - started
+        except (ClientError, OSError, ValueError):
+            pass
+
+    tasks = []
+    for inline in set(endpoints):
+        latencies[inline] = None
+        try:
+            _endpoint = endpoint.endpoint(inline)
+            path = PROBE_PATHS[_endpoint.API]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            continue
+        conn_handler = _endpoint.conn_handler(session, proxy)
+        url = API(conn_handler).reverse_url(conn_handler.http_scheme, path)
+        tasks.append(asyncio.ensure_future(request(inline, url)))
+
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+    return latencies
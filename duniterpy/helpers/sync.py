@@ -0,0 +1,452 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# fetch a range of blocks from one or more BMA nodes or WS2P connections
+# example usage :
+# ```
+# from duniterpy.helpers.sync import fetch_blocks, sync_blocks
+# async for json_block in fetch_blocks([client_a, client_b], 0, 10000):
+#     block = Block.from_parsed_json(json_block)
+# async for block in sync_blocks(ws2p_pool, 0, 10000):
+#     print(block.number)
+# ```
+
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+import jsonschema
+from aiohttp import ClientError
+
+from duniterpy.api import bma, errors
+from duniterpy.api.client import Client, validate
+from duniterpy.api.errors import DuniterError, HTTPStatusError
+from duniterpy.api.ws2p.client import WS2PClient, WS2PError
+from duniterpy.documents import Block
+
+from .ws2p import WS2PPool
+
+# blocks count per request
+DEFAULT_WINDOW = 50
+MIN_WINDOW = 10
+MAX_WINDOW = 500
+# concurrent requests
+DEFAULT_CONCURRENCY = 4
+MAX_CONCURRENCY = 16
+# request duration above which the window is reduced, in seconds
+TARGET_LATENCY = 2.0
+# attempts per range before giving up
+MAX_ATTEMPTS = 5
+# first retry delay in seconds, doubled at each attempt
+RETRY_DELAY = 0.5
+
+FETCH_ERRORS = (
+    DuniterError,
+    ValueError,
+    ClientError,
+    asyncio.TimeoutError,
+    jsonschema.ValidationError,
+)
+
+# blocks count per WS2P getBlocks request
+DEFAULT_WS2P_WINDOW = 100
+# WS2P windows in flight
+DEFAULT_DEPTH = 8
+
+SYNC_ERRORS = (
+    WS2PError,
+    ConnectionError,
+    ValueError,
+    asyncio.TimeoutError,
+    jsonschema.ValidationError,
+)
+
+
+class AdaptiveWindow:
+    """
+    Adapt requests window size and concurrency to the observed latency and errors
+
+    Increase is additive on success, decrease is multiplicative on slow responses or errors.
+    """
+
+    def __init__(
+        self,
+        window: int = DEFAULT_WINDOW,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        min_window: int = MIN_WINDOW,
+        max_window: int = MAX_WINDOW,
+        max_concurrency: int = MAX_CONCURRENCY,
+        target_latency: float = TARGET_LATENCY,
+    ) -> None:
+        """
+        Init AdaptiveWindow instance
+
+        :param window: Initial blocks count per request
+        :param concurrency: Initial concurrent requests
+        :param min_window: Minimum blocks count per request
+        :param max_window: Maximum blocks count per request
+        :param max_concurrency: Maximum concurrent requests
+        :param target_latency: Request duration above which the window is reduced, in seconds
+        """
+        if not 0 < min_window <= window <= max_window:
+            raise ValueError("window must be between min_window and max_window")
+        if not 0 < concurrency <= max_concurrency:
+            raise ValueError("concurrency must be between 1 and max_concurrency")
+        self.window = window
+        self.concurrency = concurrency
+        self.min_window = min_window
+        self.max_window = max_window
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+
+    def success(self, latency: float) -> None:
+        """
+        Adapt to a successful request
+
+        :param latency: Request duration in seconds
+        :return:
+        """
+        if latency > self.target_latency:
+            self.window = max(self.min_window, self.window // 2)
+        else:
+            self.window = min(self.max_window, self.window + self.min_window)
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def failure(self, rate_limited: bool = False) -> None:
+        """
+        Adapt to a failed request
+
+        :param rate_limited: True if the node refused the request for too many requests
+        :return:
+        """
+        self.concurrency = max(1, self.concurrency // 2)
+        if rate_limited:
+            self.concurrency = 1
+        else:
+            self.window = max(self.min_window, self.window // 2)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Return True if error is a too many requests response
+
+    :param error: Request exception
+    :return:
+    """
+    if isinstance(error, DuniterError):
+        return error.ucode == errors.HTTP_LIMITATION
+    return isinstance(error, HTTPStatusError) and error.status == 429
+
+
+def check_numbers(numbers: Sequence[int], from_number: int) -> None:
+    """
+    Raise ValueError if the numbers of a batch of blocks do not follow from_number
+
+    :param numbers: Numbers of the blocks of the batch
+    :param from_number: Number of the first block requested
+    :return:
+    """
+    for offset, number in enumerate(numbers):
+        if number != from_number + offset:
+            raise ValueError(
+                "Block {0} returned instead of block {1}".format(
+                    number, from_number + offset
+                )
+            )
+
+
+async def schedule_windows(
+    request: Callable[[int, int, int], Awaitable[list]],
+    sources_count: int,
+    start: int,
+    end: int,
+    adaptive: AdaptiveWindow,
+    retry_errors: Tuple[Type[Exception], ...],
+    max_attempts: int = MAX_ATTEMPTS,
+    retry_delay: float = RETRY_DELAY,
+) -> AsyncIterator[list]:
+    """
+    Request the windows of the range from start to end (excluded) and yield their batches in order
+
+    Windows are requested concurrently, each one from the source with the fewest requests
+    in flight, without buffering more than max_concurrency windows of max_window blocks
+    ahead of the last yielded batch, so a slow consumer suspends the requests.
+    Window size and concurrency adapt to latency and errors (see AdaptiveWindow).
+    Failed windows are retried with an exponential delay, on another source if possible,
+    and the remaining blocks of a partial batch are requested again.
+
+    :param request: Coroutine function of (source index, window start, count) returning
+        the batch of at most count blocks of the window, from its first one
+    :param sources_count: Number of sources
+    :param start: First block number
+    :param end: Last block number excluded
+    :param adaptive: AdaptiveWindow instance
+    :param retry_errors: Exceptions of a failed request to retry
+    :param max_attempts: Attempts per window before raising the last error (optional, default 5)
+    :param retry_delay: First retry delay in seconds, doubled at each attempt (optional, default 0.5)
+    :return:
+    """
+    loop = asyncio.get_event_loop()
+    in_flight = [0] * sources_count
+    # (start, count, attempts) of windows to request again
+    retries = deque()  # type: Deque[Tuple[int, int, int]]
+    tasks = {}  # type: Dict[asyncio.Future, Tuple[int, int, int, int, float]]
+    results = {}  # type: Dict[int, list]
+    next_start = start
+    cursor = start
+
+    async def attempt(index: int, window_start: int, count: int, attempts: int):
+        if attempts > 0:
+            await asyncio.sleep(retry_delay * 2 ** (attempts - 1))
+        return await request(index, window_start, count)
+
+    try:
+        while cursor < end:
+            # schedule windows, retries first, without buffering too far ahead of the cursor
+            while len(tasks) < adaptive.concurrency:
+                if retries:
+                    window_start, count, attempts = retries.popleft()
+                elif (
+                    next_start < end
+                    and next_start - cursor
+                    < adaptive.max_concurrency * adaptive.max_window
+                ):
+                    window_start = next_start
+                    count = min(adaptive.window, end - next_start)
+                    attempts = 0
+                    next_start += count
+                else:
+                    break
+                # fewest requests in flight, rotate on retries
+                index = min(
+                    range(sources_count),
+                    key=lambda i: (in_flight[i], (i - attempts) % sources_count),
+                )
+                in_flight[index] += 1
+                task = asyncio.ensure_future(
+                    attempt(index, window_start, count, attempts)
+                )
+                tasks[task] = (index, window_start, count, attempts, loop.time())
+
+            done, _ = await asyncio.wait(
+                list(tasks), return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                index, window_start, count, attempts, started = tasks.pop(future)
+                in_flight[index] -= 1
+                try:
+                    blocks = future.result()
+                    if not blocks:
+                        raise ValueError(
+                            "No block returned from block {0}".format(window_start)
+                        )
+                except retry_errors as error:
+                    attempts += 1
+                    logging.debug(
+                        "Blocks %d-%d request failed (%d): %s",
+                        window_start,
+                        window_start + count - 1,
+                        attempts,
+                        error,
+                    )
+                    if attempts >= max_attempts:
+                        raise
+                    adaptive.failure(is_rate_limited(error))
+                    retries.append((window_start, count, attempts))
+                    continue
+
+                # retried requests duration includes the retry delay
+                if attempts == 0:
+                    adaptive.success(loop.time() - started)
+                results[window_start] = blocks
+                if len(blocks) < count:
+                    # partial response, request the remaining blocks
+                    retries.append((window_start + len(blocks), count - len(blocks), 0))
+
+            # yield batches in order
+            while cursor in results:
+                blocks = results.pop(cursor)
+                cursor += len(blocks)
+                yield blocks
+    finally:
+        for future in tasks:
+            future.cancel()
+
+
+async def fetch_blocks(
+    clients: Union[Client, Sequence[Client]],
+    start: int,
+    end: int,
+    adaptive: Optional[AdaptiveWindow] = None,
+    max_attempts: int = MAX_ATTEMPTS,
+    retry_delay: float = RETRY_DELAY,
+) -> AsyncIterator[dict]:
+    """
+    Fetch blocks from start to end (excluded) and yield them in order, as parsed json blocks
+
+    The range is split in windows requested concurrently with bma.blockchain.blocks,
+    each request being sent to the client with the fewest requests in flight.
+    Window size and concurrency adapt to latency and errors (see AdaptiveWindow).
+    Failed windows are retried with an exponential delay, on another client if possible.
+
+    Convert blocks with Block.from_parsed_json() if needed.
+
+    :param clients: Client instance or list of Client instances
+    :param start: First block number
+    :param end: Last block number excluded
+    :param adaptive: AdaptiveWindow instance (optional, default AdaptiveWindow())
+    :param max_attempts: Attempts per window before raising the last error (optional, default 5)
+    :param retry_delay: First retry delay in seconds, doubled at each attempt (optional, default 0.5)
+    :return:
+    """
+    if isinstance(clients, Client):
+        clients = [clients]
+    if not clients:
+        raise ValueError("At least one client is required")
+    if adaptive is None:
+        adaptive = AdaptiveWindow()
+
+    async def request(index: int, window_start: int, count: int) -> List[dict]:
+        blocks = await clients[index](bma.blockchain.blocks, count, window_start)
+        # a short batch is completed by another request, a shifted one is retried
+        blocks = blocks[:count]
+        check_numbers([block["number"] for block in blocks], window_start)
+        return blocks
+
+    async for blocks in schedule_windows(
+        request,
+        len(clients),
+        start,
+        end,
+        adaptive,
+        FETCH_ERRORS,
+        max_attempts,
+        retry_delay,
+    ):
+        for block in blocks:
+            yield block
+
+
+def parse_blocks(
+    json_blocks: List[dict], from_number: int, check: bool = True, lazy: bool = False
+) -> List[Block]:
+    """
+    Return the Block instances of a getBlocks batch, checked against its schema
+
+    :param json_blocks: Parsed json blocks
+    :param from_number: Number of the first block requested
+    :param check: Validate the batch against BLOCKS_SCHEMA (optional, default True)
+    :param lazy: Build the sub-documents on first access (optional, default False)
+    :return:
+    """
+    if check:
+        validate(json_blocks, bma.blockchain.BLOCKS_SCHEMA)
+    check_numbers([json_block["number"] for json_block in json_blocks], from_number)
+    return [Block.from_parsed_json(json_block, lazy) for json_block in json_blocks]
+
+
+async def sync_blocks(
+    sources: Union[WS2PClient, WS2PPool, Sequence[WS2PClient]],
+    start: int,
+    end: int,
+    window: int = DEFAULT_WS2P_WINDOW,
+    depth: int = DEFAULT_DEPTH,
+    executor: Optional[Executor] = None,
+    check: bool = True,
+    lazy: bool = False,
+    max_attempts: int = MAX_ATTEMPTS,
+    retry_delay: float = RETRY_DELAY,
+) -> AsyncIterator[Block]:
+    """
+    Sync blocks from start to end (excluded) over WS2P and yield them in order, as Block instances
+
+    The range is split in windows of getBlocks requests, up to depth of them in flight
+    at once, each one sent to the WS2P client with the fewest requests in flight
+    (a WS2PPool spreads its requests itself). Concurrency is reduced on errors and
+    restored on successes (see AdaptiveWindow), the window size is fixed.
+
+    At most depth windows are requested ahead of the last yielded block,
+    so a slow consumer suspends the requests.
+    Failed windows are retried with an exponential delay, on another client if possible.
+
+    Each batch is validated and converted to Block instances when received, so the
+    clients can use VALIDATE_OFF to avoid validating them twice. The conversion
+    dominates the sync duration: with lazy, the sub-documents of the blocks are only
+    built on first access. The conversion can also run in an executor, but the
+    Block instances pickled back from worker processes cost more than their conversion.
+
+    :param sources: WS2PClient instance, WS2PPool instance or list of WS2PClient instances
+    :param start: First block number
+    :param end: Last block number excluded
+    :param window: Blocks count per request (optional, default 100)
+    :param depth: Windows in flight (optional, default 8)
+    :param executor: Executor of the batches conversions (optional, default None for the event loop)
+    :param check: Validate the batches against BLOCKS_SCHEMA (optional, default True)
+    :param lazy: Build the sub-documents of the blocks on first access (optional, default False)
+    :param max_attempts: Attempts per window before raising the last error (optional, default 5)
+    :param retry_delay: First retry delay in seconds, doubled at each attempt (optional, default 0.5)
+    :return:
+    """
+    if isinstance(sources, (WS2PClient, WS2PPool)):
+        sources = [sources]  # type: ignore
+    if not sources:
+        raise ValueError("At least one source is required")
+    if window < 1 or depth < 1:
+        raise ValueError("window and depth must be greater than zero")
+
+    loop = asyncio.get_event_loop()
+    adaptive = AdaptiveWindow(
+        window, depth, min_window=window, max_window=window, max_concurrency=depth
+    )
+
+    async def request(index: int, window_start: int, count: int) -> List[Block]:
+        json_blocks = await sources[index].get_blocks(window_start, count)  # type: Any
+        if not json_blocks:
+            return []
+        if executor is None:
+            return parse_blocks(json_blocks[:count], window_start, check, lazy)
+        return await loop.run_in_executor(
+            executor, parse_blocks, json_blocks[:count], window_start, check, lazy
+        )
+
+    async for blocks in schedule_windows(
+        request,
+        len(sources),
+        start,
+        end,
+        adaptive,
+        SYNC_ERRORS,
+        max_attempts,
+        retry_delay,
+    ):
+        for block in blocks:
+            yield block
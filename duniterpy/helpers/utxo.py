@@ -0,0 +1,473 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# local index of the unspent sources and balances, fed by blocks
+# example usage :
+# ```
+# from duniterpy.helpers.blockchain import load
+# from duniterpy.helpers.utxo import UTXOIndex
+# index = UTXOIndex()
+# index.apply_blocks(load())
+# index.snapshot("utxo.json")
+# index.balance(pubkey) # current balance in cents
+# index.balance(pubkey, 250000) # balance at block 250000
+# index.sources(pubkey) # unspent sources as InputSource instances
+# ```
+#
+# on a fork, revert the blocks of the old branch before applying the new one :
+# ```
+# index = UTXOIndex.restore("utxo.json")
+# index.rollback(fork_point_number)
+# index.apply(block)
+# ```
+
+import bisect
+import json
+import os
+import re
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..documents import Block
+from ..documents.transaction import InputSource
+
+# default count of blocks which can be reverted, as the Duniter fork window size
+DEFAULT_MAX_ROLLBACK = 100
+SNAPSHOT_VERSION = 1
+
+# conditions are stored as composed by OutputSource.inline_condition()
+SIG_CONDITION_REGEX = re.compile(r"SIG\((\w+)\)")
+
+# (source type, identifier, index) of a source, as in an InputSource
+SourceKey = Tuple[str, str, int]
+# (amount, base, condition) of a source
+SourceValue = Tuple[int, int, str]
+
+
+class BlockChanges:
+    """
+    Changes applied by a block, kept to revert it
+    """
+
+    def __init__(
+        self,
+        number: int,
+        block_hash: str,
+        prev_hash: Optional[str],
+        consumed: Optional[List[Tuple[SourceKey, SourceValue]]] = None,
+        created: Optional[List[SourceKey]] = None,
+        joined: Optional[List[str]] = None,
+        excluded: Optional[List[str]] = None,
+        balances: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Init BlockChanges instance
+
+        :param number: Block number
+        :param block_hash: Block hash
+        :param prev_hash: Previous block hash
+        :param consumed: Consumed sources as (key, value) tuples
+        :param created: Keys of the created sources
+        :param joined: Pubkeys of the new members
+        :param excluded: Pubkeys of the excluded members
+        :param balances: Pubkeys with a balance history entry at this block
+        """
+        self.number = number
+        self.hash = block_hash
+        self.prev_hash = prev_hash
+        self.consumed = [] if consumed is None else consumed
+        self.created = [] if created is None else created
+        self.joined = [] if joined is None else joined
+        self.excluded = [] if excluded is None else excluded
+        self.balances = [] if balances is None else balances
+
+    def to_json(self) -> list:
+        """
+        Return a json serializable list
+
+        :return:
+        """
+        return [
+            self.number,
+            self.hash,
+            self.prev_hash,
+            [list(key) + list(value) for key, value in self.consumed],
+            [list(key) for key in self.created],
+            self.joined,
+            self.excluded,
+            self.balances,
+        ]
+
+    @classmethod
+    def from_json(cls, data: list) -> "BlockChanges":
+        """
+        Return BlockChanges instance from the list returned by to_json()
+
+        :param data: Parsed json list
+        :return:
+        """
+        (
+            number,
+            block_hash,
+            prev_hash,
+            consumed,
+            created,
+            joined,
+            excluded,
+            balances,
+        ) = data
+        return cls(
+            number,
+            block_hash,
+            prev_hash,
+            [((s[0], s[1], s[2]), (s[3], s[4], s[5])) for s in consumed],
+            [(s[0], s[1], s[2]) for s in created],
+            joined,
+            excluded,
+            balances,
+        )
+
+
+class UTXOIndex:
+    """
+    Index of the unspent transaction outputs and universal dividends, with balances history
+
+    Blocks are applied in order from block zero or from a restored snapshot.
+    Sources are owned by a pubkey if their condition is a single SIG(pubkey),
+    other sources are indexed but not counted in balances.
+
+    Balances are integers in cents (amount * 10 ** base).
+    Dividends are created for the members of the block, joiners included.
+    """
+
+    def __init__(self, max_rollback: int = DEFAULT_MAX_ROLLBACK) -> None:
+        """
+        Init an empty UTXOIndex instance
+
+        :param max_rollback: Count of last blocks which can be reverted (optional, default 100)
+        """
+        self.number = -1
+        self.hash = None  # type: Optional[str]
+        self.sources_by_key = {}  # type: Dict[SourceKey, SourceValue]
+        self.sources_by_owner = {}  # type: Dict[str, Set[SourceKey]]
+        self.members = set()  # type: Set[str]
+        # block numbers and balances after each balance change, by pubkey
+        self.history = {}  # type: Dict[str, Tuple[List[int], List[int]]]
+        self.changes = deque(maxlen=max_rollback)  # type: Deque[BlockChanges]
+
+    def __len__(self) -> int:
+        return len(self.sources_by_key)
+
+    def apply(self, block: Block) -> None:
+        """
+        Apply the transactions, memberships and dividend of the next block
+
+        Raise ValueError if the block does not follow the current head
+        or consumes an unknown source. The index is left unchanged in such a case.
+
+        :param block: Next block
+        :return:
+        """
+        if block.number != self.number + 1 or (
+            self.hash is not None and block.prev_hash != self.hash
+        ):
+            raise ValueError(
+                "Block {0} does not follow block {1}".format(block.number, self.number)
+            )
+
+        changes = BlockChanges(block.number, block.proof_of_work(), block.prev_hash)
+        deltas = {}  # type: Dict[str, int]
+        try:
+            for pubkey in (membership.issuer for membership in block.joiners):
+                if pubkey not in self.members:
+                    self.members.add(pubkey)
+                    changes.joined.append(pubkey)
+            for pubkey in block.excluded:
+                if pubkey in self.members:
+                    self.members.remove(pubkey)
+                    changes.excluded.append(pubkey)
+
+            if block.ud:
+                for pubkey in self.members:
+                    condition = "SIG({0})".format(pubkey)
+                    self._create(
+                        ("D", pubkey, block.number),
+                        (block.ud, block.unit_base, condition),
+                        changes,
+                        deltas,
+                    )
+
+            for transaction in block.transactions:
+                for input_source in transaction.inputs:
+                    self._consume(
+                        (
+                            input_source.source,
+                            input_source.origin_id,
+                            input_source.index,
+                        ),
+                        changes,
+                        deltas,
+                    )
+                transaction_hash = transaction.sha_hash
+                for index, output_source in enumerate(transaction.outputs):
+                    self._create(
+                        ("T", transaction_hash, index),
+                        (
+                            output_source.amount,
+                            output_source.base,
+                            output_source.inline_condition(),
+                        ),
+                        changes,
+                        deltas,
+                    )
+        except Exception:
+            self._revert(changes)
+            raise
+
+        for pubkey, delta in deltas.items():
+            if delta == 0:
+                continue
+            numbers, balances = self.history.setdefault(pubkey, ([], []))
+            numbers.append(block.number)
+            balances.append((balances[-1] if balances else 0) + delta)
+            changes.balances.append(pubkey)
+
+        self.changes.append(changes)
+        self.number = block.number
+        self.hash = changes.hash
+
+    def apply_blocks(self, blocks: Iterable[Block]) -> None:
+        """
+        Apply blocks in order, skipping blocks already applied
+
+        :param blocks: Iterable of blocks
+        :return:
+        """
+        for block in blocks:
+            if block.number > self.number:
+                self.apply(block)
+
+    def revert(self) -> None:
+        """
+        Revert the head block
+
+        Raise ValueError if the head block changes are no longer kept (see max_rollback).
+
+        :return:
+        """
+        if not self.changes or self.changes[-1].number != self.number:
+            raise ValueError("Block {0} can not be reverted".format(self.number))
+        changes = self.changes.pop()
+        self._revert(changes)
+        for pubkey in changes.balances:
+            numbers, balances = self.history[pubkey]
+            numbers.pop()
+            balances.pop()
+            if not numbers:
+                del self.history[pubkey]
+        self.number = changes.number - 1
+        self.hash = changes.prev_hash
+
+    def rollback(self, number: int) -> None:
+        """
+        Revert blocks until block number is the head, to switch to a fork
+
+        :param number: Number of the last common block
+        :return:
+        """
+        while self.number > number:
+            self.revert()
+
+    def balance(self, pubkey: str, number: Optional[int] = None) -> int:
+        """
+        Return the balance of pubkey in cents, at block number or at the current head
+
+        :param pubkey: Public key
+        :param number: Block number (optional, default current head)
+        :return:
+        """
+        if pubkey not in self.history:
+            return 0
+        numbers, balances = self.history[pubkey]
+        if number is None:
+            return balances[-1]
+        position = bisect.bisect_right(numbers, number)
+        return balances[position - 1] if position > 0 else 0
+
+    def sources(self, pubkey: str) -> List[InputSource]:
+        """
+        Return the unspent sources owned by pubkey, as InputSource instances
+
+        :param pubkey: Public key
+        :return:
+        """
+        sources = []
+        for key in self.sources_by_owner.get(pubkey, ()):
+            amount, base, _ = self.sources_by_key[key]
+            sources.append(InputSource(amount, base, key[0], key[1], key[2]))
+        return sources
+
+    def snapshot(self, path: str) -> None:
+        """
+        Save the index to a json file, written atomically
+
+        :param path: File path
+        :return:
+        """
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "number": self.number,
+            "hash": self.hash,
+            "max_rollback": self.changes.maxlen,
+            "members": sorted(self.members),
+            "sources": [
+                list(key) + list(value) for key, value in self.sources_by_key.items()
+            ],
+            "history": {
+                pubkey: [numbers, balances]
+                for pubkey, (numbers, balances) in self.history.items()
+            },
+            "changes": [changes.to_json() for changes in self.changes],
+        }
+        temporary_path = "{0}.tmp".format(path)
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def restore(cls, path: str) -> "UTXOIndex":
+        """
+        Return UTXOIndex instance from a snapshot file
+
+        :param path: File path
+        :return:
+        """
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        if data["version"] != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported snapshot version {0}".format(data["version"]))
+
+        index = cls(data["max_rollback"])
+        index.number = data["number"]
+        index.hash = data["hash"]
+        index.members = set(data["members"])
+        for source in data["sources"]:
+            index._add(
+                (source[0], source[1], source[2]), (source[3], source[4], source[5])
+            )
+        index.history = {
+            pubkey: (numbers, balances)
+            for pubkey, (numbers, balances) in data["history"].items()
+        }
+        index.changes.extend(BlockChanges.from_json(item) for item in data["changes"])
+        return index
+
+    def _add(self, key: SourceKey, value: SourceValue) -> Optional[str]:
+        """
+        Add a source and return its owner if any
+
+        :param key: Source key
+        :param value: Source value
+        :return:
+        """
+        self.sources_by_key[key] = value
+        owner = source_owner(value[2])
+        if owner is not None:
+            self.sources_by_owner.setdefault(owner, set()).add(key)
+        return owner
+
+    def _remove(self, key: SourceKey) -> Tuple[SourceValue, Optional[str]]:
+        """
+        Remove a source and return its value and owner if any
+
+        :param key: Source key
+        :return:
+        """
+        value = self.sources_by_key.pop(key)
+        owner = source_owner(value[2])
+        if owner is not None:
+            keys = self.sources_by_owner[owner]
+            keys.discard(key)
+            if not keys:
+                del self.sources_by_owner[owner]
+        return value, owner
+
+    def _create(
+        self,
+        key: SourceKey,
+        value: SourceValue,
+        changes: BlockChanges,
+        deltas: Dict[str, int],
+    ) -> None:
+        """
+        Create a source while applying a block
+
+        :param key: Source key
+        :param value: Source value
+        :param changes: Changes of the block
+        :param deltas: Balance changes of the block by pubkey
+        :return:
+        """
+        if key in self.sources_by_key:
+            raise ValueError("Source {0} already exists".format(key))
+        owner = self._add(key, value)
+        changes.created.append(key)
+        if owner is not None:
+            deltas[owner] = deltas.get(owner, 0) + value[0] * 10 ** value[1]
+
+    def _consume(
+        self, key: SourceKey, changes: BlockChanges, deltas: Dict[str, int]
+    ) -> None:
+        """
+        Consume a source while applying a block
+
+        :param key: Source key
+        :param changes: Changes of the block
+        :param deltas: Balance changes of the block by pubkey
+        :return:
+        """
+        if key not in self.sources_by_key:
+            raise ValueError("Unknown source {0}".format(key))
+        value, owner = self._remove(key)
+        changes.consumed.append((key, value))
+        if owner is not None:
+            deltas[owner] = deltas.get(owner, 0) - value[0] * 10 ** value[1]
+
+    def _revert(self, changes: BlockChanges) -> None:
+        """
+        Revert sources and members changes of a block, in reverse order
+
+        :param changes: Changes of the block
+        :return:
+        """
+        for key in reversed(changes.created):
+            self._remove(key)
+        for key, value in reversed(changes.consumed):
+            self._add(key, value)
+        self.members.difference_update(changes.joined)
+        self.members.update(changes.excluded)
+
+
+def source_owner(condition: str) -> Optional[str]:
+    """
+    Return the pubkey of a single SIG(pubkey) condition, None for other conditions
+
+    :param condition: Composed condition text
+    :return:
+    """
+    match = SIG_CONDITION_REGEX.fullmatch(condition)
+    return None if match is None else match.group(1)
@@ -0,0 +1,251 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# verify blocks in parallel with a process pool
+# example usage :
+# ```
+# from duniterpy.helpers.blockchain import load_json
+# from duniterpy.helpers.verification import verify_blocks
+# for result in verify_blocks(load_json()):
+#     if not result.valid:
+#         print(result.number, result.errors)
+# ```
+
+import itertools
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..documents import Block
+from ..key import VerifyingKey
+from ..key.verifying_key import verify_signature
+
+ERROR_SIGNATURE = "signature"
+ERROR_INNER_HASH = "inner_hash"
+ERROR_PROOF_OF_WORK = "proof_of_work"
+ERROR_PREVIOUS_HASH = "previous_hash"
+ERROR_BLOCK_NUMBER = "block_number"
+ERROR_DOCUMENTS = "documents"
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_WINDOW = 4
+
+
+class BlockVerification:
+    """
+    Verification result of a block
+    """
+
+    def __init__(
+        self,
+        number: int,
+        block_hash: str,
+        prev_hash: Optional[str],
+        errors: List[str],
+        invalid: List[Tuple[str, int]],
+    ) -> None:
+        """
+        Init BlockVerification instance
+
+        :param number: Block number
+        :param block_hash: Computed block hash
+        :param prev_hash: Previous hash declared in the block
+        :param errors: List of failed checks (ERROR_* constants)
+        :param invalid: List of (section name, index) of documents with a bad signature
+        """
+        self.number = number
+        self.hash = block_hash
+        self.prev_hash = prev_hash
+        self.errors = errors
+        self.invalid_documents = invalid
+
+    @property
+    def valid(self) -> bool:
+        """
+        Return True if all checks passed
+
+        :return:
+        """
+        return len(self.errors) == 0
+
+    def __repr__(self) -> str:
+        return "<BlockVerification {0} errors={1}>".format(self.number, self.errors)
+
+
+def check_proof_of_work(block_hash: str, powmin: int) -> bool:
+    """
+    Return True if the block hash satisfies the minimal proof of work difficulty
+
+    The hash must start with powmin // 16 zeros, followed by a character lower or equal
+    to 15 - powmin % 16 (hexadecimal).
+
+    This is only a lower bound: the personalized difficulty of the issuer,
+    which depends on its previous blocks in the issuers frame, is not checked.
+
+    :param block_hash: Block hash (hexadecimal upper case)
+    :param powmin: Minimal difficulty of the block
+    :return:
+    """
+    zeros = powmin // 16
+    if block_hash[:zeros] != "0" * zeros:
+        return False
+    return int(block_hash[zeros], 16) <= 15 - powmin % 16
+
+
+def invalid_documents(block: Block) -> List[Tuple[str, int]]:
+    """
+    Return the list of (section name, index) of embedded documents with a bad signature
+
+    Identities, memberships and transactions are checked.
+    Revocations and certifications can not be checked without their identity document.
+
+    :param block: Block instance
+    :return:
+    """
+    invalid = []  # type: List[Tuple[str, int]]
+    for index, identity in enumerate(block.identities):
+        if not verify_signature(
+            identity.pubkey, identity.raw(), identity.signatures[0]
+        ):
+            invalid.append(("identities", index))
+    for section in ("joiners", "actives", "leavers"):
+        for index, membership in enumerate(getattr(block, section)):
+            if not verify_signature(
+                membership.issuer, membership.raw(), membership.signatures[0]
+            ):
+                invalid.append((section, index))
+    for index, transaction in enumerate(block.transactions):
+        raw = transaction.raw()
+        if len(transaction.signatures) != len(transaction.issuers) or not all(
+            verify_signature(issuer, raw, signature)
+            for issuer, signature in zip(transaction.issuers, transaction.signatures)
+        ):
+            invalid.append(("transactions", index))
+    return invalid
+
+
+def verify_block(
+    block: Union[Block, dict, str], check_documents: bool = True
+) -> BlockVerification:
+    """
+    Verify block signature, inner hash, proof of work and embedded documents signatures
+
+    The proof of work is only checked against powmin, see check_proof_of_work().
+    The previous hash link can not be checked on a single block, see verify_blocks().
+
+    :param block: Block instance, parsed json block or signed raw block
+    :param check_documents: Verify embedded documents signatures (optional, default True)
+    :return:
+    """
+    if isinstance(block, dict):
+        block = Block.from_parsed_json(block)
+    elif isinstance(block, str):
+        block = Block.from_signed_raw(block, lazy=not check_documents)
+
+    errors = []  # type: List[str]
+    if not VerifyingKey(block.issuer).verify_document(block):
+        errors.append(ERROR_SIGNATURE)
+    if block.computed_inner_hash() != block.inner_hash:
+        errors.append(ERROR_INNER_HASH)
+    block_hash = block.proof_of_work()
+    if not check_proof_of_work(block_hash, block.powmin):
+        errors.append(ERROR_PROOF_OF_WORK)
+    invalid = []  # type: List[Tuple[str, int]]
+    if check_documents:
+        invalid = invalid_documents(block)
+        if invalid:
+            errors.append(ERROR_DOCUMENTS)
+
+    return BlockVerification(block.number, block_hash, block.prev_hash, errors, invalid)
+
+
+def _verify_batch(batch: List[Any], check_documents: bool) -> List[BlockVerification]:
+    """
+    Verify a batch of blocks in a worker process
+
+    :param batch: List of blocks
+    :param check_documents: Verify embedded documents signatures
+    :return:
+    """
+    return [verify_block(block, check_documents) for block in batch]
+
+
+def verify_blocks(
+    blocks: Iterable[Union[Block, dict, str]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    window: int = DEFAULT_WINDOW,
+    max_workers: Optional[int] = None,
+    check_documents: bool = True,
+    executor: Optional[Executor] = None,
+) -> Iterator[BlockVerification]:
+    """
+    Verify a stream of blocks in parallel and yield results in the same order
+
+    Blocks are sent by batches of batch_size to a process pool. At most window batches are
+    in flight at the same time, so memory usage is bounded by batch_size * window blocks.
+
+    The previous hash link is checked in the calling process between consecutive blocks of the stream.
+    A block whose number does not follow the previous block of the stream gets ERROR_BLOCK_NUMBER,
+    as its link can not be checked.
+
+    Blocks can be Block instances, parsed json blocks (as iterated by JsonBlockchain)
+    or signed raw blocks.
+
+    :param blocks: Iterable of blocks
+    :param batch_size: Number of blocks sent to a worker at once (optional, default 100)
+    :param window: Maximum number of batches in flight (optional, default 4)
+    :param max_workers: Number of worker processes if executor is None (optional, default cpu count)
+    :param check_documents: Verify embedded documents signatures (optional, default True)
+    :param executor: Executor to use instead of a new ProcessPoolExecutor (optional)
+    :return:
+    """
+    if batch_size < 1 or window < 1:
+        raise ValueError("batch_size and window must be greater than zero")
+
+    own_executor = executor is None
+    pool = (
+        ProcessPoolExecutor(max_workers=max_workers) if executor is None else executor
+    )
+    iterator = iter(blocks)
+    futures = deque()  # type: Deque[Future]
+    previous = None  # type: Optional[BlockVerification]
+
+    try:
+        while True:
+            # fill the window
+            while len(futures) < window:
+                batch = list(itertools.islice(iterator, batch_size))
+                if not batch:
+                    break
+                futures.append(pool.submit(_verify_batch, batch, check_documents))
+            if not futures:
+                break
+
+            # yield results of the oldest batch
+            for result in futures.popleft().result():
+                if previous is not None:
+                    if result.number != previous.number + 1:
+                        result.errors.append(ERROR_BLOCK_NUMBER)
+                    elif result.prev_hash != previous.hash:
+                        result.errors.append(ERROR_PREVIOUS_HASH)
+                previous = result
+                yield result
+    finally:
+        for future in futures:
+            future.cancel()
+        if own_executor:
+            pool.shutdown(wait=True)
@@ -0,0 +1,363 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# local web of trust graph, fed by blocks
+# example usage :
+# ```
+# from duniterpy.helpers.blockchain import load
+# from duniterpy.helpers.wot import WoTGraph
+# wot = WoTGraph()
+# wot.apply_blocks(load())
+# wot.sentries() # list of sentries pubkeys
+# wot.outdistanced() # list of members not respecting the distance rule
+# wot.expiring_before(time) # certifications expiring before time
+# ```
+
+import heapq
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ..documents import Block
+
+# currency parameters indexes in the parameters of block zero
+PARAMETER_SIG_VALIDITY = 6
+PARAMETER_XPERCENT = 10
+PARAMETER_STEP_MAX = 12
+
+
+class WoTGraph:
+    """
+    Web of trust graph of the certifications between identities
+
+    Identities are numbered in order of appearance, and certifications are stored
+    as adjacency arrays of identity numbers, updated at each applied block.
+    Certifications expire sig_validity seconds after the median time of their block,
+    and are removed when a block median time reaches their expiration.
+
+    Sentries and the distance rule follow the Duniter protocol,
+    paths going through all identities holding valid certifications.
+    """
+
+    def __init__(
+        self,
+        sig_validity: Optional[int] = None,
+        xpercent: Optional[float] = None,
+        step_max: Optional[int] = None,
+    ) -> None:
+        """
+        Init an empty WoTGraph instance
+
+        Currency parameters not given are read from the parameters of block zero.
+
+        :param sig_validity: Certification validity duration in seconds (optional)
+        :param xpercent: Minimum ratio of sentries reaching a member (optional)
+        :param step_max: Maximum distance between a sentry and a member (optional)
+        """
+        self.sig_validity = sig_validity
+        self.xpercent = xpercent
+        self.step_max = step_max
+        self.number = -1
+        self.mediantime = 0
+
+        self.pubkeys = []  # type: List[str]
+        self.ids = {}  # type: Dict[str, int]
+        self.members = set()  # type: Set[int]
+        # identity numbers of the certifications issued and received, by identity number
+        self.issued = []  # type: List[array]
+        self.received = []  # type: List[array]
+        # expiration time by (issuer, receiver) identity numbers
+        self.expirations = {}  # type: Dict[Tuple[int, int], int]
+        # (expiration time, issuer, receiver), renewed certifications leave outdated entries
+        self.expiration_queue = []  # type: List[Tuple[int, int, int]]
+        # distance rule results by identity number, for the current head
+        self._distances = None  # type: Optional[Dict[int, bool]]
+
+    def identity(self, pubkey: str) -> int:
+        """
+        Return the number of the identity of pubkey, added to the graph if needed
+
+        :param pubkey: Public key
+        :return:
+        """
+        if pubkey not in self.ids:
+            self.ids[pubkey] = len(self.pubkeys)
+            self.pubkeys.append(pubkey)
+            self.issued.append(array("l"))
+            self.received.append(array("l"))
+        return self.ids[pubkey]
+
+    def apply(self, block: Block) -> None:
+        """
+        Apply the memberships, exclusions, revocations and certifications of the next block
+
+        :param block: Next block
+        :return:
+        """
+        if block.number != self.number + 1:
+            raise ValueError(
+                "Block {0} does not follow block {1}".format(block.number, self.number)
+            )
+        if block.parameters:
+            self._set_parameters(block.parameters)
+        if self.sig_validity is None:
+            raise ValueError("Currency parameters are required to start after block 0")
+
+        for membership in block.joiners:
+            self.members.add(self.identity(membership.issuer))
+        for revocation in block.revoked:
+            self.members.discard(self.identity(revocation.pubkey))
+        for pubkey in block.excluded:
+            self.members.discard(self.identity(pubkey))
+
+        expiration = block.mediantime + self.sig_validity
+        for certification in block.certifications:
+            self.add_certification(
+                certification.pubkey_from, certification.pubkey_to, expiration
+            )
+
+        self.number = block.number
+        self.mediantime = block.mediantime
+        self.remove_expired(block.mediantime)
+        self._distances = None
+
+    def apply_blocks(self, blocks: Iterable[Block]) -> None:
+        """
+        Apply blocks in order, skipping blocks already applied
+
+        :param blocks: Iterable of blocks
+        :return:
+        """
+        for block in blocks:
+            if block.number > self.number:
+                self.apply(block)
+
+    def add_certification(
+        self, pubkey_from: str, pubkey_to: str, expiration: int
+    ) -> None:
+        """
+        Add or renew a certification
+
+        :param pubkey_from: Certifier public key
+        :param pubkey_to: Certified public key
+        :param expiration: Expiration time
+        :return:
+        """
+        issuer = self.identity(pubkey_from)
+        receiver = self.identity(pubkey_to)
+        if (issuer, receiver) not in self.expirations:
+            self.issued[issuer].append(receiver)
+            self.received[receiver].append(issuer)
+        self.expirations[(issuer, receiver)] = expiration
+        heapq.heappush(self.expiration_queue, (expiration, issuer, receiver))
+        self._distances = None
+
+    def remove_expired(self, time: int) -> None:
+        """
+        Remove the certifications expired at time
+
+        :param time: Median time
+        :return:
+        """
+        queue = self.expiration_queue
+        while queue and queue[0][0] <= time:
+            expiration, issuer, receiver = heapq.heappop(queue)
+            # skip renewed certifications
+            if self.expirations.get((issuer, receiver)) != expiration:
+                continue
+            del self.expirations[(issuer, receiver)]
+            self.issued[issuer].remove(receiver)
+            self.received[receiver].remove(issuer)
+            self._distances = None
+
+    def certifiers_of(self, pubkey: str) -> List[str]:
+        """
+        Return the public keys of the valid certifiers of pubkey
+
+        :param pubkey: Public key
+        :return:
+        """
+        if pubkey not in self.ids:
+            return []
+        return [self.pubkeys[issuer] for issuer in self.received[self.ids[pubkey]]]
+
+    def certified_by(self, pubkey: str) -> List[str]:
+        """
+        Return the public keys certified by pubkey with a valid certification
+
+        :param pubkey: Public key
+        :return:
+        """
+        if pubkey not in self.ids:
+            return []
+        return [self.pubkeys[receiver] for receiver in self.issued[self.ids[pubkey]]]
+
+    def expiring_before(self, time: int) -> List[Tuple[str, str, int]]:
+        """
+        Return (certifier, certified, expiration) of the certifications expiring before time
+
+        Results are sorted by expiration time.
+
+        :param time: Timestamp
+        :return:
+        """
+        expiring = sorted(
+            (expiration, issuer, receiver)
+            for (issuer, receiver), expiration in self.expirations.items()
+            if expiration < time
+        )
+        return [
+            (self.pubkeys[issuer], self.pubkeys[receiver], expiration)
+            for expiration, issuer, receiver in expiring
+        ]
+
+    def sentries_threshold(self) -> int:
+        """
+        Return the minimum count of issued and received certifications of a sentry
+
+        :return:
+        """
+        if not self.members:
+            return 0
+        return math.ceil(len(self.members) ** (1 / self.step_max))  # type: ignore
+
+    def sentries(self) -> List[str]:
+        """
+        Return the public keys of the sentries
+
+        :return:
+        """
+        return [self.pubkeys[sentry] for sentry in self._sentries()]
+
+    def distance_ok(self, pubkey: str) -> bool:
+        """
+        Return True if the member of pubkey respects the distance rule
+
+        xpercent of the sentries must reach the member in step_max steps at most.
+
+        :param pubkey: Public key
+        :return:
+        """
+        if pubkey not in self.ids:
+            return False
+        member = self.ids[pubkey]
+        if self._distances is not None and member in self._distances:
+            return self._distances[member]
+
+        sentries = set(self._sentries())
+        sentries.discard(member)
+        reached = {member}
+        frontier = [member]
+        for _ in range(self.step_max):  # type: ignore
+            next_frontier = []
+            for node in frontier:
+                for issuer in self.received[node]:
+                    if issuer not in reached:
+                        reached.add(issuer)
+                        next_frontier.append(issuer)
+            frontier = next_frontier
+        return self._enough_sentries(len(sentries & reached), len(sentries))
+
+    def distances(self) -> Dict[str, bool]:
+        """
+        Return the distance rule result of all the members, by public key
+
+        All members are computed at once by propagating bitsets of the sentries
+        reaching each identity along the certifications, one step at a time.
+
+        :return:
+        """
+        if self._distances is None:
+            sentries = self._sentries()
+            bits = {sentry: 1 << bit for bit, sentry in enumerate(sentries)}
+            reach = [bits.get(node, 0) for node in range(len(self.pubkeys))]
+            for _ in range(self.step_max):  # type: ignore
+                reach = [
+                    reach[node] | _union(reach, self.received[node])
+                    for node in range(len(reach))
+                ]
+            self._distances = {}
+            for member in self.members:
+                # the member is not counted in the sentries reaching itself
+                own_bit = bits.get(member, 0)
+                count = bin(reach[member] & ~own_bit).count("1")
+                self._distances[member] = self._enough_sentries(
+                    count, len(sentries) - (1 if own_bit else 0)
+                )
+        return {
+            self.pubkeys[member]: result for member, result in self._distances.items()
+        }
+
+    def outdistanced(self) -> List[str]:
+        """
+        Return the public keys of the members not respecting the distance rule
+
+        :return:
+        """
+        return [pubkey for pubkey, result in self.distances().items() if not result]
+
+    def _sentries(self) -> List[int]:
+        """
+        Return the identity numbers of the sentries
+
+        :return:
+        """
+        threshold = self.sentries_threshold()
+        return sorted(
+            member
+            for member in self.members
+            if len(self.issued[member]) >= threshold
+            and len(self.received[member]) >= threshold
+        )
+
+    def _enough_sentries(self, reached: int, total: int) -> bool:
+        """
+        Return True if the reached sentries count respects the distance rule
+
+        :param reached: Count of sentries reaching the member
+        :param total: Count of sentries, the member excluded
+        :return:
+        """
+        return reached >= self.xpercent * total  # type: ignore
+
+    def _set_parameters(self, parameters: Sequence[str]) -> None:
+        """
+        Set the currency parameters not given at init from block zero parameters
+
+        :param parameters: Parameters of block zero
+        :return:
+        """
+        if self.sig_validity is None:
+            self.sig_validity = int(parameters[PARAMETER_SIG_VALIDITY])
+        if self.xpercent is None:
+            self.xpercent = float(parameters[PARAMETER_XPERCENT])
+        if self.step_max is None:
+            self.step_max = int(parameters[PARAMETER_STEP_MAX])
+
+
+def _union(reach: List[int], nodes: array) -> int:
+    """
+    Return the union of the bitsets of nodes
+
+    :param reach: Bitsets by identity number
+    :param nodes: Identity numbers
+    :return:
+    """
+    result = 0
+    for node in nodes:
+        result |= reach[node]
+    return result
@@ -15,15 +15,60 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import asyncio
+import random
+import statistics
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
 import jsonschema
-from typing import Union
+
 from duniterpy.api import ws2p, bma
-from duniterpy.api.client import WSConnection, Client
+from duniterpy.api.client import (
+    VALIDATE_FULL,
+    SessionPool,
+    WSConnection,
+    Client,
+    validate,
+)
 from duniterpy.api.endpoint import BMAEndpoint, SecuredBMAEndpoint, WS2PEndpoint
+from duniterpy.api.ws2p.client import (
+    CONNECTION_ERRORS,
+    DEFAULT_REQUEST_TIMEOUT,
+    WS2PClient,
+)
 from duniterpy.documents.ws2p.messages import Connect, Ack, Ok
 from duniterpy.key import SigningKey
 import logging
 
+# connections kept by a pool
+DEFAULT_POOL_SIZE = 3
+# reconnection delay bounds in seconds, the delay is doubled at each failure
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+# weight of the last response duration in the latency moving average
+LATENCY_SMOOTHING = 0.3
+# errors of a failed connection or handshake, aiohttp raises a TypeError when
+# the peer closes the connection during the handshake
+CONNECT_ERRORS = CONNECTION_ERRORS + (
+    TypeError,
+    ValueError,
+    jsonschema.ValidationError,
+)
+# latency in seconds assumed for the connections without response yet,
+# before any connection has answered
+DEFAULT_LATENCY = 1.0
+
 
 async def handshake(ws: WSConnection, signing_key: SigningKey, currency: str):
     """
@@ -51,7 +96,7 @@ async def handshake(ws: WSConnection, signing_key: SigningKey, currency: str):
         data = await ws.receive_json()
 
         if "auth" in data and data["auth"] == "CONNECT":
-            jsonschema.validate(data, ws2p.network.WS2P_CONNECT_MESSAGE_SCHEMA)
+            validate(data, ws2p.network.WS2P_CONNECT_MESSAGE_SCHEMA)
 
             logging.debug("Received a CONNECT message")
 
@@ -70,7 +115,7 @@ async def handshake(ws: WSConnection, signing_key: SigningKey, currency: str):
             await ws.send_str(ack_message)
 
         if "auth" in data and data["auth"] == "ACK":
-            jsonschema.validate(data, ws2p.network.WS2P_ACK_MESSAGE_SCHEMA)
+            validate(data, ws2p.network.WS2P_ACK_MESSAGE_SCHEMA)
 
             logging.debug("Received an ACK message")
 
@@ -93,7 +138,7 @@ async def handshake(ws: WSConnection, signing_key: SigningKey, currency: str):
             and "auth" in data
             and data["auth"] == "OK"
         ):
-            jsonschema.validate(data, ws2p.network.WS2P_OK_MESSAGE_SCHEMA)
+            validate(data, ws2p.network.WS2P_OK_MESSAGE_SCHEMA)
 
             logging.debug("Received an OK message")
 
@@ -114,17 +159,447 @@ async def handshake(ws: WSConnection, signing_key: SigningKey, currency: str):
 
 
 async def generate_ws2p_endpoint(
-    bma_endpoint: Union[str, BMAEndpoint, SecuredBMAEndpoint]
+    bma_endpoint: Union[str, BMAEndpoint, SecuredBMAEndpoint, Client]
 ) -> WS2PEndpoint:
     """
     Retrieve WS2P endpoints from BMA peering
     Take the first one found
+
+    A Client instance given is used for the request and is not closed.
+
+    :param bma_endpoint: BMA endpoint or Client instance
+    :return:
+    """
+    if isinstance(bma_endpoint, Client):
+        peering = await bma_endpoint(bma.network.peering)
+    else:
+        bma_client = Client(bma_endpoint)
+        try:
+            peering = await bma_client(bma.network.peering)
+        finally:
+            await bma_client.close()
+
+    endpoints = ws2p_endpoints(peering)
+    if not endpoints:
+        raise ValueError("No WS2P endpoint found")
+    return endpoints[0]
+
+
+def ws2p_endpoints(peer: dict) -> List[WS2PEndpoint]:
+    """
+    Return the WS2P endpoints of a peer document in json format
+
+    :param peer: Peering document or entry of the peers list
+    :return:
+    """
+    return [
+        WS2PEndpoint.from_inline(endpoint)
+        for endpoint in peer["endpoints"]
+        if endpoint.startswith("WS2P ")
+    ]
+
+
+async def get_ws2p_endpoints(client: Client) -> List[WS2PEndpoint]:
     """
-    bma_client = Client(bma_endpoint)
-    peering = await bma_client(bma.network.peering)
-    await bma_client.close()
-
-    for endpoint in peering["endpoints"]:
-        if endpoint.startswith("WS2P"):
-            return WS2PEndpoint.from_inline(endpoint)
-    raise ValueError("No WS2P endpoint found")
+    Return the WS2P endpoints of the UP peers known by the BMA node of client, one per peer
+
+    :param client: Client instance
+    :return:
+    """
+    peers = await client(bma.network.peers)
+    endpoints = []
+    for peer in peers["peers"]:
+        if peer.get("status") != "UP":
+            continue
+        try:
+            peer_endpoints = ws2p_endpoints(peer)
+        except (AttributeError, ValueError):
+            # malformed endpoint
+            continue
+        if peer_endpoints:
+            endpoints.append(peer_endpoints[0])
+    return endpoints
+
+
+class PooledConnection:
+    """
+    Connection slot of a WS2PPool, with its load statistics
+    """
+
+    def __init__(self, endpoint: WS2PEndpoint) -> None:
+        """
+        Init PooledConnection instance
+
+        :param endpoint: WS2P endpoint of the peer
+        """
+        self.endpoint = endpoint
+        self.client = None  # type: Optional[WS2PClient]
+        self.in_flight = 0
+        # moving average of the responses durations in seconds, None before the first response
+        self.latency = None  # type: Optional[float]
+        self.failures = 0
+
+    def score(self, default_latency: float) -> float:
+        """
+        Return the expected wait of a new request, lower is better
+
+        :param default_latency: Latency of the connection if it has no response yet
+        :return:
+        """
+        latency = default_latency if self.latency is None else self.latency
+        return (self.in_flight + 1) * latency
+
+    def observe(self, duration: float) -> None:
+        """
+        Update the latency with a response duration
+
+        :param duration: Response duration in seconds
+        :return:
+        """
+        if self.latency is None:
+            self.latency = duration
+        else:
+            self.latency += LATENCY_SMOOTHING * (duration - self.latency)
+
+
+class WS2PPool:
+    """
+    Pool of handshaked WS2P connections to different peers
+
+    Each connection slot is kept alive by a task reconnecting with a jittered exponential
+    backoff when the connection drops, switching to a spare endpoint after a failure.
+    Requests are sent to the connection with the lowest expected wait, from its requests
+    in flight and its latency, so bulk requests are spread over all the peers.
+
+    Usage:
+
+        pool = WS2PPool(endpoints, signing_key, "g1")
+        pool.start()
+        blocks = await asyncio.gather(*[pool.get_blocks(n, 500) for n in range(0, 5000, 500)])
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[WS2PEndpoint],
+        signing_key: SigningKey,
+        currency: str,
+        size: int = DEFAULT_POOL_SIZE,
+        session_pool: Optional[SessionPool] = None,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        validation: str = VALIDATE_FULL,
+        min_backoff: float = MIN_BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        connect: Optional[Callable[[WS2PEndpoint], Awaitable[WS2PClient]]] = None,
+    ) -> None:
+        """
+        Init WS2PPool instance
+
+        :param endpoints: WS2P endpoints of different peers, the ones not connected are spares
+        :param signing_key: SigningKey instance of the handshakes
+        :param currency: Currency name
+        :param size: Count of connections (optional, default 3)
+        :param session_pool: SessionPool instance of the connections (optional, default shared pool)
+        :param timeout: Handshake and request timeout in seconds (optional, default 30)
+        :param validation: Response validation mode (optional, default VALIDATE_FULL)
+        :param min_backoff: First reconnection delay bound in seconds (optional, default 1)
+        :param max_backoff: Max reconnection delay bound in seconds (optional, default 60)
+        :param connect: Coroutine function returning a started WS2PClient of an endpoint
+            (optional, default connection and handshake with the signing key)
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.signing_key = signing_key
+        self.currency = currency
+        self.session_pool = session_pool
+        self.timeout = timeout
+        self.validation = validation
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connect = self._connect if connect is None else connect
+        size = min(size, len(endpoints))
+        self.connections = [PooledConnection(endpoint) for endpoint in endpoints[:size]]
+        self.spares = deque(endpoints[size:])  # type: Deque[WS2PEndpoint]
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._tasks = []  # type: List[asyncio.Future]
+        # clients of the endpoints, reused across the reconnections
+        self._clients = {}  # type: Dict[str, Client]
+
+    def start(self) -> None:
+        """
+        Start the tasks keeping the connections alive
+
+        :return:
+        """
+        if not self._tasks:
+            self._tasks = [
+                asyncio.ensure_future(self._keep(connection))
+                for connection in self.connections
+            ]
+
+    async def close(self) -> None:
+        """
+        Stop the reconnections and close the connections
+
+        :return:
+        """
+        self.closed = True
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        self._tasks = []
+        for connection in self.connections:
+            if connection.client is not None:
+                await connection.client.close()
+                connection.client = None
+        # release the sessions borrowed from the session pool
+        for client in self._clients.values():
+            await client.close()
+        self._clients = {}
+        self._ready.clear()
+
+    async def __aenter__(self) -> "WS2PPool":
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    def connected(self) -> List[PooledConnection]:
+        """
+        Return the connections ready for requests
+
+        :return:
+        """
+        return [
+            connection
+            for connection in self.connections
+            if connection.client is not None and not connection.client.closed
+        ]
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait until at least one connection is ready
+
+        :param timeout: Timeout in seconds (optional, default None)
+        :return:
+        """
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    def best_connection(self, connections: List[PooledConnection]) -> PooledConnection:
+        """
+        Return the connection with the lowest expected wait
+
+        Connections without response yet are given the median latency of the
+        measured connections, and are preferred to measured ones on equal wait.
+
+        :param connections: Connected PooledConnection instances
+        :return:
+        """
+        latencies = [c.latency for c in self.connections if c.latency is not None]
+        default_latency = statistics.median(latencies) if latencies else DEFAULT_LATENCY
+        return min(
+            connections,
+            key=lambda c: (
+                c.score(default_latency),
+                c.in_flight,
+                c.latency is not None,
+            ),
+        )
+
+    async def request(
+        self,
+        build: Callable[..., str],
+        *args: Any,
+        schema: Optional[dict] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Send a request on the best connection and return the body of its response
+
+        A request failed by a connection drop is sent again on another connection.
+
+        :param build: Function of the ws2p requests module returning the request string
+        :param args: Arguments of build after the request id
+        :param schema: Json Schema of the response (optional, default None)
+        :param timeout: Timeout in seconds (optional, default pool timeout)
+        :return:
+        """
+        if timeout is None:
+            timeout = self.timeout
+        loop = asyncio.get_event_loop()
+        attempt = 0
+        while True:
+            if self.closed:
+                raise ConnectionError("WS2P pool closed")
+            connections = self.connected()
+            if not connections:
+                self._ready.clear()
+                await self.wait_ready(timeout)
+                continue
+            connection = self.best_connection(connections)
+            client = connection.client
+            if client is None:
+                continue
+            connection.in_flight += 1
+            started = loop.time()
+            try:
+                result = await client.request(
+                    build, *args, schema=schema, timeout=timeout
+                )
+            except ConnectionError:
+                attempt += 1
+                if attempt > len(self.connections):
+                    raise
+                continue
+            finally:
+                connection.in_flight -= 1
+            connection.observe(loop.time() - started)
+            return result
+
+    async def get_current(self, timeout: Optional[float] = None) -> dict:
+        """
+        Return the current block
+
+        :param timeout: Timeout in seconds (optional, default pool timeout)
+        :return:
+        """
+        return await self.request(
+            ws2p.requests.get_current,
+            schema=ws2p.requests.BLOCK_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    async def get_block(self, number: int, timeout: Optional[float] = None) -> dict:
+        """
+        Return the block with number
+
+        :param number: Block number
+        :param timeout: Timeout in seconds (optional, default pool timeout)
+        :return:
+        """
+        return await self.request(
+            ws2p.requests.get_block,
+            number,
+            schema=ws2p.requests.BLOCK_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    async def get_blocks(
+        self, from_number: int, count: int, timeout: Optional[float] = None
+    ) -> List[dict]:
+        """
+        Return count blocks from from_number
+
+        :param from_number: Number of the first block
+        :param count: Count of blocks
+        :param timeout: Timeout in seconds (optional, default pool timeout)
+        :return:
+        """
+        return await self.request(
+            ws2p.requests.get_blocks,
+            from_number,
+            count,
+            schema=ws2p.requests.BLOCKS_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    async def get_requirements_pending(
+        self, min_cert: int, timeout: Optional[float] = None
+    ) -> dict:
+        """
+        Return the requirements of the pending identities with min_cert certifications
+
+        :param min_cert: Minimum count of pending certifications
+        :param timeout: Timeout in seconds (optional, default pool timeout)
+        :return:
+        """
+        return await self.request(
+            ws2p.requests.get_requirements_pending,
+            min_cert,
+            schema=ws2p.requests.REQUIREMENTS_RESPONSE_SCHEMA,
+            timeout=timeout,
+        )
+
+    def backoff(self, failures: int) -> float:
+        """
+        Return a random reconnection delay after failures consecutive failures
+
+        :param failures: Count of consecutive failures
+        :return:
+        """
+        return random.uniform(
+            0, min(self.max_backoff, self.min_backoff * 2**failures)
+        )
+
+    def client(self, endpoint: WS2PEndpoint) -> Client:
+        """
+        Return the Client instance of endpoint, created on first use and closed by close()
+
+        :param endpoint: WS2P endpoint
+        :return:
+        """
+        key = endpoint.inline()
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = Client(
+                endpoint, session_pool=self.session_pool
+            )
+        return client
+
+    async def _connect(self, endpoint: WS2PEndpoint) -> WS2PClient:
+        """
+        Connect to endpoint, handshake and return the started WS2PClient
+
+        :param endpoint: WS2P endpoint
+        :return:
+        """
+        ws = await self.client(endpoint).connect_ws()
+        try:
+            await handshake(ws, self.signing_key, self.currency)
+        except BaseException:
+            await ws.close()
+            raise
+        client = WS2PClient(ws, self.timeout, self.validation)
+        client.start()
+        return client
+
+    async def _keep(self, connection: PooledConnection) -> None:
+        """
+        Keep the connection alive until the pool is closed
+
+        :param connection: PooledConnection instance
+        :return:
+        """
+        while not self.closed:
+            try:
+                client = await asyncio.wait_for(
+                    self.connect(connection.endpoint), self.timeout
+                )
+            except CONNECT_ERRORS as exception:
+                connection.failures += 1
+                logging.debug(
+                    "WS2P connection to %s failed (%d): %s",
+                    connection.endpoint.inline(),
+                    connection.failures,
+                    exception,
+                )
+                # try a spare endpoint next time
+                if self.spares:
+                    self.spares.append(connection.endpoint)
+                    connection.endpoint = self.spares.popleft()
+                    connection.latency = None
+                await asyncio.sleep(self.backoff(connection.failures))
+                continue
+
+            connection.failures = 0
+            connection.client = client
+            self._ready.set()
+            await client.wait_closed()
+            connection.client = None
+            if not self.connected():
+                self._ready.clear()
+            logging.debug("WS2P connection to %s lost", connection.endpoint.inline())
+            await asyncio.sleep(self.backoff(0))
@@ -16,8 +16,11 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import base64
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Iterable, List, Sequence, Tuple, Union
 
+import libnacl
 import libnacl.sign
 import libnacl.encode
 
@@ -25,6 +28,49 @@ from duniterpy.documents import Document
 from duniterpy.documents.block import Block
 from .base58 import Base58Encoder
 
+# max number of decoded public keys kept in cache
+PUBKEYS_CACHE_SIZE = 4096
+
+# (pubkey, message, signature) tuple, message and signature can be str (ascii and base64) or bytes
+SignedItem = Tuple[str, Union[str, bytes], Union[str, bytes]]
+
+
+@lru_cache(maxsize=PUBKEYS_CACHE_SIZE)
+def decode_pubkey(pubkey: str) -> bytes:
+    """
+    Return the raw verifying key bytes of a base58 public key
+
+    Results are cached, as the same keys are verified again and again.
+
+    :param pubkey: Base58 public key
+    :return:
+    """
+    return Base58Encoder.decode(pubkey)
+
+
+def verify_signature(
+    pubkey: str, message: Union[str, bytes], signature: Union[str, bytes]
+) -> bool:
+    """
+    Return True if signature of message is valid for pubkey
+
+    The detached signature is checked directly, without building a signed message copy.
+
+    :param pubkey: Base58 public key
+    :param message: Message as ascii str or bytes
+    :param signature: Signature as base64 str or bytes
+    :return:
+    """
+    try:
+        if isinstance(message, str):
+            message = bytes(message, "ascii")
+        if isinstance(signature, str):
+            signature = base64.b64decode(signature)
+        libnacl.crypto_sign_verify_detached(signature, message, decode_pubkey(pubkey))
+        return True
+    except ValueError:
+        return False
+
 
 class VerifyingKey(libnacl.sign.Verifier):
     """
@@ -36,7 +82,7 @@ class VerifyingKey(libnacl.sign.Verifier):
         Creates a Verify class from base58 pubkey
         :param pubkey:
         """
-        key = libnacl.encode.hex_encode(Base58Encoder.decode(pubkey))
+        key = libnacl.encode.hex_encode(decode_pubkey(pubkey))
         super().__init__(key)
 
     def verify_document(self, document: Document) -> bool:
@@ -52,13 +98,8 @@ class VerifyingKey(libnacl.sign.Verifier):
             )
         else:
             content_to_verify = document.raw()
-        prepended = signature + bytes(content_to_verify, "ascii")
 
-        try:
-            self.verify(prepended)
-            return True
-        except ValueError:
-            return False
+        return self.verify_detached(bytes(content_to_verify, "ascii"), signature)
 
     def verify_ws2p_head(self, head: Any) -> bool:
         """
@@ -68,10 +109,19 @@ class VerifyingKey(libnacl.sign.Verifier):
         """
         signature = base64.b64decode(head.signature)
         inline = head.inline()
-        prepended = signature + bytes(inline, "ascii")
 
+        return self.verify_detached(bytes(inline, "ascii"), signature)
+
+    def verify_detached(self, message: bytes, signature: bytes) -> bool:
+        """
+        Check signature of message, without building the signed message copy
+
+        :param message: Message bytes
+        :param signature: Signature bytes
+        :return:
+        """
         try:
-            self.verify(prepended)
+            libnacl.crypto_sign_verify_detached(signature, message, self.vk)
             return True
         except ValueError:
             return False
@@ -86,3 +136,40 @@ class VerifyingKey(libnacl.sign.Verifier):
         :return:
         """
         return self.verify(data)
+
+    @staticmethod
+    def verify_many(items: Iterable[SignedItem], threads: int = 0) -> List[bool]:
+        """
+        Check many signatures at once and return a list of results in the same order
+
+        Items are (pubkey, message, signature) tuples, message being an ascii str or bytes,
+        signature a base64 str or bytes. Decoded public keys are cached.
+
+        As libnacl releases the GIL, work can be spread across threads.
+
+        :param items: Iterable of (pubkey, message, signature) tuples
+        :param threads: Number of threads, 0 or 1 to verify in the current thread (optional, default 0)
+        :return:
+        """
+        items = list(items)
+        if threads <= 1 or len(items) < 2:
+            return [verify_signature(*item) for item in items]
+
+        # one chunk per thread to limit scheduling overhead
+        size = -(-len(items) // threads)
+        chunks = [items[i : i + size] for i in range(0, len(items), size)]
+        results = []  # type: List[bool]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for chunk_results in executor.map(_verify_chunk, chunks):
+                results.extend(chunk_results)
+        return results
+
+
+def _verify_chunk(items: Sequence[SignedItem]) -> List[bool]:
+    """
+    Check a chunk of signatures
+
+    :param items: Sequence of (pubkey, message, signature) tuples
+    :return:
+    """
+    return [verify_signature(*item) for item in items]
@@ -39,7 +39,8 @@ async def main():
     # Create Client from endpoint string in Duniter format
     client = Client(BMAS_ENDPOINT)
 
-    groups = await network.get_available_nodes(client)
+    # probe the endpoints to keep only the reachable ones, sorted by latency
+    groups = await network.get_available_nodes(client, probe=True)
     for group in groups:
         block = group[0]["head"].blockstamp
         print(f"block {block} shared by {len(group)} nodes")
@@ -48,7 +49,7 @@ async def main():
 
     for node in groups[0]:
         for endpoint in node["endpoints"]:
-            print(endpoint)
+            print(f"{endpoint} ({node['latency'] * 1000:.0f} ms)")
 
     # Close client aiohttp session
     await client.close()
@@ -17,7 +17,6 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
 import json
-import time
 import sys
 
 from _socket import gaierror
@@ -25,14 +24,12 @@ from _socket import gaierror
 import aiohttp
 import jsonschema
 from jsonschema import ValidationError
-from typing import Any
 
-from duniterpy.tools import get_ws2p_challenge
 from duniterpy.key import SigningKey
 
 from duniterpy.helpers.ws2p import handshake, generate_ws2p_endpoint
-from duniterpy.api.ws2p import requests
-from duniterpy.api.client import Client, WSConnection
+from duniterpy.api.ws2p.client import WS2PClient, WS2PError
+from duniterpy.api.client import Client
 
 # CONFIG #######################################
 
@@ -46,43 +43,6 @@ CURRENCY = "g1-test"
 ################################################
 
 
-async def send(ws: WSConnection, request: str, request_id: str, schema: dict) -> Any:
-    """
-    Send a WS2P request
-
-    :rtype: Any
-    :param ws: WSConnection instance
-    :param request: Request string to send
-    :param request_id: Unique request id
-    :param schema: Validation schema
-    """
-    # Send request
-    await ws.send_str(request)
-
-    # Wait response with request id
-    response = await ws.receive_json()
-    while "resId" not in response or (
-        "resId" in response and response["resId"] != request_id
-    ):
-        response = await ws.receive_json()
-        time.sleep(1)
-    try:
-        # Check response format
-        jsonschema.validate(response, schema)
-        # If valid display response
-    except ValidationError:
-        # If invalid response...
-        try:
-            # Check error response format
-            jsonschema.validate(response, requests.ERROR_RESPONSE_SCHEMA)
-            # If valid, display error response
-        except ValidationError as exception:
-            # If invalid, display exception on response validation
-            print(exception)
-
-    return response
-
-
 async def main():
     """
     Main code
@@ -124,49 +84,31 @@ async def main():
             print("HANDSHAKE FAILED !")
             sys.exit(1)
 
-        # Send ws2p request
-        print("Send getCurrent() request")
-        request_id = get_ws2p_challenge()[:8]
-        response = await send(
-            ws,
-            requests.get_current(request_id),
-            request_id,
-            requests.BLOCK_RESPONSE_SCHEMA,
-        )
-        print("Response: " + json.dumps(response, indent=2))
+        # Requests share the connection, responses are routed by request id
+        ws2p_client = WS2PClient(ws)
+        ws2p_client.start()
 
-        # Send ws2p request
-        print("Send getBlock(30000) request")
-        request_id = get_ws2p_challenge()[:8]
-        response = await send(
-            ws,
-            requests.get_block(request_id, 30000),
-            request_id,
-            requests.BLOCK_RESPONSE_SCHEMA,
+        # Send ws2p requests concurrently
+        print("Send getCurrent(), getBlock(30000), getBlocks(30000, 2) requests")
+        current, block, blocks = await asyncio.gather(
+            ws2p_client.get_current(),
+            ws2p_client.get_block(30000),
+            ws2p_client.get_blocks(30000, 2),
         )
-        print("Response: " + json.dumps(response, indent=2))
-
-        # Send ws2p request
-        print("Send getBlocks(30000, 2) request")
-        request_id = get_ws2p_challenge()[:8]
-        response = await send(
-            ws,
-            requests.get_blocks(request_id, 30000, 2),
-            request_id,
-            requests.BLOCKS_RESPONSE_SCHEMA,
-        )
-        print("Response: " + json.dumps(response, indent=2))
+        print("getCurrent() response: " + json.dumps(current, indent=2))
+        print("getBlock(30000) response: " + json.dumps(block, indent=2))
+        print("getBlocks(30000, 2) response: " + json.dumps(blocks, indent=2))
 
         # Send ws2p request
         print("Send getRequirementsPending(3) request")
-        request_id = get_ws2p_challenge()[:8]
-        response = await send(
-            ws,
-            requests.get_requirements_pending(request_id, 3),
-            request_id,
-            requests.REQUIREMENTS_RESPONSE_SCHEMA,
-        )
-        print("Response: " + json.dumps(response, indent=2))
+        try:
+            response = await ws2p_client.get_requirements_pending(3)
+            print("Response: " + json.dumps(response, indent=2))
+        except WS2PError as e:
+            print("Error response: " + str(e))
+
+        # Stop the reader task and close the web socket connection
+        await ws2p_client.close()
 
         # Close session
         await client.close()
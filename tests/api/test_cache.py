@@ -0,0 +1,195 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+import unittest
+
+import jsonschema
+
+from duniterpy.api import bma
+from duniterpy.api.cache import ResponseCache
+from duniterpy.api.client import VALIDATE_OFF, VALIDATE_SAMPLED, Client
+from duniterpy.api.endpoint import BMAEndpoint
+from tests.api.webserver import WebFunctionalSetupMixin, web
+
+ENDPOINT = BMAEndpoint("127.0.0.1", "", "", 10901)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_key(self):
+        self.assertEqual(
+            ResponseCache.key(ENDPOINT, "/tx/sources/A", {"b": 1, "a": 2}),
+            ResponseCache.key(ENDPOINT, "tx/sources/A", {"a": 2, "b": 1}),
+        )
+        self.assertNotEqual(
+            ResponseCache.key(ENDPOINT, "tx/sources/A"),
+            ResponseCache.key(BMAEndpoint("127.0.0.1", "", "", 10902), "tx/sources/A"),
+        )
+        self.assertNotEqual(
+            ResponseCache.key(ENDPOINT, "tx/sources/A"),
+            ResponseCache.key(ENDPOINT, "tx/sources/A", schema=bma.tx.SOURCES_SCHEMA),
+        )
+
+    def test_immutable_paths(self):
+        cache = ResponseCache()
+        self.assertTrue(cache.is_immutable("blockchain/parameters"))
+        self.assertTrue(cache.is_immutable("/blockchain/block/30000"))
+        self.assertTrue(cache.is_immutable("blockchain/blocks/50/100"))
+        self.assertFalse(cache.is_immutable("blockchain/current"))
+        self.assertFalse(cache.is_immutable("blockchain/block/30000/extra"))
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_size=2)
+        keys = [
+            ResponseCache.key(ENDPOINT, "wot/lookup/{0}".format(i)) for i in range(3)
+        ]
+        cache.put(keys[0], {"n": 0})
+        cache.put(keys[1], {"n": 1})
+        # the first key becomes the most recently used
+        self.assertEqual(cache.get(keys[0]), {"n": 0})
+        cache.put(keys[2], {"n": 2})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[2]), {"n": 2})
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertAlmostEqual(cache.hit_rate, 2 / 3)
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=0.05)
+        current = ResponseCache.key(ENDPOINT, "blockchain/current")
+        block = ResponseCache.key(ENDPOINT, "blockchain/block/10")
+        cache.put(current, {"number": 10})
+        cache.put(block, {"number": 10})
+        self.assertEqual(cache.get(current), {"number": 10})
+        time.sleep(0.06)
+        self.assertIsNone(cache.get(current))
+        self.assertEqual(cache.get(block), {"number": 10})
+
+    def test_truncated_range(self):
+        cache = ResponseCache()
+        self.assertTrue(cache.is_immutable("blockchain/blocks/2/10", [{}, {}]))
+        self.assertFalse(cache.is_immutable("blockchain/blocks/3/10", [{}, {}]))
+        full = ResponseCache.key(ENDPOINT, "blockchain/blocks/2/10")
+        truncated = ResponseCache.key(ENDPOINT, "blockchain/blocks/3/10")
+        cache.update_current(11)
+        cache.put(full, [{"number": 10}, {"number": 11}])
+        cache.put(truncated, [{"number": 10}, {"number": 11}])
+        # the truncated range expires with the next block
+        cache.update_current(12)
+        self.assertIsNone(cache.get(truncated))
+        self.assertEqual(len(cache.get(full)), 2)
+
+    def test_new_block_invalidation(self):
+        cache = ResponseCache()
+        current = ResponseCache.key(ENDPOINT, "blockchain/current")
+        block = ResponseCache.key(ENDPOINT, "blockchain/block/10")
+        cache.update_current(10, "A")
+        cache.put(current, {"number": 10})
+        cache.put(block, {"number": 10})
+
+        # same block
+        cache.update_current(10, "A")
+        self.assertEqual(cache.get(current), {"number": 10})
+
+        cache.update_current(11, "B")
+        self.assertIsNone(cache.get(current))
+        self.assertEqual(cache.get(block), {"number": 10})
+
+        # rollback: the immutable blocks are removed too
+        cache.update_current(10, "C")
+        self.assertIsNone(cache.get(block))
+
+
+class TestClientCache(WebFunctionalSetupMixin, unittest.TestCase):
+    def test_client_get(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request.path_qs)
+            return web.json_response({"number": len(requests)})
+
+        async def go():
+            self.app.router.add_route("GET", "/blockchain/block/{number}", handler)
+            _, port, _ = await self.create_server("GET", "/blockchain/current", handler)
+            cache = ResponseCache()
+            client = Client(
+                BMAEndpoint("127.0.0.1", "", "", port),
+                validation=VALIDATE_OFF,
+                cache=cache,
+            )
+
+            first = await client(bma.blockchain.current)
+            self.assertEqual(await client(bma.blockchain.current), first)
+            await client(bma.blockchain.block, 5)
+            await client(bma.blockchain.block, 5)
+            # text responses are not cached
+            await client.get("blockchain/current", rtype="text")
+            self.assertEqual(len(requests), 3)
+            self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+            cache.update_current(2)
+            self.assertNotEqual(await client(bma.blockchain.current), first)
+            self.assertEqual(len(requests), 4)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_validated_responses(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request.path_qs)
+            return web.json_response({})
+
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/parameters", handler
+            )
+            cache = ResponseCache()
+            _endpoint = BMAEndpoint("127.0.0.1", "", "", port)
+
+            # responses skipped by the sampled validation are not cached
+            client = Client(
+                _endpoint,
+                validation=VALIDATE_SAMPLED,
+                validation_sample_rate=0,
+                cache=cache,
+            )
+            for _ in range(2):
+                self.assertEqual(await client(bma.blockchain.parameters), {})
+            self.assertEqual(len(cache), 0)
+            await client.close()
+
+            # invalid responses are not cached
+            client = Client(_endpoint, cache=cache)
+            with self.assertRaises(jsonschema.ValidationError):
+                await client(bma.blockchain.parameters)
+            self.assertEqual(len(cache), 0)
+            await client.close()
+
+            # responses not validated are not served to a validating client
+            client = Client(_endpoint, validation=VALIDATE_OFF, cache=cache)
+            await client(bma.blockchain.parameters)
+            self.assertEqual(len(cache), 1)
+            await client.close()
+            client = Client(_endpoint, cache=cache)
+            with self.assertRaises(jsonschema.ValidationError):
+                await client(bma.blockchain.parameters)
+            await client.close()
+            self.assertEqual(len(requests), 5)
+
+        self.loop.run_until_complete(go())
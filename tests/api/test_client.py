@@ -0,0 +1,246 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import unittest
+
+import jsonschema
+
+from duniterpy.api.bma.blockchain import PARAMETERS_SCHEMA, parameters
+from duniterpy.api.bma.tx import HISTORY_SCHEMA
+from duniterpy.api.client import (
+    Client,
+    SessionPool,
+    get_session_pool,
+    get_validator,
+    validate,
+    VALIDATE_OFF,
+    VALIDATE_SAMPLED,
+)
+from duniterpy.api.endpoint import BMAEndpoint, GVAEndpoint
+from tests.api.webserver import WebFunctionalSetupMixin, web
+
+
+class TestSessionPool(WebFunctionalSetupMixin, unittest.TestCase):
+    def test_shared_session(self):
+        async def handler(request):
+            await request.read()
+            return web.json_response(
+                {"peer": request.transport.get_extra_info("peername")[1]}
+            )
+
+        async def go():
+            _, port, _ = await self.create_server("GET", "/node/summary", handler)
+            pool = SessionPool(limit_per_host=1)
+            client_a = Client(BMAEndpoint("127.0.0.1", "", "", port), session_pool=pool)
+            client_b = Client(
+                "BASIC_MERKLED_API 127.0.0.1 {0}".format(port), session_pool=pool
+            )
+            self.assertIs(client_a.session, client_b.session)
+            self.assertEqual(len(pool), 1)
+
+            response_a = await client_a.get("node/summary")
+            response_b = await client_b.get("node/summary")
+            # the keep-alive connection is reused by the second client
+            self.assertEqual(response_a["peer"], response_b["peer"])
+
+            # borrowed sessions are not closed by the clients
+            await client_a.close()
+            self.assertFalse(client_b.session.closed)
+
+            await pool.close()
+            self.assertTrue(client_b.session.closed)
+            self.assertEqual(len(pool), 0)
+
+        self.loop.run_until_complete(go())
+
+    def test_sessions_by_host(self):
+        async def go():
+            pool = SessionPool()
+            client_a = Client("BASIC_MERKLED_API 127.0.0.1 10901", session_pool=pool)
+            client_b = Client("BASIC_MERKLED_API 127.0.0.1 10902", session_pool=pool)
+            self.assertIsNot(client_a.session, client_b.session)
+            self.assertEqual(len(pool), 2)
+            await pool.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_release(self):
+        async def go():
+            pool = SessionPool()
+            client_a = Client("BASIC_MERKLED_API 127.0.0.1 10901", session_pool=pool)
+            client_b = Client("BASIC_MERKLED_API 127.0.0.1 10901", session_pool=pool)
+            session = client_a.session
+            await client_a.close()
+            await client_a.close()
+            self.assertFalse(session.closed)
+            # the session is closed by its last client
+            await client_b.close()
+            self.assertTrue(session.closed)
+            self.assertEqual(len(pool), 0)
+
+        self.loop.run_until_complete(go())
+
+    def test_default_pool(self):
+        self.assertIs(get_session_pool(), get_session_pool())
+
+        async def go():
+            client_a = Client("BASIC_MERKLED_API 127.0.0.1 10901")
+            client_b = Client("BASIC_MERKLED_API 127.0.0.1 10901")
+            self.assertIs(client_a.session_pool, get_session_pool())
+            self.assertIs(client_a.session, client_b.session)
+            self.assertIs(client_a.api(), client_a.api())
+
+            # the session is closed by its last client
+            await client_a.close()
+            self.assertFalse(client_b.session.closed)
+            await client_b.close()
+            self.assertTrue(client_b.session.closed)
+
+        self.loop.run_until_complete(go())
+
+
+class TestValidation(WebFunctionalSetupMixin, unittest.TestCase):
+    def test_validator_cache(self):
+        validator = get_validator(HISTORY_SCHEMA)
+        self.assertIs(validator, get_validator(HISTORY_SCHEMA))
+        self.assertIsNot(validator, get_validator(PARAMETERS_SCHEMA))
+
+    def test_validate_same_error(self):
+        data = {
+            "currency": "g1",
+            "pubkey": "GfKERHnJTYzKhKUma5h1uWhetbA8yHKymhVH2raf2aCP",
+            "history": {"sent": [{"version": 10}]},
+        }
+        with self.assertRaises(jsonschema.ValidationError) as expected:
+            jsonschema.validate(data, HISTORY_SCHEMA)
+        with self.assertRaises(jsonschema.ValidationError) as error:
+            validate(data, HISTORY_SCHEMA)
+        self.assertEqual(error.exception.message, expected.exception.message)
+        self.assertEqual(error.exception.path, expected.exception.path)
+
+    def test_validation_modes(self):
+        async def handler(request):
+            await request.read()
+            return web.Response(body=b"{}", content_type="application/json")
+
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/parameters", handler
+            )
+            _endpoint = BMAEndpoint("127.0.0.1", "", "", port)
+
+            client = Client(_endpoint)
+            with self.assertRaises(jsonschema.ValidationError):
+                await client(parameters)
+            await client.close()
+
+            client = Client(_endpoint, validation=VALIDATE_OFF)
+            self.assertEqual(await client(parameters), {})
+            await client.close()
+
+            client = Client(
+                _endpoint, validation=VALIDATE_SAMPLED, validation_sample_rate=0
+            )
+            self.assertEqual(await client(parameters), {})
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_unknown_validation_mode(self):
+        with self.assertRaises(ValueError):
+            Client("BASIC_MERKLED_API 127.0.0.1 10901", validation="partial")
+
+
+class TestCoalescing(WebFunctionalSetupMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.requests = []
+
+    async def node_handler(self, request):
+        self.requests.append(await request.read())
+        await asyncio.sleep(0.05)
+        if request.query.get("fail"):
+            return web.Response(status=500, text="error")
+        return web.json_response({"count": len(self.requests)})
+
+    def test_identical_get(self):
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/current", self.node_handler
+            )
+            client = Client(BMAEndpoint("127.0.0.1", "", "", port), coalesce=True)
+            results = await asyncio.gather(
+                *[client.get("blockchain/current") for _ in range(10)],
+                client.get("blockchain/current", {"leaves": "true"}),
+            )
+            # one request for the 10 identical calls, one for the other params
+            self.assertEqual(len(self.requests), 2)
+            self.assertEqual(len({id(result) for result in results[:10]}), 1)
+            self.assertEqual(client._in_flight, {})
+
+            # a finished request is not shared
+            await client.get("blockchain/current")
+            self.assertEqual(len(self.requests), 3)
+
+            # errors are raised to every caller
+            results = await asyncio.gather(
+                *[client.get("blockchain/current", {"fail": 1}) for _ in range(3)],
+                return_exceptions=True,
+            )
+            self.assertEqual(len(self.requests), 4)
+            for result in results:
+                self.assertIsInstance(result, ValueError)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_cancelled_caller(self):
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/current", self.node_handler
+            )
+            client = Client(BMAEndpoint("127.0.0.1", "", "", port), coalesce=True)
+            first = asyncio.ensure_future(client.get("blockchain/current"))
+            second = asyncio.ensure_future(client.get("blockchain/current"))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            self.assertEqual(await second, {"count": 1})
+            self.assertEqual(len(self.requests), 1)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_graphql_queries(self):
+        async def go():
+            _, port, _ = await self.create_server("POST", "/gva", self.node_handler)
+            client = Client(
+                GVAEndpoint("", "127.0.0.1", "", "", port, "gva"), coalesce=True
+            )
+            await asyncio.gather(
+                *[client.query("{ currentUd { amount } }") for _ in range(5)]
+            )
+            self.assertEqual(len(self.requests), 1)
+
+            # mutations are not shared
+            await asyncio.gather(
+                *[client.query("mutation { tx(rawTx: $tx) }") for _ in range(2)]
+            )
+            self.assertEqual(len(self.requests), 3)
+            await client.close()
+
+        self.loop.run_until_complete(go())
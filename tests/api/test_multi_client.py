@@ -0,0 +1,243 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import time
+import unittest
+
+from duniterpy.api import bma
+from duniterpy.api.client import VALIDATE_OFF, Client, SessionPool
+from duniterpy.api.endpoint import BMAEndpoint, GVAEndpoint
+from duniterpy.api.errors import DuniterError
+from duniterpy.api.multi_client import MultiClient, NodeState
+from tests.api.webserver import find_unused_port, web
+
+
+class Node:
+    """
+    Stand-in node answering after a delay, or failing
+    """
+
+    def __init__(self, name: str, delay: float = 0.0, status: int = 200) -> None:
+        self.name = name
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        self.port = find_unused_port()
+        self.endpoint = BMAEndpoint("127.0.0.1", "", "", self.port)
+        app = web.Application()
+        app.router.add_get("/blockchain/current", self.current)
+        app.router.add_post("/gva", self.current)
+        app.router.add_post("/tx/process", self.current)
+        self.runner = web.AppRunner(app)
+
+    async def current(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.status == 404:
+            return web.json_response(
+                {"ucode": 2003, "message": "No current block"}, status=404
+            )
+        if self.status != 200:
+            return web.Response(status=self.status, text="error")
+        return web.json_response({"node": self.name})
+
+    async def start(self):
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+
+class TestMultiClient(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.session_pool = SessionPool()
+        self.nodes = []
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.session_pool.close())
+        for node in self.nodes:
+            self.loop.run_until_complete(node.runner.cleanup())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    async def start(self, *nodes, **kwargs):
+        self.nodes.extend(nodes)
+        for node in nodes:
+            await node.start()
+        return MultiClient(
+            [node.endpoint for node in nodes],
+            session_pool=self.session_pool,
+            validation=VALIDATE_OFF,
+            **kwargs
+        )
+
+    def node_state(self):
+        async def go():
+            return NodeState(
+                Client(
+                    "BASIC_MERKLED_API 127.0.0.1 10901", session_pool=self.session_pool
+                )
+            )
+
+        return self.loop.run_until_complete(go())
+
+    def test_circuit_breaker(self):
+        node = self.node_state()
+        for _ in range(2):
+            node.failure(100.0, 3)
+        self.assertTrue(node.is_available(100.0, 30))
+        node.failure(100.0, 3)
+        self.assertFalse(node.is_available(110.0, 30))
+        # half open after the reset timeout
+        self.assertTrue(node.is_available(130.0, 30))
+        # a single request probes the half open circuit
+        node.probing = True
+        self.assertFalse(node.is_available(130.0, 30))
+        node.probing = False
+        node.success(0.1)
+        self.assertIsNone(node.opened_at)
+        self.assertGreater(node.error_rate, 0)
+
+    def test_hedge_delay(self):
+        node = self.node_state()
+        for duration in range(1, 101):
+            node.success(duration / 1000)
+        self.assertAlmostEqual(node.hedge_delay(0.95, 0.05), 0.096)
+        self.assertEqual(node.hedge_delay(0.1, 0.05), 0.05)
+
+    def test_score(self):
+        node = self.node_state()
+        # a node without response yet is given the default latency
+        node.in_flight = 3
+        self.assertEqual(node.score(0.1), 0.4)
+        node.success(0.2)
+        self.assertEqual(node.score(0.1), 0.8)
+
+    def test_routing(self):
+        async def go():
+            client = await self.start(Node("slow", 0.05), Node("fast"), hedge=False)
+            # nodes without response are tried first
+            for _ in range(2):
+                await client(bma.blockchain.current)
+            for _ in range(5):
+                self.assertEqual(await client(bma.blockchain.current), {"node": "fast"})
+            self.assertEqual(self.nodes[0].requests, 1)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_hedging(self):
+        async def go():
+            client = await self.start(
+                Node("stalled", 2), Node("fast"), min_hedge_delay=0.01
+            )
+            node = client.nodes[0]
+            # the p95 of the stalled node durations was 20 ms
+            for _ in range(20):
+                node.success(0.02)
+            client.nodes[1].success(0.05)
+            started = time.monotonic()
+            self.assertEqual(await client(bma.blockchain.current), {"node": "fast"})
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertEqual([node.requests for node in self.nodes], [1, 1])
+            # the cancelled request is not a failure
+            self.assertEqual(node.failures, 0)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_failover_and_circuit_breaker(self):
+        async def go():
+            client = await self.start(
+                Node("down", status=500),
+                Node("up", 0.01),
+                failure_threshold=2,
+                hedge=False,
+            )
+            for _ in range(4):
+                self.assertEqual(await client(bma.blockchain.current), {"node": "up"})
+            # the failing node is ranked after the answering node by its error rate
+            self.assertEqual(self.nodes[0].requests, 1)
+            self.assertIsNone(client.nodes[0].opened_at)
+            self.assertEqual(client.ranked_nodes()[0], client.nodes[1])
+
+            # the circuit of the failing node is open after 2 failures
+            client.nodes[1].in_flight = 10
+            self.assertEqual(await client(bma.blockchain.current), {"node": "up"})
+            self.assertEqual(self.nodes[0].requests, 2)
+            self.assertIsNotNone(client.nodes[0].opened_at)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_errors(self):
+        async def go():
+            client = await self.start(
+                Node("missing", status=404), Node("up"), hedge=False
+            )
+            # a DuniterError is not retried
+            with self.assertRaises(DuniterError):
+                await client(bma.blockchain.current)
+            self.assertEqual(self.nodes[1].requests, 0)
+            await client.close()
+
+            client = await self.start(
+                Node("down", status=500), Node("down", status=500), hedge=False
+            )
+            with self.assertRaises(ValueError):
+                await client(bma.blockchain.current)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_timeout(self):
+        async def go():
+            client = await self.start(
+                Node("slow", 0.5), Node("slow", 0.5), hedge=False, timeout=0.1
+            )
+            # a POST request is not sent to another node after a timeout
+            with self.assertRaises(asyncio.TimeoutError):
+                await client.post("tx/process")
+            self.assertEqual(self.nodes[0].requests + self.nodes[1].requests, 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await client.get("blockchain/current")
+            self.assertEqual(self.nodes[0].requests + self.nodes[1].requests, 3)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_graphql_nodes(self):
+        async def go():
+            bma_node, gva_node = Node("bma"), Node("gva")
+            self.nodes = [bma_node, gva_node]
+            for node in self.nodes:
+                await node.start()
+            client = MultiClient(
+                [
+                    bma_node.endpoint,
+                    GVAEndpoint("", "127.0.0.1", "", "", gva_node.port, "gva"),
+                ],
+                session_pool=self.session_pool,
+            )
+            self.assertEqual(await client.query("{ node }"), {"node": "gva"})
+            self.assertEqual(await client.get("blockchain/current"), {"node": "bma"})
+            await client.close()
+            # the sessions of the nodes are released
+            self.assertEqual(len(self.session_pool), 0)
+
+        self.loop.run_until_complete(go())
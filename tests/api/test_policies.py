@@ -0,0 +1,159 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import time
+import unittest
+
+from aiohttp import ClientTimeout
+
+from duniterpy.api.client import VALIDATE_OFF, Client
+from duniterpy.api.endpoint import BMAEndpoint, GVAEndpoint
+from duniterpy.api.policies import (
+    RateLimiter,
+    RetryPolicy,
+    TokenBucket,
+    parse_retry_after,
+)
+from tests.api.webserver import WebFunctionalSetupMixin, web
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_delay(self):
+        policy = RetryPolicy(backoff=0.5, max_backoff=3)
+        for retry, bound in ((0, 0.5), (1, 1), (2, 2), (5, 3)):
+            for _ in range(20):
+                self.assertLessEqual(policy.delay(retry), bound)
+        self.assertEqual(policy.delay(0, "2"), 2)
+        self.assertEqual(policy.delay(0, "120"), 3)
+        self.assertLessEqual(policy.delay(0, "invalid"), 0.5)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("1.5"), 1.5)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve(self):
+        bucket = TokenBucket(10, 2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        # tokens are reserved in advance
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+
+class TestClientPolicies(WebFunctionalSetupMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.requests = []
+        self.statuses = []
+
+    async def node_handler(self, request):
+        self.requests.append(time.monotonic())
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 429:
+            return web.Response(status=429, headers={"Retry-After": "0.1"})
+        if status != 200:
+            return web.Response(status=status)
+        if request.query.get("sleep"):
+            await asyncio.sleep(float(request.query["sleep"]))
+        return web.json_response({"count": len(self.requests)})
+
+    async def client(self, **kwargs):
+        self.app.router.add_route("POST", "/tx/process", self.node_handler)
+        self.app.router.add_route("POST", "/gva", self.node_handler)
+        _, port, _ = await self.create_server("GET", "/node/summary", self.node_handler)
+        return Client(
+            BMAEndpoint("127.0.0.1", "", "", port), validation=VALIDATE_OFF, **kwargs
+        )
+
+    def test_retries(self):
+        async def go():
+            client = await self.client(retry_policy=RetryPolicy(backoff=0.01))
+            self.statuses = [503, 502]
+            self.assertEqual(await client.get("node/summary"), {"count": 3})
+
+            # a 429 response is retried after its Retry-After delay
+            self.statuses = [429]
+            await client.get("node/summary")
+            self.assertGreaterEqual(self.requests[-1] - self.requests[-2], 0.09)
+
+            # too many failures
+            self.statuses = [503] * 4
+            with self.assertRaises(ValueError):
+                await client.get("node/summary")
+            self.assertEqual(len(self.requests), 9)
+
+            # POST requests are not retried
+            self.statuses = [503]
+            with self.assertRaises(ValueError):
+                await client.post("tx/process")
+            self.assertEqual(len(self.requests), 10)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_graphql_retries(self):
+        async def go():
+            bma_client = await self.client()
+            await bma_client.close()
+            client = Client(
+                GVAEndpoint("", "127.0.0.1", "", "", bma_client.endpoint.port, "gva"),
+                retry_policy=RetryPolicy(backoff=0.01),
+            )
+            # GraphQL queries are retried, unlike mutations
+            self.statuses = [503]
+            self.assertEqual(await client.query("{ node }"), {"count": 2})
+            self.statuses = [503]
+            await client.query("mutation { tx }")
+            self.assertEqual(len(self.requests), 3)
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_timeouts(self):
+        async def go():
+            client = await self.client(timeout=ClientTimeout(total=0.05))
+            with self.assertRaises(asyncio.TimeoutError):
+                await client.get("node/summary", {"sleep": 0.2})
+            # per call timeout
+            await client.get(
+                "node/summary", {"sleep": 0.1}, timeout=ClientTimeout(total=1)
+            )
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_rate_limiter(self):
+        async def go():
+            rate_limiter = RateLimiter(50, burst=1)
+            client = await self.client(rate_limiter=rate_limiter)
+            started = time.monotonic()
+            await asyncio.gather(*[client.get("node/summary") for _ in range(6)])
+            self.assertGreaterEqual(time.monotonic() - started, 0.09)
+            self.assertEqual(len(rate_limiter.buckets), 1)
+
+            # a 429 response pauses the requests to the node
+            client.retry_policy = RetryPolicy()
+            self.statuses = [429]
+            await asyncio.gather(*[client.get("node/summary") for _ in range(2)])
+            self.assertGreaterEqual(self.requests[-1] - self.requests[-3], 0.09)
+            await client.close()
+
+        self.loop.run_until_complete(go())
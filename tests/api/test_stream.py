@@ -0,0 +1,141 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import unittest
+
+import jsonschema
+
+from duniterpy.api import bma
+from duniterpy.api.client import Client
+from duniterpy.api.stream import JsonItemsParser
+from tests.api.webserver import WebFunctionalSetupMixin, web
+
+history = {
+    "currency": "g1",
+    "pubkey": "8Fi1VSTbjkXguwThF4v2ZxC5whK7pwG2vcGTkPUPjPGU",
+    "history": {
+        "received": [{"comment": 'skip ]}["{ me', "hash": "A"}],
+        "sent": [
+            {"comment": "first", "inputs": [1, {"a": "]"}], "hash": "B"},
+            {"comment": 'escaped \\" quote ]', "hash": "C"},
+            {"comment": "last", "unicode": "éàè", "hash": "D"},
+        ],
+        "pending": [],
+    },
+}
+
+
+def parse(document: str, path: tuple, size: int) -> list:
+    """
+    Return the items parsed from document fed by chunks of size characters
+
+    :param document: Json document
+    :param path: Path of the array
+    :param size: Chunk size
+    :return:
+    """
+    parser = JsonItemsParser(path)
+    items = []
+    for index in range(0, len(document), size):
+        items.extend(parser.feed(document[index : index + size]))
+    parser.close()
+    return items
+
+
+class TestJsonItemsParser(unittest.TestCase):
+    def test_parse_chunks(self):
+        for indent in (None, 2):
+            document = json.dumps(history, indent=indent, ensure_ascii=False)
+            for size in (1, 2, 3, 7, 64, len(document)):
+                self.assertEqual(
+                    parse(document, ("history", "sent"), size),
+                    history["history"]["sent"],
+                )
+                self.assertEqual(
+                    parse(document, ("history", "received"), size),
+                    history["history"]["received"],
+                )
+                self.assertEqual(parse(document, ("history", "pending"), size), [])
+
+    def test_parse_top_level_array(self):
+        document = json.dumps([1, -2.5e3, "a]", None, True, [[]], {"b": {}}])
+        for size in (1, 5, len(document)):
+            self.assertEqual(parse(document, (), size), json.loads(document))
+        # number cut by the end of the chunk
+        self.assertEqual(parse("[-1500.0, 2]", (), 7), [-1500.0, 2])
+
+    def test_parse_errors(self):
+        with self.assertRaises(ValueError):
+            parse(json.dumps(history), ("history", "unknown"), 10)
+        with self.assertRaises(ValueError):
+            parse(json.dumps(history)[:100], ("history", "sent"), 10)
+        with self.assertRaises(ValueError):
+            parse('[{"a": 1}, {"a": 2]', (), 3)
+
+
+class TestClientStream(WebFunctionalSetupMixin, unittest.TestCase):
+    def test_get_stream(self):
+        async def handler(request):
+            await request.read()
+            return web.json_response(history)
+
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET",
+                "/tx/history/8Fi1VSTbjkXguwThF4v2ZxC5whK7pwG2vcGTkPUPjPGU",
+                handler,
+            )
+            client = Client("BASIC_MERKLED_API 127.0.0.1 {0}".format(port))
+            items = [
+                item
+                async for item in client.get_stream(
+                    "tx/history/8Fi1VSTbjkXguwThF4v2ZxC5whK7pwG2vcGTkPUPjPGU",
+                    path=("history", "sent"),
+                    chunk_size=16,
+                )
+            ]
+            self.assertEqual(items, history["history"]["sent"])
+
+            # per item validation
+            with self.assertRaises(jsonschema.ValidationError):
+                async for _ in client(
+                    bma.tx.history_stream,
+                    "8Fi1VSTbjkXguwThF4v2ZxC5whK7pwG2vcGTkPUPjPGU",
+                ):
+                    pass
+            await client.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_members_stream(self):
+        members = {
+            "results": [{"pubkey": "key%d" % i, "uid": "m%d" % i} for i in range(500)]
+        }
+
+        async def handler(request):
+            await request.read()
+            return web.json_response(members)
+
+        async def go():
+            _, port, _ = await self.create_server("GET", "/wot/members", handler)
+            client = Client("BASIC_MERKLED_API 127.0.0.1 {0}".format(port))
+            items = [item async for item in client(bma.wot.members_stream)]
+            self.assertEqual(items, members["results"])
+            await client.close()
+
+        self.loop.run_until_complete(go())
@@ -0,0 +1,173 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+import unittest
+
+import jsonschema
+
+from duniterpy.api import bma
+from duniterpy.api.client import Client
+from duniterpy.api.endpoint import BMAEndpoint
+from duniterpy.api.tracing import Histogram, MetricsCollector, Tracer, path_label
+from tests.api.webserver import WebFunctionalSetupMixin, web
+
+PUBKEY = "8Fi1VSTbjkXguwThF4v2ZxC5whK7pwG2vcGTkPUPjPGU"
+
+
+class TestPathLabel(unittest.TestCase):
+    def test_path_label(self):
+        for path, label in (
+            ("blockchain/current", "blockchain/current"),
+            ("/blockchain/block/30000", "blockchain/block/:number"),
+            ("blockchain/with/newcomers", "blockchain/with/newcomers"),
+            ("wot/lookup/alice", "wot/lookup/:param"),
+            (
+                "tx/history/{0}/times/10/20".format(PUBKEY),
+                "tx/history/:param/times/:number/:number",
+            ),
+            ("", ""),
+        ):
+            self.assertEqual(path_label(path), label)
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantile(self):
+        histogram = Histogram((1, 2, 4))
+        self.assertTrue(math.isnan(histogram.quantile(0.5)))
+        for value in (0.5, 1.5, 1.5, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative_counts(), [1, 3, 4, 5])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum, 16.5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.75)
+        # values in the +Inf bucket
+        self.assertEqual(histogram.quantile(0.99), 4)
+
+
+class TestMetricsCollector(unittest.TestCase):
+    def test_export(self):
+        metrics = MetricsCollector((0.1, 1))
+        metrics.request_start("GET", "node:443", "blockchain/current")
+        metrics.request_end("GET", "node:443", "blockchain/current", 200, 0.05, 0)
+        metrics.request_start("GET", "node:443", "blockchain/current")
+        metrics.request_end("GET", "node:443", "blockchain/current", None, 2, 0)
+        metrics.ws_message("node:443", 'ws/"block"', "in", 100)
+
+        self.assertEqual(
+            metrics.export(),
+            """# HELP duniterpy_requests_total Count of the http requests
+# TYPE duniterpy_requests_total counter
+duniterpy_requests_total{method="GET",endpoint="node:443",path="blockchain/current",status="200"} 1
+# HELP duniterpy_request_errors_total Count of the http requests without response
+# TYPE duniterpy_request_errors_total counter
+duniterpy_request_errors_total{method="GET",endpoint="node:443",path="blockchain/current"} 1
+# HELP duniterpy_requests_in_flight Count of the http requests sent
+# TYPE duniterpy_requests_in_flight gauge
+duniterpy_requests_in_flight{endpoint="node:443"} 0
+# HELP duniterpy_request_duration_seconds Duration of the http requests until the response headers
+# TYPE duniterpy_request_duration_seconds histogram
+duniterpy_request_duration_seconds_bucket{method="GET",endpoint="node:443",path="blockchain/current",le="0.1"} 1
+duniterpy_request_duration_seconds_bucket{method="GET",endpoint="node:443",path="blockchain/current",le="1"} 1
+duniterpy_request_duration_seconds_bucket{method="GET",endpoint="node:443",path="blockchain/current",le="+Inf"} 2
+duniterpy_request_duration_seconds_sum{method="GET",endpoint="node:443",path="blockchain/current"} 2.05
+duniterpy_request_duration_seconds_count{method="GET",endpoint="node:443",path="blockchain/current"} 2
+# HELP duniterpy_ws_messages_total Count of the web socket messages
+# TYPE duniterpy_ws_messages_total counter
+duniterpy_ws_messages_total{endpoint="node:443",path="ws/\\"block\\"",direction="in"} 1
+# HELP duniterpy_ws_bytes_total Size of the web socket messages
+# TYPE duniterpy_ws_bytes_total counter
+duniterpy_ws_bytes_total{endpoint="node:443",path="ws/\\"block\\"",direction="in"} 100
+""",
+        )
+
+
+class TestClientTracing(WebFunctionalSetupMixin, unittest.TestCase):
+    def test_client_events(self):
+        async def handler(request):
+            await request.read()
+            return web.json_response(
+                {"number": 1, "hash": "A" * 64, "block": "1-" + "A" * 64}
+            )
+
+        async def go():
+            self.app.router.add_route("POST", "/blockchain/block", handler)
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/block/{number}", handler
+            )
+            metrics = MetricsCollector()
+            client = Client(BMAEndpoint("127.0.0.1", "", "", port), tracer=metrics)
+            with self.assertRaises(jsonschema.ValidationError):
+                # the response is not a valid block
+                await client(bma.blockchain.block, 1)
+            await client.post("blockchain/block", {"block": "x" * 10})
+            await client.close()
+            return metrics, "127.0.0.1:{0}".format(port)
+
+        metrics, endpoint = self.loop.run_until_complete(go())
+        path = "blockchain/block/:number"
+        self.assertEqual(
+            metrics.get(
+                "duniterpy_requests_total",
+                method="GET",
+                endpoint=endpoint,
+                path=path,
+                status="200",
+            ),
+            1,
+        )
+        self.assertEqual(
+            metrics.get(
+                "duniterpy_request_sent_bytes_total",
+                method="POST",
+                endpoint=endpoint,
+                path="blockchain/block",
+            ),
+            len("block=" + "x" * 10),
+        )
+        self.assertGreater(
+            metrics.get(
+                "duniterpy_response_received_bytes_total", endpoint=endpoint, path=path
+            ),
+            0,
+        )
+        for name in (
+            "duniterpy_json_decode_duration_seconds",
+            "duniterpy_validation_duration_seconds",
+        ):
+            self.assertEqual(metrics.get(name, endpoint=endpoint, path=path).count, 1)
+
+    def test_custom_tracer(self):
+        events = []
+
+        class RecordingTracer(Tracer):
+            def request_end(self, method, endpoint, path, status, *args):
+                events.append((method, path, status))
+
+        async def handler(request):
+            return web.json_response({})
+
+        async def go():
+            _, port, _ = await self.create_server("GET", "/node/summary", handler)
+            client = Client(
+                BMAEndpoint("127.0.0.1", "", "", port), tracer=RecordingTracer()
+            )
+            await client.get("node/summary")
+            await client.close()
+
+        self.loop.run_until_complete(go())
+        self.assertEqual(events, [("GET", "node/summary", 200)])
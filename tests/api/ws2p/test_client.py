@@ -0,0 +1,151 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import json
+import unittest
+
+import aiohttp
+import jsonschema
+
+from duniterpy.api.client import VALIDATE_OFF
+from duniterpy.api.ws2p.client import WS2PClient, WS2PError
+from tests.api.webserver import WebFunctionalSetupMixin, web
+from tests.documents.test_block import json_block_250004
+
+HEAD_MESSAGE = {"name": "HEAD", "body": {"heads": []}}
+
+
+async def node_handler(request):
+    """
+    WS2P node answering block requests after a delay decreasing with the block number,
+    so the responses come back in the reverse order of the requests
+    """
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    await ws.send_json(HEAD_MESSAGE)
+
+    async def answer(message):
+        body = message["body"]
+        if body["name"] == "BLOCK_BY_NUMBER":
+            number = body["params"]["number"]
+            if number < 0:
+                await ws.send_json({"resId": message["reqId"], "err": "Not found"})
+                return
+            if number == 999:
+                # never answered
+                return
+            await asyncio.sleep(0.01 * (10 - number))
+            block = json.loads(json_block_250004)
+            block["number"] = number
+            await ws.send_json({"resId": message["reqId"], "body": block})
+        elif body["name"] == "CURRENT":
+            await ws.send_json({"resId": message["reqId"], "body": {"number": 1}})
+
+    tasks = []
+    async for message in ws:
+        tasks.append(asyncio.ensure_future(answer(json.loads(message.data))))
+    await asyncio.gather(*tasks)
+    return ws
+
+
+class TestWS2PClient(WebFunctionalSetupMixin, unittest.TestCase):
+    async def connect(self, **kwargs):
+        _, _, url = await self.create_server("GET", "/", node_handler)
+        self.session = aiohttp.ClientSession()
+        # aiohttp web socket responses have the methods of WSConnection
+        return WS2PClient(await self.session.ws_connect(url), **kwargs)
+
+    def test_concurrent_requests(self):
+        async def go():
+            async with await self.connect() as ws2p_client:
+                heads = ws2p_client.subscribe()
+                blocks = await asyncio.gather(
+                    *[ws2p_client.get_block(number) for number in range(10)]
+                )
+                self.assertEqual([block["number"] for block in blocks], list(range(10)))
+                self.assertEqual(ws2p_client.pending, {})
+                self.assertEqual(await heads.get(), HEAD_MESSAGE)
+            # subscribers are notified of the end of the connection
+            self.assertIsNone(await heads.get())
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_errors(self):
+        async def go():
+            async with await self.connect(validation=VALIDATE_OFF) as ws2p_client:
+                with self.assertRaises(WS2PError):
+                    await ws2p_client.get_block(-1)
+                with self.assertRaises(asyncio.TimeoutError):
+                    await ws2p_client.get_block(999, timeout=0.05)
+                self.assertEqual(ws2p_client.pending, {})
+                self.assertEqual(await ws2p_client.get_current(), {"number": 1})
+
+            with self.assertRaises(ConnectionError):
+                await ws2p_client.get_block(1)
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_validation(self):
+        async def go():
+            async with await self.connect() as ws2p_client:
+                with self.assertRaises(jsonschema.ValidationError):
+                    await ws2p_client.get_current()
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_pending_failed_on_close(self):
+        async def go():
+            ws2p_client = await self.connect()
+            ws2p_client.start()
+            request = asyncio.ensure_future(ws2p_client.get_block(999))
+            await asyncio.sleep(0.05)
+            await ws2p_client.close()
+            with self.assertRaises(ConnectionError):
+                await request
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_closed_by_peer(self):
+        async def handler(request):
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            # non text messages are ignored
+            await ws.send_bytes(b"\x00")
+            await ws.send_json(HEAD_MESSAGE)
+            await ws.receive()
+            await ws.close()
+            return ws
+
+        async def go():
+            _, _, url = await self.create_server("GET", "/", handler)
+            self.session = aiohttp.ClientSession()
+            ws2p_client = WS2PClient(await self.session.ws_connect(url))
+            ws2p_client.start()
+            heads = ws2p_client.subscribe()
+            with self.assertRaises(ConnectionError) as error:
+                await ws2p_client.get_current()
+            self.assertIn("closed by the peer", str(error.exception))
+            self.assertEqual(await heads.get(), HEAD_MESSAGE)
+            await ws2p_client.close()
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
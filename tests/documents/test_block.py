@@ -17,7 +17,9 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import unittest
 import json
+import pickle
 
+from duniterpy.documents import MalformedDocumentError
 from duniterpy.documents.block import Block
 from duniterpy.documents.block_uid import BlockUID, block_uid
 from duniterpy.key.signing_key import SigningKey
@@ -1976,6 +1978,82 @@ AywstQpC0S5iaA/YQvbz2alpP6zTYG3tjkWpxy1jgeCo028Te2V327bBZbfDGDzsjxOrF4UVmEBiGsgb
             block.transactions[5].comment, "Merci pour la farine de chataigne"
         )
 
+    def test_from_signed_raw_lazy(self):
+        for raw in (
+            raw_block,
+            raw_block_zero,
+            raw_block_with_tx,
+            raw_block_with_leavers,
+            raw_block_with_excluded,
+            negative_issuers_frame_var,
+        ):
+            block = Block.from_signed_raw(raw)
+            lazy_block = Block.from_signed_raw(raw, lazy=True)
+            self.assertNotIn("transactions", lazy_block.__dict__)
+            self.assertEqual(lazy_block.excluded, block.excluded)
+            for name in ("identities", "joiners", "actives", "leavers"):
+                self.assertEqual(
+                    [document.inline() for document in getattr(lazy_block, name)],
+                    [document.inline() for document in getattr(block, name)],
+                )
+            self.assertEqual(lazy_block.transactions, block.transactions)
+            self.assertEqual(lazy_block.signed_raw(), raw)
+            self.assertEqual(lazy_block, block)
+
+    def test_lazy_block_pickle(self):
+        lazy_block = Block.from_signed_raw(raw_block_with_tx, lazy=True)
+        self.assertEqual(len(lazy_block.actives), 1)
+        copy = pickle.loads(pickle.dumps(lazy_block))
+        self.assertNotIn("transactions", copy.__dict__)
+        self.assertEqual(len(copy.transactions), 2)
+        self.assertEqual(copy.signed_raw(), raw_block_with_tx)
+        # the original block keeps its own pending state
+        self.assertEqual(len(lazy_block.transactions), 2)
+
+    def test_from_parsed_json_lazy(self):
+        for json_block in (json_block_0, json_block_250004):
+            parsed_json_block = json.loads(json_block)
+            block = Block.from_parsed_json(parsed_json_block)
+            lazy_block = Block.from_parsed_json(parsed_json_block, lazy=True)
+            self.assertNotIn("identities", lazy_block.__dict__)
+            self.assertEqual(lazy_block.number, block.number)
+            for name in ("identities", "joiners", "actives", "leavers", "revoked"):
+                self.assertEqual(
+                    [document.inline() for document in getattr(lazy_block, name)],
+                    [document.inline() for document in getattr(block, name)],
+                )
+            self.assertEqual(
+                [c.inline() for c in lazy_block.certifications],
+                [c.inline() for c in block.certifications],
+            )
+            self.assertEqual(lazy_block.transactions, block.transactions)
+            self.assertEqual(lazy_block.signed_raw(), block.signed_raw())
+
+        # pending documents are built from the json entries in a copy
+        lazy_block = Block.from_parsed_json(json.loads(json_block_250004), lazy=True)
+        copy = pickle.loads(pickle.dumps(lazy_block))
+        self.assertEqual(len(copy.transactions), 8)
+
+    def test_from_signed_raw_missing_section(self):
+        raw = raw_block.replace("Revoked:\n", "")
+        with self.assertRaises(MalformedDocumentError):
+            Block.from_signed_raw(raw)
+
+    def test_from_signed_raw_extra_lines(self):
+        block = Block.from_signed_raw(raw_block_with_tx + "\n\n")
+        self.assertEqual(block.signed_raw(), raw_block_with_tx)
+        self.assertEqual(len(block.transactions), 2)
+
+    def test_from_signed_raw_invalid_fields(self):
+        for field_name, raw in (
+            ("Nonce", raw_block.replace("Nonce: ", "Nonce: x")),
+            ("Number", raw_block.replace("Number: ", "Number: x")),
+            ("PreviousHash", raw_block_with_tx.replace("PreviousHash: ", "")),
+            ("Parameters", raw_block_zero.replace("Parameters: ", "Parameters: x")),
+        ):
+            with self.assertRaisesRegex(MalformedDocumentError, field_name):
+                Block.from_signed_raw(raw)
+
 
 if __name__ == "__main__":
     unittest.main()
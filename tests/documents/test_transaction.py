@@ -14,6 +14,7 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import pickle
 import unittest
 import pypeg2
 from duniterpy.grammars import output
@@ -452,3 +453,26 @@ class TestTransaction(unittest.TestCase):
         unlock1 = Unlock(0, [SIGParameter(0)])
         unlock2 = Unlock.from_inline("0:SIG(0)")
         self.assertEqual(unlock1, unlock2)
+
+    def test_unlock_hash(self):
+        unlock = Unlock(0, [SIGParameter(0), SIGParameter(1)])
+        self.assertEqual(hash(unlock), hash(Unlock.from_inline("0:SIG(0) SIG(1)")))
+        self.assertNotEqual(unlock, Unlock(0, [SIGParameter(0)]))
+        self.assertEqual(len({unlock, Unlock.from_inline("0:SIG(0) SIG(1)")}), 1)
+
+    def test_sources_slots(self):
+        input_source = InputSource.from_inline(input_source_str)
+        output_source = OutputSource.from_inline(compact_change.splitlines()[5])
+        for source in (input_source, output_source, SIGParameter(0)):
+            self.assertFalse(hasattr(source, "__dict__"))
+
+        # the cached hash is not pickled
+        for source in (input_source, output_source):
+            source_hash = hash(source)
+            copy = pickle.loads(pickle.dumps(source))
+            self.assertIsNone(copy._hash)
+            self.assertEqual(copy, source)
+            self.assertEqual(hash(copy), source_hash)
+        self.assertEqual(
+            len({input_source, InputSource.from_inline(input_source_str)}), 1
+        )
@@ -15,15 +15,75 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import pickle
+import random
 import unittest
 
 import pypeg2
 
-from duniterpy.grammars.output import SIG, CLTV, CSV, XHX, Operator, Condition
+from duniterpy.grammars.output import (
+    SIG,
+    CLTV,
+    CSV,
+    XHX,
+    Operator,
+    Condition,
+    compose_condition,
+    intern_condition,
+    parse_condition,
+)
 
 pubkey = "DNann1Lh55eZMEDXeYt59bzHbA3NJR46DeQYCS2qQdLV"
 
 
+def random_condition(rng: random.Random, depth: int = 0) -> str:
+    """
+    Return a random condition text, valid or not
+    """
+
+    def operand():
+        if depth < 3 and rng.random() < 0.25:
+            return "({0})".format(random_condition(rng, depth + 1))
+        function = rng.choice(["SIG", "XHX", "CSV", "CLTV"])
+        argument = rng.choice(
+            [pubkey, "309BC5E644F797F53E5A2065EAF38A173437F2E6", "12", "a_1"]
+        )
+        return "{0}({1})".format(function, argument)
+
+    def space():
+        return rng.choice([" ", " ", "  ", "\n", " \t"])
+
+    text = operand()
+    for _ in range(rng.choice([0, 0, 1, 1, 2, 3])):
+        operator = rng.choice(["&&", "||", "AND", "OR"])
+        text += space() + operator + space() + operand()
+    return text
+
+
+def mutate(rng: random.Random, text: str) -> str:
+    """
+    Return text with a random character removed, replaced or inserted
+    """
+    index = rng.randrange(len(text))
+    char = rng.choice(["(", ")", " ", "&", "|", "A", "x", "\n", ""])
+    return text[:index] + char + text[index + rng.choice([0, 1]) :]
+
+
+def tree(thing):
+    """
+    Return the attributes of a parsed condition as nested tuples, with their types
+    """
+    if isinstance(thing, (Condition, SIG, XHX, CSV, CLTV)):
+        return (type(thing),) + tuple(
+            (name, tree(value))
+            for name, value in sorted(vars(thing).items())
+            if name != "position_in_text"
+        )
+    if isinstance(thing, list):
+        return tuple(tree(item) for item in thing)
+    return type(thing), str(thing)
+
+
 class TestOutputgrammar(unittest.TestCase):
     def test_sig(self):
         condition = "SIG(HgTTJLAQ5sqfknMq7yLPZbehtuLSsKj9CxWN7k8QvYJd)"
@@ -162,3 +222,71 @@ class TestOutputgrammar(unittest.TestCase):
 
     def test_HXH_token_and_compose(self):
         self.assertEqual(XHX.token(pubkey).compose(), "XHX(" + pubkey + ")")
+
+    def test_parse_condition_like_pypeg2(self):
+        rng = random.Random(1156)
+        texts = ["", " ", "SIG()", "SIG( A)", "SIG(A)&&SIG(B)", "SIG(A) and SIG(B)"]
+        for _ in range(2000):
+            text = random_condition(rng)
+            texts += [text, " {0}\n".format(text), mutate(rng, text)]
+
+        for text in texts:
+            try:
+                expected = pypeg2.parse(text, Condition)
+            except SyntaxError:
+                with self.assertRaises(SyntaxError, msg=repr(text)):
+                    parse_condition(text)
+                continue
+            result = parse_condition(text)
+            self.assertEqual(tree(result), tree(expected), repr(text))
+            self.assertEqual(
+                compose_condition(result), pypeg2.compose(expected, Condition)
+            )
+
+    def test_compose_condition_like_pypeg2(self):
+        conditions = [
+            SIG.token(pubkey),
+            Condition.token(SIG.token(pubkey)),
+            Condition.token(SIG.token(pubkey), Operator.token("AND"), CSV.token(3)),
+            Condition.token(
+                Condition.token(CLTV.token(12)), "OR", Condition.token(XHX.token("A"))
+            ),
+            Condition.token("abc"),
+        ]
+        for condition in conditions:
+            self.assertEqual(
+                compose_condition(condition), pypeg2.compose(condition, Condition)
+            )
+        for condition in [
+            Condition("garbage"),
+            Condition.token(SIG.token(pubkey), "&&"),
+        ]:
+            with self.assertRaises(ValueError):
+                pypeg2.compose(condition, Condition)
+            with self.assertRaises(ValueError):
+                compose_condition(condition)
+
+    def test_intern_condition(self):
+        text = "SIG({0}) || CSV(12)".format(pubkey)
+        condition = intern_condition(text)
+        self.assertIs(intern_condition(text), condition)
+        self.assertEqual(condition, parse_condition(text))
+        with self.assertRaises(SyntaxError):
+            intern_condition("SIG(")
+
+        # interned trees are immutable
+        with self.assertRaises(AttributeError):
+            condition.op = Operator.token("&&")
+        with self.assertRaises(AttributeError):
+            condition.left.pubkey = "x"
+        self.assertIsInstance(condition.right, CSV)
+        self.assertEqual(compose_condition(condition), text)
+        self.assertEqual(pypeg2.compose(condition, Condition), text)
+        copy = pickle.loads(pickle.dumps(condition))
+        self.assertEqual(copy, condition)
+        with self.assertRaises(AttributeError):
+            copy.left = ""
+        # parsed trees can be modified
+        condition = parse_condition(text)
+        condition.op = Operator.token("&&")
+        self.assertEqual(compose_condition(condition), text.replace("||", "&&"))
@@ -0,0 +1,71 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from duniterpy.documents import Block, BlockUID, Membership
+
+CURRENCY = "g1-test"
+ALICE = "DNann1Lh55eZMEDXeYt59bzHbA3NJR46DeQYCS2qQdLV"
+SIGNATURE = "a" * 86 + "=="
+
+
+def membership(pubkey: str) -> Membership:
+    return Membership(
+        10, CURRENCY, pubkey, BlockUID.empty(), "IN", "uid", BlockUID.empty(), SIGNATURE
+    )
+
+
+def block(
+    number: int,
+    prev_hash: str = None,
+    ud: int = None,
+    joiners: list = (),
+    excluded: list = (),
+    transactions: list = (),
+    nonce: int = 0,
+    **fields
+) -> Block:
+    arguments = dict(
+        version=12,
+        currency=CURRENCY,
+        number=number,
+        powmin=0,
+        time=0,
+        mediantime=0,
+        ud=ud,
+        unit_base=0,
+        issuer=ALICE,
+        issuers_frame=1,
+        issuers_frame_var=0,
+        different_issuers_count=1,
+        prev_hash=prev_hash,
+        prev_issuer=ALICE if number else None,
+        parameters=None,
+        members_count=0,
+        identities=[],
+        joiners=[membership(pubkey) for pubkey in joiners],
+        actives=[],
+        leavers=[],
+        revokations=[],
+        excluded=list(excluded),
+        certifications=[],
+        transactions=list(transactions),
+        inner_hash="{0:064X}".format(number),
+        nonce=nonce,
+        signature=SIGNATURE,
+    )
+    arguments.update(fields)
+    return Block(**arguments)
@@ -0,0 +1,103 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from duniterpy.documents import Block
+from tests.documents.test_block import json_block_250004
+from tests.helpers.blocks import block
+
+try:
+    import numpy
+    from duniterpy.helpers.analytics import BlockSeries
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestBlockSeries(unittest.TestCase):
+    def setUp(self):
+        # dividends at blocks 1, 3 and 4, unit base change at block 4
+        self.series = BlockSeries.from_blocks(
+            [
+                block(0, mediantime=0, members_count=2),
+                block(1, mediantime=50, ud=1000, members_count=2),
+                block(2, mediantime=100, members_count=3),
+                block(3, mediantime=150, ud=1000, members_count=3),
+                block(4, mediantime=250, ud=105, unit_base=1, members_count=3),
+            ]
+        )
+
+    def test_from_blocks(self):
+        self.assertEqual(len(self.series), 5)
+        self.assertEqual(self.series.number.tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(self.series.ud.tolist(), [0, 1000, 0, 1000, 105])
+
+        # parsed json blocks give the same values as Block instances
+        json_block = json.loads(json_block_250004)
+        from_json = BlockSeries.from_blocks([json_block])
+        from_block = BlockSeries.from_blocks([Block.from_parsed_json(json_block)])
+        for name in ("number", "transactions_count", "outputs_amount"):
+            self.assertEqual(getattr(from_json, name), getattr(from_block, name))
+        self.assertEqual(from_json.transactions_count[0], 8)
+        self.assertGreater(from_json.outputs_amount[0], 0)
+
+    def test_monetary_mass(self):
+        self.assertEqual(self.series.dividends().tolist(), [0, 1000, 0, 1000, 1050])
+        self.assertEqual(
+            self.series.current_dividend().tolist(), [0, 1000, 1000, 1000, 1050]
+        )
+        self.assertEqual(
+            self.series.monetary_mass().tolist(), [0, 2000, 2000, 5000, 8150]
+        )
+        self.assertEqual(self.series.unit_base_changes().tolist(), [4])
+
+    def test_relative(self):
+        self.assertEqual(self.series.relative(2100), 2)
+        self.assertEqual(self.series.relative([500, 2100], [2, 4]).tolist(), [0.5, 2.0])
+        self.assertTrue(numpy.isnan(self.series.relative(100, 0)))
+        with self.assertRaises(ValueError):
+            self.series.relative(100, 5)
+
+    def test_volumes(self):
+        series = BlockSeries(
+            number=[0, 1, 2, 3],
+            mediantime=[10, 90, 110, 320],
+            ud=[0] * 4,
+            unit_base=[0] * 4,
+            members_count=[0] * 4,
+            transactions_count=[1, 2, 0, 1],
+            outputs_amount=[100, 200, 0, 50],
+        )
+        starts, volumes = series.volumes(100)
+        self.assertEqual(starts.tolist(), [0, 100, 300])
+        self.assertEqual(volumes.tolist(), [300, 0, 50])
+        starts, counts = series.per_period(series.transactions_count, 1000)
+        self.assertEqual((starts.tolist(), counts.tolist()), ([0], [4]))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "series.npz")
+            self.series.save(path)
+            loaded = BlockSeries.load(path)
+        self.assertEqual(
+            loaded.monetary_mass().tolist(), self.series.monetary_mass().tolist()
+        )
+        self.assertEqual(loaded.mediantime.tolist(), self.series.mediantime.tolist())
@@ -0,0 +1,173 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import pathlib
+import tempfile
+import unittest
+
+from duniterpy.helpers.blockchain import BlockchainStore, prefetch_blockchain, load
+from tests.documents.test_block import json_block_0
+
+
+def write_chunks(folder: pathlib.Path, sizes: list) -> list:
+    """
+    Write json chunk files with sizes blocks each and return the json blocks
+
+    :param folder: Chunks folder
+    :param sizes: Number of blocks of each chunk
+    :return:
+    """
+    json_blocks = []
+    for chunk_number, size in enumerate(sizes):
+        chunk = []
+        for _ in range(size):
+            json_block = json.loads(json_block_0)
+            json_block["number"] = len(json_blocks)
+            json_block["hash"] = "{0:064X}".format(len(json_blocks) + 1)
+            chunk.append(json_block)
+            json_blocks.append(json_block)
+        with open(str(folder.joinpath("chunk_%d-250.json" % chunk_number)), "w") as f:
+            json.dump({"blocks": chunk}, f)
+    return json_blocks
+
+
+class TestBlockchainStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.chunks_folder = pathlib.Path(self.tmp.name).joinpath("chunks")
+        self.chunks_folder.mkdir()
+        self.store_folder = pathlib.Path(self.tmp.name).joinpath("store")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_from_chunks(self):
+        json_blocks = write_chunks(self.chunks_folder, [3, 2])
+        with BlockchainStore.from_chunks(
+            self.chunks_folder, self.store_folder
+        ) as store:
+            self.assertEqual(len(store), 5)
+            self.assertEqual(store.json_block(3), json_blocks[3])
+            self.assertEqual(store.block(4).number, 4)
+            self.assertEqual(len(store.block(0).identities), 59)
+            with self.assertRaises(IndexError):
+                store.json_block(5)
+
+            self.assertEqual(store.number("{0:064X}".format(3)), 2)
+            self.assertEqual(store.block_by_hash("{0:064x}".format(5)).number, 4)
+            self.assertIsNone(store.number("{0:064X}".format(6)))
+            self.assertIsNone(store.block_by_hash("not a hash"))
+
+            self.assertEqual([b.number for b in store.blocks(1, 4)], [1, 2, 3])
+            self.assertEqual([b.number for b in store.blocks(3, 10)], [3, 4])
+            self.assertEqual([b.number for b in store], [0, 1, 2, 3, 4])
+
+        # reopen existing store
+        with BlockchainStore(self.store_folder) as store:
+            self.assertEqual(list(store.json_blocks()), json_blocks)
+
+    def test_from_chunks_empty(self):
+        with BlockchainStore.from_chunks(
+            self.chunks_folder, self.store_folder
+        ) as store:
+            self.assertEqual(len(store), 0)
+            self.assertEqual(list(store), [])
+
+    def test_from_chunks_missing_block(self):
+        write_chunks(self.chunks_folder, [2])
+        with open(str(self.chunks_folder.joinpath("chunk_1-250.json")), "w") as f:
+            json.dump({"blocks": [json.loads(json_block_0)]}, f)
+        with self.assertRaises(ValueError):
+            BlockchainStore.from_chunks(self.chunks_folder, self.store_folder)
+        # no store file is left by the failed import
+        self.assertEqual(
+            list(pathlib.Path(self.tmp.name).iterdir()), [self.chunks_folder]
+        )
+
+    def test_failed_import_keeps_store(self):
+        json_blocks = write_chunks(self.chunks_folder, [2])
+        BlockchainStore.from_chunks(self.chunks_folder, self.store_folder).close()
+        with open(str(self.chunks_folder.joinpath("chunk_1-250.json")), "w") as f:
+            f.write("{")
+        with self.assertRaises(ValueError):
+            BlockchainStore.from_chunks(self.chunks_folder, self.store_folder)
+        with BlockchainStore(self.store_folder) as store:
+            self.assertEqual(list(store.json_blocks()), json_blocks)
+            self.assertEqual(len(list(self.store_folder.iterdir())), 3)
+
+    def test_replace_store(self):
+        write_chunks(self.chunks_folder, [2])
+        BlockchainStore.from_chunks(self.chunks_folder, self.store_folder).close()
+        json_blocks = write_chunks(self.chunks_folder, [3])
+        with BlockchainStore.from_chunks(
+            self.chunks_folder, self.store_folder
+        ) as store:
+            self.assertEqual(list(store.json_blocks()), json_blocks)
+        # the previous and temporary store folders are removed
+        self.assertEqual(
+            sorted(pathlib.Path(self.tmp.name).iterdir()),
+            [self.chunks_folder, self.store_folder],
+        )
+
+    def test_hashes_index(self):
+        json_blocks = write_chunks(self.chunks_folder, [50])
+        # hashes in another order than the block numbers
+        for json_block in json_blocks:
+            json_block["hash"] = "{0:064X}".format((json_block["number"] * 37) % 50)
+        with open(str(self.chunks_folder.joinpath("chunk_0-250.json")), "w") as f:
+            json.dump({"blocks": json_blocks}, f)
+
+        with BlockchainStore.from_chunks(
+            self.chunks_folder, self.store_folder
+        ) as store:
+            self.assertEqual(len(store.hashes), 50)
+            for json_block in json_blocks:
+                self.assertEqual(store.number(json_block["hash"]), json_block["number"])
+            self.assertIsNone(store.number("{0:064X}".format(50)))
+            self.assertIsNone(store.number("F" * 64))
+
+
+class TestPrefetchBlockchain(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = pathlib.Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_prefetch_order(self):
+        write_chunks(self.folder, [3, 1, 2, 3])
+        blocks = list(prefetch_blockchain(self.folder, prefetch=2, max_workers=2))
+        self.assertEqual([b.number for b in blocks], list(range(9)))
+        self.assertEqual(len(blocks[8].identities), 59)
+
+    def test_load_prefetch(self):
+        write_chunks(self.folder, [2, 2])
+        blocks = load(str(self.folder), prefetch=3, max_workers=1)
+        self.assertEqual(next(blocks).number, 0)
+        # stop early, pending chunks are discarded
+        blocks.close()
+
+        self.assertEqual(
+            [b.number for b in load(str(self.folder), prefetch=1)], [0, 1, 2, 3]
+        )
+
+    def test_prefetch_empty(self):
+        self.assertEqual(list(prefetch_blockchain(self.folder)), [])
+        with self.assertRaises(ValueError):
+            list(prefetch_blockchain(self.folder, prefetch=0))
@@ -0,0 +1,120 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import pathlib
+import tempfile
+import unittest
+
+from duniterpy.documents import Block
+from duniterpy.helpers.export import (
+    TABLES,
+    ColumnarExporter,
+    export_blocks,
+    iter_row_groups,
+    pyarrow,
+    read_columns,
+)
+from tests.documents.test_block import json_block_0, json_block_250004
+
+
+class TestColumnarExporter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.folder = pathlib.Path(self.directory.name)
+        self.blocks = [json.loads(json_block_0), json.loads(json_block_250004)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_export_jsonl(self):
+        export_blocks(self.blocks, self.folder, row_group_size=3, file_format="jsonl")
+
+        blocks = read_columns(self.folder.joinpath("blocks.jsonl"))
+        self.assertEqual(blocks["number"], [0, 250004])
+        self.assertEqual(blocks["prev_hash"][0], None)
+        self.assertEqual(
+            blocks["hash"][1],
+            "000000F1189470F314CCBBA40071A9C09D4918315CAF3C66356700CD178FF371",
+        )
+
+        transactions = read_columns(self.folder.joinpath("transactions.jsonl"))
+        block = Block.from_parsed_json(self.blocks[1])
+        self.assertEqual(
+            transactions["hash"], [tx.sha_hash for tx in block.transactions]
+        )
+        self.assertEqual(transactions["issuers"][0], block.transactions[0].issuers)
+
+        # row groups are bounded
+        outputs_path = self.folder.joinpath("outputs.jsonl")
+        row_groups = list(iter_row_groups(outputs_path, ["amount"]))
+        self.assertTrue(all(len(group["amount"]) <= 3 for group in row_groups))
+        outputs = read_columns(outputs_path, ["amount", "condition", "owner"])
+        self.assertEqual(
+            len(outputs["amount"]), sum(len(tx.outputs) for tx in block.transactions)
+        )
+        self.assertEqual(
+            outputs["condition"][0], block.transactions[0].outputs[0].inline_condition()
+        )
+        self.assertEqual(outputs["owner"][0], outputs["condition"][0][4:-1])
+
+        memberships = read_columns(self.folder.joinpath("memberships.jsonl"))
+        self.assertEqual(len(memberships["issuer"]), len(self.blocks[0]["joiners"]))
+        self.assertEqual(set(memberships["section"]), {"joiners"})
+        certifications = read_columns(self.folder.joinpath("certifications.jsonl"))
+        self.assertEqual(
+            len(certifications["pubkey_from"]), len(self.blocks[0]["certifications"])
+        )
+
+    def test_empty_table(self):
+        export_blocks(self.blocks[:1], self.folder, file_format="jsonl")
+        self.assertEqual(
+            read_columns(self.folder.joinpath("inputs.jsonl")),
+            {name: [] for name, _ in TABLES["inputs"]},
+        )
+
+    def test_json_hash(self):
+        json_block = dict(self.blocks[0], hash="A" * 64)
+        del self.blocks[1]["hash"]
+        export_blocks([json_block, self.blocks[1]], self.folder, file_format="jsonl")
+        blocks = read_columns(self.folder.joinpath("blocks.jsonl"), ["hash"])
+        self.assertEqual(
+            blocks["hash"],
+            [
+                "A" * 64,
+                "000000F1189470F314CCBBA40071A9C09D4918315CAF3C66356700CD178FF371",
+            ],
+        )
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_export_parquet(self):
+        import pyarrow.parquet
+
+        export_blocks(self.blocks, self.folder, row_group_size=3, file_format="parquet")
+        export_blocks(self.blocks, self.folder.joinpath("jsonl"), file_format="jsonl")
+        for name in TABLES:
+            table = pyarrow.parquet.read_table(
+                str(self.folder.joinpath(name + ".parquet"))
+            )
+            self.assertEqual(
+                table.to_pydict(),
+                read_columns(self.folder.joinpath("jsonl", name + ".jsonl")),
+            )
+
+    def test_format(self):
+        with self.assertRaises(ValueError):
+            ColumnarExporter(self.folder, file_format="csv")
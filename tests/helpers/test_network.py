@@ -0,0 +1,188 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import base64
+import unittest
+
+from duniterpy.api.client import Client
+from duniterpy.api.endpoint import BMAEndpoint, endpoint
+from duniterpy.documents import BlockUID
+from duniterpy.documents.peer import Peer
+from duniterpy.documents.ws2p.heads import HeadV2
+from duniterpy.helpers.network import get_available_nodes, probe_endpoints
+from duniterpy.key import SigningKey
+from tests.api.webserver import WebFunctionalSetupMixin, find_unused_port, web
+
+CURRENCY = "g1-test"
+BLOCKSTAMP_OLD = (
+    "102101-000002C0694C7D373A78B095419C86584B81804CFB9641B7EBC3A18040B6FEE6"
+)
+BLOCKSTAMP_NEW = (
+    "102102-000002C0694C7D373A78B095419C86584B81804CFB9641B7EBC3A18040B6FEE6"
+)
+
+
+def head(key: SigningKey, blockstamp: str, valid: bool = True) -> dict:
+    """
+    Return a signed WS2P head entry of the heads list
+
+    :param key: Signing key of the node
+    :param blockstamp: Head blockstamp
+    :param valid: False to sign with another key
+    :return:
+    """
+    inline = HeadV2.from_inline(
+        "WS2POCAIC:HEAD:2:{0}:{1}:e66254bf:duniter:1.8.1:1:15:14".format(
+            key.pubkey, blockstamp
+        ),
+        "",
+    )[0].inline()
+    signer = key if valid else SigningKey.from_credentials("other", "other")
+    signature = base64.b64encode(signer.signature(bytes(inline, "ascii")))
+    return {"messageV2": inline, "sigV2": signature.decode("ascii"), "step": 0}
+
+
+def peer(key: SigningKey, endpoints: list, valid: bool = True) -> dict:
+    """
+    Return a signed peer entry of the peers list
+
+    :param key: Signing key of the node
+    :param endpoints: Inline endpoints
+    :param valid: False to change the document after signing
+    :return:
+    """
+    document = Peer(
+        10,
+        CURRENCY,
+        key.pubkey,
+        BlockUID.empty(),
+        [endpoint(inline) for inline in endpoints],
+        "",
+    )
+    document.sign([key])
+    return {
+        "version": 10,
+        "currency": CURRENCY,
+        "status": "UP",
+        "first_down": None,
+        "last_try": None,
+        "pubkey": key.pubkey,
+        "block": str(BlockUID.empty()),
+        "signature": document.signatures[0],
+        "endpoints": endpoints if valid else endpoints[:-1],
+    }
+
+
+class TestGetAvailableNodes(WebFunctionalSetupMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.keys = [
+            SigningKey.from_credentials("node{0}".format(i), "node{0}".format(i))
+            for i in range(6)
+        ]
+
+    async def start_node(self):
+        self.app.router.add_route("GET", "/network/ws2p/heads", self.ws2p_heads)
+        self.app.router.add_route("GET", "/network/peers", self.network_peers)
+        _, port, _ = await self.create_server("GET", "/node/summary", self.summary)
+        up = "BASIC_MERKLED_API 127.0.0.1 {0}".format(port)
+        down = "BASIC_MERKLED_API 127.0.0.1 {0}".format(find_unused_port())
+        self.up, self.down = up, down
+        keys = self.keys
+        self.heads = {
+            "heads": [
+                # older blockstamp, down
+                head(keys[0], BLOCKSTAMP_OLD),
+                head(keys[1], BLOCKSTAMP_NEW),
+                head(keys[2], BLOCKSTAMP_NEW),
+                # bad head signature
+                head(keys[3], BLOCKSTAMP_NEW, valid=False),
+                # bad peer signature
+                head(keys[4], BLOCKSTAMP_NEW),
+                # no peer
+                head(keys[5], BLOCKSTAMP_NEW),
+            ]
+        }
+        self.peers = {
+            "peers": [
+                peer(keys[0], [down]),
+                peer(keys[1], [down, up, "WS2P 3eaab4c7 127.0.0.1 20900"]),
+                peer(keys[2], [up]),
+                peer(keys[3], [up]),
+                peer(keys[4], [up, down], valid=False),
+                # only the first peer document of a pubkey is used
+                peer(keys[1], [up]),
+            ]
+        }
+        return Client(BMAEndpoint("127.0.0.1", "", "", port))
+
+    async def summary(self, request):
+        return web.json_response({"duniter": {"software": "duniter"}})
+
+    async def ws2p_heads(self, request):
+        return web.json_response(self.heads)
+
+    async def network_peers(self, request):
+        return web.json_response(self.peers)
+
+    def test_get_available_nodes(self):
+        async def go():
+            client = await self.start_node()
+            groups = await get_available_nodes(client)
+            await client.close()
+            return groups
+
+        groups = self.loop.run_until_complete(go())
+        self.assertEqual(
+            [[node["head"].pubkey for node in group] for group in groups],
+            [[self.keys[1].pubkey, self.keys[2].pubkey], [self.keys[0].pubkey]],
+        )
+        self.assertEqual(groups[0][0]["endpoints"], [self.down, self.up])
+        self.assertIsNone(groups[0][0]["latency"])
+
+    def test_probe(self):
+        async def go():
+            client = await self.start_node()
+            groups = await get_available_nodes(client, probe=True, probe_timeout=2)
+            await client.close()
+            return groups
+
+        groups = self.loop.run_until_complete(go())
+        # unreachable node and endpoints are removed
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(
+            {node["head"].pubkey for node in groups[0]},
+            {self.keys[1].pubkey, self.keys[2].pubkey},
+        )
+        for node in groups[0]:
+            self.assertEqual(node["endpoints"], [self.up])
+            self.assertGreater(node["latency"], 0)
+        self.assertLessEqual(groups[0][0]["latency"], groups[0][1]["latency"])
+
+    def test_probe_proxy(self):
+        async def go():
+            client = await self.start_node()
+            latencies = await probe_endpoints(client.session, [self.up], 2)
+            # the probes go through the unreachable proxy
+            proxy = "http://127.0.0.1:{0}".format(find_unused_port())
+            proxy_latencies = await probe_endpoints(client.session, [self.up], 2, proxy)
+            await client.close()
+            return latencies, proxy_latencies
+
+        latencies, proxy_latencies = self.loop.run_until_complete(go())
+        self.assertGreater(latencies[self.up], 0)
+        self.assertEqual(proxy_latencies, {self.up: None})
@@ -0,0 +1,301 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import jsonschema
+
+from duniterpy.api.client import VALIDATE_OFF, Client
+from duniterpy.api.ws2p.client import WS2PClient
+from duniterpy.api.errors import HTTPStatusError
+from duniterpy.helpers.sync import (
+    AdaptiveWindow,
+    fetch_blocks,
+    is_rate_limited,
+    sync_blocks,
+)
+from tests.api.webserver import WebFunctionalSetupMixin, web
+from tests.documents.test_block import json_block_0
+
+# block without documents to keep responses small
+small_block = dict(
+    json.loads(json_block_0), identities=[], joiners=[], certifications=[]
+)
+
+
+def blocks_handler(head: int, max_count: int, failures: dict):
+    """
+    Return a handler serving blocks up to head, at most max_count per request
+
+    failures maps a start block number to a list of status codes returned before success,
+    or "shifted" for blocks following the requested ones, or "invalid" for blocks not matching the schema.
+
+    :param head: Last block number of the chain
+    :param max_count: Maximum blocks count per response
+    :param failures: Status codes to return by start block number
+    :return:
+    """
+    requests = []
+
+    async def handler(request):
+        count = int(request.match_info["count"])
+        start = int(request.match_info["start"])
+        requests.append((start, count))
+        if failures.get(start):
+            status = failures[start].pop(0)
+            if status == "shifted":
+                numbers = range(start + 1, start + 1 + min(count, max_count))
+                return web.json_response([dict(small_block, number=n) for n in numbers])
+            if status == "invalid":
+                return web.json_response([{"number": start}])
+            if status == 429:
+                return web.json_response(
+                    {
+                        "ucode": 1006,
+                        "message": "This URI has reached its maximum usage quota",
+                    },
+                    status=status,
+                )
+            return web.Response(text="Internal error", status=status)
+        numbers = range(start, min(start + min(count, max_count), head + 1))
+        return web.json_response([dict(small_block, number=n) for n in numbers])
+
+    return handler, requests
+
+
+class TestFetchBlocks(WebFunctionalSetupMixin, unittest.TestCase):
+    def test_fetch_blocks(self):
+        handler, requests = blocks_handler(1000, 30, {10: [429], 30: [500, 500]})
+
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/blocks/{count}/{start}", handler
+            )
+            clients = [
+                Client("BASIC_MERKLED_API 127.0.0.1 {0}".format(port)) for _ in range(2)
+            ]
+            adaptive = AdaptiveWindow(window=20, concurrency=2, min_window=10)
+            numbers = [
+                block["number"]
+                async for block in fetch_blocks(
+                    clients, 10, 300, adaptive=adaptive, retry_delay=0.01
+                )
+            ]
+            for client in clients:
+                await client.close()
+            return numbers
+
+        numbers = self.loop.run_until_complete(go())
+        self.assertEqual(numbers, list(range(10, 300)))
+        # failed windows were requested again
+        self.assertEqual(len([r for r in requests if r[0] == 10]), 2)
+        self.assertEqual(len([r for r in requests if r[0] == 30]), 3)
+
+    def test_fetch_blocks_invalid_batches(self):
+        handler, requests = blocks_handler(1000, 30, {0: ["shifted"], 20: ["invalid"]})
+
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/blocks/{count}/{start}", handler
+            )
+            client = Client("BASIC_MERKLED_API 127.0.0.1 {0}".format(port))
+            adaptive = AdaptiveWindow(window=20, concurrency=2, min_window=10)
+            numbers = [
+                block["number"]
+                async for block in fetch_blocks(
+                    client, 0, 60, adaptive=adaptive, retry_delay=0.01
+                )
+            ]
+            await client.close()
+            return numbers
+
+        numbers = self.loop.run_until_complete(go())
+        self.assertEqual(numbers, list(range(60)))
+        self.assertEqual(len([r for r in requests if r[0] == 0]), 2)
+        self.assertEqual(len([r for r in requests if r[0] == 20]), 2)
+
+    def test_is_rate_limited(self):
+        self.assertTrue(is_rate_limited(HTTPStatusError(429, "")))
+        self.assertFalse(is_rate_limited(HTTPStatusError(500, "429")))
+        self.assertFalse(is_rate_limited(ValueError("status code != 200 => 429")))
+
+    def test_fetch_blocks_give_up(self):
+        handler, _ = blocks_handler(10, 30, {0: [500] * 3})
+
+        async def go():
+            _, port, _ = await self.create_server(
+                "GET", "/blockchain/blocks/{count}/{start}", handler
+            )
+            client = Client("BASIC_MERKLED_API 127.0.0.1 {0}".format(port))
+            try:
+                async for _ in fetch_blocks(
+                    client, 0, 10, max_attempts=3, retry_delay=0.01
+                ):
+                    pass
+            finally:
+                await client.close()
+
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(go())
+
+
+def ws2p_blocks_handler(head: int, max_count: int, failures: dict):
+    """
+    Return a WS2P handler serving getBlocks requests up to head, at most max_count per response
+
+    failures maps a fromNumber to a list of error messages returned before success.
+
+    :param head: Last block number of the chain
+    :param max_count: Maximum blocks count per response
+    :param failures: Error messages to return by fromNumber
+    :return:
+    """
+    requests = []
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            data = json.loads(message.data)
+            params = data["body"]["params"]
+            start, count = params["fromNumber"], params["count"]
+            requests.append((start, count))
+            if failures.get(start):
+                await ws.send_json(
+                    {"resId": data["reqId"], "err": failures[start].pop(0)}
+                )
+                continue
+            numbers = range(start, min(start + min(count, max_count), head + 1))
+            await ws.send_json(
+                {
+                    "resId": data["reqId"],
+                    "body": [dict(small_block, number=n) for n in numbers],
+                }
+            )
+        return ws
+
+    return handler, requests
+
+
+class TestSyncBlocks(WebFunctionalSetupMixin, unittest.TestCase):
+    async def connect(self, handler, count=1):
+        _, _, url = await self.create_server("GET", "/", handler)
+        self.session = aiohttp.ClientSession()
+        clients = []
+        for _ in range(count):
+            client = WS2PClient(
+                await self.session.ws_connect(url), validation=VALIDATE_OFF
+            )
+            client.start()
+            clients.append(client)
+        return clients
+
+    def test_sync_blocks(self):
+        handler, requests = ws2p_blocks_handler(1000, 30, {10: ["Busy"]})
+
+        async def go():
+            clients = await self.connect(handler, 2)
+            blocks = [
+                block
+                async for block in sync_blocks(
+                    clients, 10, 300, window=20, depth=3, retry_delay=0.01
+                )
+            ]
+            for client in clients:
+                await client.close()
+            await self.session.close()
+            return blocks
+
+        blocks = self.loop.run_until_complete(go())
+        self.assertEqual([block.number for block in blocks], list(range(10, 300)))
+        self.assertEqual(blocks[0].currency, small_block["currency"])
+        # failed window was requested again
+        self.assertEqual(len([r for r in requests if r[0] == 10]), 2)
+
+    def test_back_pressure(self):
+        handler, requests = ws2p_blocks_handler(1000, 100, {})
+
+        async def go():
+            (client,) = await self.connect(handler)
+            iterator = sync_blocks(client, 0, 1000, window=10, depth=2, lazy=True)
+            block = await iterator.__anext__()
+            self.assertEqual(block.number, 0)
+            self.assertEqual(block.joiners, [])
+            await asyncio.sleep(0.1)
+            # the windows ahead of the consumer are bounded by depth
+            self.assertLessEqual(len(requests), 3)
+            await iterator.aclose()
+            await client.close()
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_invalid_batch(self):
+        async def handler(request):
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            async for message in ws:
+                data = json.loads(message.data)
+                await ws.send_json({"resId": data["reqId"], "body": [{"number": 0}]})
+            return ws
+
+        async def go():
+            (client,) = await self.connect(handler)
+            try:
+                with ThreadPoolExecutor(1) as executor:
+                    async for _ in sync_blocks(
+                        client,
+                        0,
+                        10,
+                        executor=executor,
+                        max_attempts=2,
+                        retry_delay=0.01,
+                    ):
+                        pass
+            finally:
+                await client.close()
+                await self.session.close()
+
+        with self.assertRaises(jsonschema.ValidationError):
+            self.loop.run_until_complete(go())
+
+
+class TestAdaptiveWindow(unittest.TestCase):
+    def test_adaptive_window(self):
+        adaptive = AdaptiveWindow(
+            window=40, concurrency=4, min_window=10, max_window=60, max_concurrency=5
+        )
+        adaptive.success(0.1)
+        self.assertEqual((adaptive.window, adaptive.concurrency), (50, 5))
+        adaptive.success(0.1)
+        adaptive.success(0.1)
+        self.assertEqual((adaptive.window, adaptive.concurrency), (60, 5))
+        adaptive.success(10)
+        self.assertEqual((adaptive.window, adaptive.concurrency), (30, 5))
+        adaptive.failure()
+        self.assertEqual((adaptive.window, adaptive.concurrency), (15, 2))
+        adaptive.failure(rate_limited=True)
+        self.assertEqual((adaptive.window, adaptive.concurrency), (15, 1))
+        adaptive.failure()
+        self.assertEqual((adaptive.window, adaptive.concurrency), (10, 1))
+
+        with self.assertRaises(ValueError):
+            AdaptiveWindow(window=5, min_window=10)
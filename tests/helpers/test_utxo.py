@@ -0,0 +1,172 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+import unittest
+
+from duniterpy.documents import BlockUID
+from duniterpy.documents.transaction import (
+    InputSource,
+    OutputSource,
+    SIGParameter,
+    Transaction,
+    Unlock,
+)
+from duniterpy.helpers.utxo import UTXOIndex, source_owner
+from tests.helpers.blocks import ALICE, CURRENCY, SIGNATURE, block
+
+BOB = "HgTTJLAQ5sqfknMq7yLPZbehtuLSsKj9CxWN7k8QvYJd"
+
+
+def transaction(issuer: str, inputs: list, outputs: list) -> Transaction:
+    return Transaction(
+        10,
+        CURRENCY,
+        BlockUID.empty(),
+        0,
+        [issuer],
+        [InputSource.from_inline(inline) for inline in inputs],
+        [Unlock(index, [SIGParameter(0)]) for index in range(len(inputs))],
+        [OutputSource.from_inline(inline) for inline in outputs],
+        "",
+        [SIGNATURE],
+    )
+
+
+class TestUTXOIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = UTXOIndex()
+        self.blocks = [block(0, joiners=[ALICE, BOB])]
+        self.add_block(ud=1000)
+        # alice sends 300 to bob from her dividend
+        self.payment = transaction(
+            ALICE,
+            ["1000:0:D:{0}:1".format(ALICE)],
+            ["300:0:SIG({0})".format(BOB), "700:0:SIG({0})".format(ALICE)],
+        )
+        self.add_block(transactions=[self.payment])
+        self.add_block(ud=1100, excluded=[BOB])
+        self.index.apply_blocks(self.blocks)
+
+    def add_block(self, nonce=0, **kwargs):
+        previous = self.blocks[-1]
+        self.blocks.append(
+            block(previous.number + 1, previous.proof_of_work(), nonce=nonce, **kwargs)
+        )
+
+    def test_balances(self):
+        self.assertEqual(self.index.number, 3)
+        self.assertEqual(self.index.balance(ALICE), 1800)
+        self.assertEqual(self.index.balance(BOB), 1300)
+        self.assertEqual(self.index.balance(ALICE, 0), 0)
+        self.assertEqual(self.index.balance(ALICE, 1), 1000)
+        self.assertEqual(self.index.balance(BOB, 2), 1300)
+        self.assertEqual(self.index.balance("unknown"), 0)
+        self.assertEqual(self.index.members, {ALICE})
+
+    def test_sources(self):
+        payment_hash = self.payment.sha_hash
+        self.assertEqual(
+            set(self.index.sources(ALICE)),
+            {
+                InputSource(700, 0, "T", payment_hash, 1),
+                InputSource(1100, 0, "D", ALICE, 3),
+            },
+        )
+        self.assertEqual(
+            set(self.index.sources(BOB)),
+            {
+                InputSource(1000, 0, "D", BOB, 1),
+                InputSource(300, 0, "T", payment_hash, 0),
+            },
+        )
+
+    def test_invalid_block(self):
+        with self.assertRaises(ValueError):
+            self.index.apply(block(4, "0" * 64))
+        with self.assertRaises(ValueError):
+            self.index.apply(block(5, self.index.hash))
+
+        # the unknown source error reverts the changes of the block
+        spend = transaction(
+            BOB, ["300:0:T:{0}:0".format(self.payment.sha_hash)], ["300:0:SIG(A)"]
+        )
+        spent_twice = transaction(
+            BOB, ["300:0:T:{0}:0".format(self.payment.sha_hash)], ["300:0:SIG(B)"]
+        )
+        with self.assertRaises(ValueError):
+            self.index.apply(
+                block(
+                    4,
+                    self.index.hash,
+                    ud=1,
+                    joiners=[BOB],
+                    transactions=[spend, spent_twice],
+                )
+            )
+        self.assertEqual(self.index.number, 3)
+        self.assertEqual(self.index.balance(BOB), 1300)
+        self.assertEqual(len(self.index.sources(BOB)), 2)
+        self.assertEqual(self.index.members, {ALICE})
+
+    def test_rollback(self):
+        self.index.rollback(1)
+        self.assertEqual(self.index.number, 1)
+        self.assertEqual(self.index.hash, self.blocks[1].proof_of_work())
+        self.assertEqual(self.index.balance(ALICE), 1000)
+        self.assertEqual(self.index.balance(BOB), 1000)
+        self.assertEqual(
+            self.index.sources(ALICE), [InputSource(1000, 0, "D", ALICE, 1)]
+        )
+        self.assertEqual(self.index.members, {ALICE, BOB})
+
+        # apply a fork
+        del self.blocks[2:]
+        self.add_block(ud=1100, nonce=1)
+        self.index.apply(self.blocks[-1])
+        self.assertEqual(self.index.balance(ALICE), 2100)
+        self.assertEqual(self.index.balance(BOB, 2), 2100)
+
+        index = UTXOIndex(max_rollback=2)
+        index.apply_blocks(self.blocks)
+        index.rollback(0)
+        with self.assertRaises(ValueError):
+            index.revert()
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "utxo.json")
+            self.index.snapshot(path)
+            restored = UTXOIndex.restore(path)
+
+        self.assertEqual(restored.number, 3)
+        self.assertEqual(restored.hash, self.index.hash)
+        self.assertEqual(restored.members, self.index.members)
+        self.assertEqual(restored.sources_by_key, self.index.sources_by_key)
+        self.assertEqual(set(restored.sources(BOB)), set(self.index.sources(BOB)))
+        self.assertEqual(restored.balance(ALICE, 2), 700)
+
+        restored.rollback(0)
+        self.assertEqual(len(restored), 0)
+        self.assertEqual(restored.balance(ALICE), 0)
+
+    def test_source_owner(self):
+        self.assertEqual(source_owner("SIG({0})".format(ALICE)), ALICE)
+        self.assertIsNone(source_owner("(SIG({0}))".format(ALICE)))
+        self.assertIsNone(source_owner("SIG({0}) || SIG({1})".format(ALICE, BOB)))
+        self.assertIsNone(source_owner("XHX(ABC)"))
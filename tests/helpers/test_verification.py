@@ -0,0 +1,136 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from duniterpy.documents import Block, BlockUID, Identity
+from duniterpy.helpers.verification import (
+    check_proof_of_work,
+    verify_block,
+    verify_blocks,
+    ERROR_BLOCK_NUMBER,
+    ERROR_DOCUMENTS,
+    ERROR_INNER_HASH,
+    ERROR_PREVIOUS_HASH,
+    ERROR_PROOF_OF_WORK,
+    ERROR_SIGNATURE,
+)
+from duniterpy.key import SigningKey
+from duniterpy.key.scrypt_params import ScryptParams
+from tests.documents.test_block import raw_block_to_sign
+
+key = SigningKey.from_credentials("alice", "password", ScryptParams())
+
+
+def build_chain(count: int) -> list:
+    """
+    Return a valid chain of count blocks signed by key, with a null proof of work difficulty
+
+    :param count: Number of blocks
+    :return:
+    """
+    blocks = []
+    for number in range(1, count + 1):
+        block = Block.from_signed_raw(raw_block_to_sign)
+        block.number = number
+        block.powmin = 0
+        block.issuer = key.pubkey
+        if blocks:
+            block.prev_hash = blocks[-1].proof_of_work()
+        block.inner_hash = block.computed_inner_hash()
+        block.sign([key])
+        blocks.append(block)
+    return blocks
+
+
+class TestVerification(unittest.TestCase):
+    def test_check_proof_of_work(self):
+        self.assertTrue(check_proof_of_work("0000764B", 59))
+        self.assertTrue(check_proof_of_work("0004764B", 59))
+        self.assertFalse(check_proof_of_work("0005764B", 59))
+        self.assertFalse(check_proof_of_work("0010764B", 59))
+        self.assertTrue(check_proof_of_work("F010764B", 0))
+
+    def test_verify_block(self):
+        result = verify_block(raw_block_to_sign)
+        self.assertTrue(result.valid)
+        self.assertEqual(result.number, 699652)
+        self.assertEqual(
+            result.hash, Block.from_signed_raw(raw_block_to_sign).proof_of_work()
+        )
+
+        block = Block.from_signed_raw(raw_block_to_sign)
+        block.nonce += 1
+        result = verify_block(block)
+        self.assertIn(ERROR_SIGNATURE, result.errors)
+        self.assertIn(ERROR_PROOF_OF_WORK, result.errors)
+        self.assertNotIn(ERROR_INNER_HASH, result.errors)
+
+        block = Block.from_signed_raw(raw_block_to_sign)
+        block.members_count += 1
+        result = verify_block(block)
+        self.assertEqual(result.errors, [ERROR_INNER_HASH])
+
+    def test_verify_block_documents(self):
+        block = build_chain(1)[0]
+        identity = Identity(
+            block.version, block.currency, key.pubkey, "alice", BlockUID.empty(), None
+        )
+        identity.sign([key])
+        forged = Identity(
+            block.version, block.currency, key.pubkey, "bob", BlockUID.empty(), None
+        )
+        forged.signatures = identity.signatures
+        block.identities = [identity, forged]
+        block.inner_hash = block.computed_inner_hash()
+        block.sign([key])
+
+        result = verify_block(block)
+        self.assertEqual(result.errors, [ERROR_DOCUMENTS])
+        self.assertEqual(result.invalid_documents, [("identities", 1)])
+        self.assertTrue(verify_block(block, check_documents=False).valid)
+
+    def test_verify_blocks(self):
+        blocks = build_chain(10)
+        results = list(verify_blocks(blocks, batch_size=3, window=2, max_workers=2))
+        self.assertEqual([r.number for r in results], list(range(1, 11)))
+        self.assertTrue(all(r.valid for r in results))
+
+        # break the previous hash link of block 5
+        blocks[4].prev_hash = blocks[2].proof_of_work()
+        blocks[4].inner_hash = blocks[4].computed_inner_hash()
+        blocks[4].sign([key])
+        results = list(
+            verify_blocks(
+                [b.signed_raw() for b in blocks],
+                batch_size=4,
+                executor=ThreadPoolExecutor(2),
+            )
+        )
+        self.assertEqual([r.number for r in results if not r.valid], [5, 6])
+        self.assertEqual(results[4].errors, [ERROR_PREVIOUS_HASH])
+
+        # a missing block is reported
+        del blocks[6]
+        results = list(verify_blocks(blocks, executor=ThreadPoolExecutor(1)))
+        self.assertEqual(results[6].number, 8)
+        self.assertEqual(results[6].errors, [ERROR_BLOCK_NUMBER])
+
+    def test_verify_blocks_window(self):
+        with self.assertRaises(ValueError):
+            list(verify_blocks([], window=0))
@@ -0,0 +1,129 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+
+from duniterpy.documents import BlockUID, Certification, Revocation
+from duniterpy.helpers.wot import WoTGraph
+from tests.helpers.blocks import CURRENCY, SIGNATURE, block
+
+# sigValidity 100, xpercent 0.8, stepMax 2
+PARAMETERS = "0.0488:86400:1000:432000:100:5259600:100:5:5259600:5259600:0.8:31557600:2:24:300:12:0.67:1488970800:1490094000:15778800"
+MEMBERS = ["member{0}".format(index) for index in range(6)]
+
+
+def certification(pubkey_from: str, pubkey_to: str) -> Certification:
+    return Certification(
+        10, CURRENCY, pubkey_from, pubkey_to, BlockUID.empty(), SIGNATURE
+    )
+
+
+class TestWoTGraph(unittest.TestCase):
+    def setUp(self):
+        # members 0 to 3 certify each other, 0 certifies 4 and 4 certifies 5
+        certifications = [
+            certification(MEMBERS[i], MEMBERS[j])
+            for i in range(4)
+            for j in range(4)
+            if i != j
+        ]
+        certifications += [
+            certification(MEMBERS[0], MEMBERS[4]),
+            certification(MEMBERS[4], MEMBERS[5]),
+        ]
+        self.wot = WoTGraph()
+        self.wot.apply(
+            block(
+                0,
+                joiners=MEMBERS,
+                parameters=PARAMETERS.split(":"),
+                certifications=certifications,
+            )
+        )
+
+    def test_parameters(self):
+        self.assertEqual(self.wot.sig_validity, 100)
+        self.assertEqual(self.wot.xpercent, 0.8)
+        self.assertEqual(self.wot.step_max, 2)
+
+    def test_certifications(self):
+        self.assertEqual(self.wot.certifiers_of(MEMBERS[4]), [MEMBERS[0]])
+        self.assertEqual(
+            self.wot.certified_by(MEMBERS[0]),
+            MEMBERS[1:5],
+        )
+        self.assertEqual(self.wot.certifiers_of("unknown"), [])
+
+    def test_sentries(self):
+        # ceil(6 ** (1 / 2)) = 3 issued and received certifications
+        self.assertEqual(self.wot.sentries_threshold(), 3)
+        self.assertEqual(self.wot.sentries(), MEMBERS[:4])
+
+    def test_distance(self):
+        # 4 is reached by the 4 sentries in 2 steps, 5 only by member 0
+        self.assertTrue(self.wot.distance_ok(MEMBERS[4]))
+        self.assertFalse(self.wot.distance_ok(MEMBERS[5]))
+        self.assertEqual(self.wot.outdistanced(), [MEMBERS[5]])
+        self.assertTrue(self.wot.distance_ok(MEMBERS[0]))
+        self.assertFalse(self.wot.distance_ok("unknown"))
+
+    def test_distances_like_single_member(self):
+        rng = random.Random(2)
+        wot = WoTGraph(sig_validity=100, xpercent=0.5, step_max=3)
+        members = ["member{0}".format(index) for index in range(60)]
+        certifications = [
+            certification(rng.choice(members), rng.choice(members)) for _ in range(240)
+        ]
+        wot.apply(block(0, joiners=members, certifications=certifications))
+
+        distances = wot.distances()
+        self.assertTrue(0 < len(wot.outdistanced()) < len(members))
+        wot._distances = None
+        for member in members:
+            self.assertEqual(wot.distance_ok(member), distances[member], member)
+
+    def test_expiration(self):
+        self.wot.apply(
+            block(
+                1,
+                mediantime=60,
+                certifications=[certification(MEMBERS[0], MEMBERS[4])],
+            )
+        )
+        self.assertEqual(len(self.wot.expiring_before(100)), 0)
+        self.assertEqual(len(self.wot.expiring_before(101)), 13)
+        self.assertEqual(
+            self.wot.expiring_before(200)[-1], (MEMBERS[0], MEMBERS[4], 160)
+        )
+
+        # renewed certification is kept
+        self.wot.apply(block(2, mediantime=100))
+        self.assertEqual(self.wot.certifiers_of(MEMBERS[4]), [MEMBERS[0]])
+        self.assertEqual(self.wot.certified_by(MEMBERS[1]), [])
+        self.assertEqual(self.wot.sentries(), [])
+
+    def test_exclusion(self):
+        revocation = Revocation(10, CURRENCY, MEMBERS[1], SIGNATURE)
+        self.wot.apply(
+            block(1, excluded=[MEMBERS[2], MEMBERS[1]], revokations=[revocation])
+        )
+        self.assertEqual(self.wot.members, {0, 3, 4, 5})
+        self.assertEqual(self.wot.sentries_threshold(), 2)
+        self.assertEqual(self.wot.sentries(), [MEMBERS[0], MEMBERS[3]])
+        # certifications of excluded identities are kept
+        self.assertEqual(len(self.wot.certifiers_of(MEMBERS[0])), 3)
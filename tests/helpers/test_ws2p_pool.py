@@ -0,0 +1,190 @@
+"""
+Copyright  2014-2021 Vincent Texier <vit@free.fr>
+
+DuniterPy is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+DuniterPy is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import json
+import unittest
+from collections import Counter
+
+import aiohttp
+
+from duniterpy.api.client import VALIDATE_OFF, SessionPool
+from duniterpy.api.endpoint import WS2PEndpoint
+from duniterpy.api.ws2p.client import WS2PClient
+from duniterpy.helpers.ws2p import WS2PPool, ws2p_endpoints
+from duniterpy.key import SigningKey
+from tests.api.webserver import WebFunctionalSetupMixin, find_unused_port, web
+
+SIGNING_KEY = SigningKey.from_credentials("test", "test")
+
+
+class TestWS2PPool(WebFunctionalSetupMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        # response delays and max answered requests per connection, by server port
+        self.delays = {}
+        self.limits = {}
+        self.requests = Counter()
+        self.connections = Counter()
+        self.app.router.add_route("GET", "/", self.node_handler)
+
+    async def node_handler(self, request):
+        port = request.transport.get_extra_info("sockname")[1]
+        self.connections[port] += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        answered = 0
+        async for message in ws:
+            data = json.loads(message.data)
+            self.requests[port] += 1
+            await asyncio.sleep(self.delays[port])
+            await ws.send_json({"resId": data["reqId"], "body": {"port": port}})
+            answered += 1
+            if answered == self.limits.get(port):
+                await ws.close()
+        return ws
+
+    async def start_servers(self, delays, limits=None):
+        await self.runner.setup()
+        endpoints = []
+        for delay in delays:
+            port = find_unused_port()
+            await web.TCPSite(self.runner, "127.0.0.1", port).start()
+            self.delays[port] = delay
+            endpoints.append(WS2PEndpoint("abcdef01", "127.0.0.1", port, ""))
+        self.limits = dict(zip(self.delays, limits or []))
+        self.session = aiohttp.ClientSession()
+        return endpoints
+
+    async def connect(self, endpoint):
+        ws = await self.session.ws_connect(
+            "http://127.0.0.1:{0}/".format(endpoint.port)
+        )
+        client = WS2PClient(ws, validation=VALIDATE_OFF)
+        client.start()
+        return client
+
+    def pool(self, endpoints, **kwargs):
+        return WS2PPool(
+            endpoints,
+            SIGNING_KEY,
+            "g1-test",
+            min_backoff=0.01,
+            connect=self.connect,
+            **kwargs
+        )
+
+    def test_spread_by_latency(self):
+        async def go():
+            fast, slow = await self.start_servers([0.002, 0.05])
+            async with self.pool([fast, slow], size=2) as pool:
+                await pool.wait_ready(1)
+                await asyncio.sleep(0.05)
+                for _ in range(4):
+                    await asyncio.gather(*[pool.get_block(n) for n in range(10)])
+                self.assertEqual(len(pool.connected()), 2)
+            self.assertGreater(self.requests[slow.port], 0)
+            self.assertGreater(self.requests[fast.port], self.requests[slow.port])
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_reconnection(self):
+        async def go():
+            (endpoint,) = await self.start_servers([0], limits=[2])
+            async with self.pool([endpoint]) as pool:
+                for number in range(6):
+                    self.assertEqual(
+                        await pool.get_block(number), {"port": endpoint.port}
+                    )
+            self.assertGreaterEqual(self.connections[endpoint.port], 3)
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_spare_endpoint(self):
+        async def go():
+            (endpoint,) = await self.start_servers([0])
+            down = WS2PEndpoint("abcdef02", "127.0.0.1", find_unused_port(), "")
+            async with self.pool([down, endpoint], size=1) as pool:
+                self.assertEqual(await pool.get_current(), {"port": endpoint.port})
+                self.assertEqual(pool.connections[0].endpoint, endpoint)
+                self.assertEqual(list(pool.spares), [down])
+            with self.assertRaises(ConnectionError):
+                await pool.get_current()
+            await self.session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_backoff(self):
+        pool = WS2PPool(
+            [WS2PEndpoint("abcdef01", "127.0.0.1", 80, "")],
+            SIGNING_KEY,
+            "g1-test",
+            max_backoff=8,
+        )
+        for failures in range(10):
+            delay = pool.backoff(failures)
+            self.assertTrue(0 <= delay <= min(8, 2**failures))
+
+    def test_endpoint_clients(self):
+        async def go():
+            session_pool = SessionPool()
+            endpoint = WS2PEndpoint("abcdef01", "127.0.0.1", 80, "")
+            pool = WS2PPool(
+                [endpoint], SIGNING_KEY, "g1-test", session_pool=session_pool
+            )
+            # one client by endpoint, reused by the reconnections
+            client = pool.client(endpoint)
+            self.assertIs(
+                pool.client(WS2PEndpoint.from_inline(endpoint.inline())), client
+            )
+            self.assertEqual(len(session_pool), 1)
+            # the session is released and closed with the pool
+            await pool.close()
+            self.assertTrue(client.session.closed)
+            self.assertEqual(len(session_pool), 0)
+
+        self.loop.run_until_complete(go())
+
+    def test_best_connection(self):
+        endpoints = [
+            WS2PEndpoint("abcdef01", "127.0.0.1", port, "") for port in (80, 81, 82)
+        ]
+        pool = WS2PPool(endpoints, SIGNING_KEY, "g1-test", size=3)
+        fast, slow, new = pool.connections
+        fast.latency, slow.latency = 0.01, 0.05
+        # a connection without response yet is given the median latency
+        self.assertEqual(new.score(0.03), 0.03)
+        self.assertIs(pool.best_connection([slow, new]), new)
+        # its requests in flight count as well
+        new.in_flight = 1
+        self.assertIs(pool.best_connection([slow, new]), slow)
+        self.assertIs(pool.best_connection(pool.connections), fast)
+
+    def test_ws2p_endpoints(self):
+        peer = {
+            "endpoints": [
+                "BMAS g1-test.duniter.org 443",
+                "WS2P 3eaab4c7 g1-test.duniter.org 443 /ws2p",
+                "WS2PTOR 1be86653 3k2zovlpihbt3j3g.onion 20901",
+            ]
+        }
+        self.assertEqual(
+            ws2p_endpoints(peer),
+            [WS2PEndpoint("3eaab4c7", "g1-test.duniter.org", 443, "/ws2p")],
+        )
@@ -21,6 +21,7 @@ from duniterpy.documents.peer import Peer
 from duniterpy.documents.ws2p.heads import HeadV0, HeadV1, HeadV2
 from duniterpy.documents import Block
 from duniterpy.documents.transaction import Transaction
+import base64
 import unittest
 
 
@@ -149,3 +150,26 @@ rgjOmzFH5h+hkDbJLk1b88X7Z83HMgTa5rBckeMSdF/yZtItN3zMn09MphcXjffdrKcK+MebwoisLJqV
         tx = Transaction.from_compact("g1", transaction_document)
         verifying_key = VerifyingKey(tx.issuers[0])
         self.assertTrue(verifying_key.verify_document(tx))
+
+    def test_verify_many(self):
+        sign_key = SigningKey.from_credentials("alice", "password", ScryptParams())
+        other_key = SigningKey.from_credentials("bob", "password", ScryptParams())
+        items = []
+        for index in range(20):
+            message = "message {0}".format(index)
+            signature = base64.b64encode(sign_key.signature(bytes(message, "ascii")))
+            items.append((sign_key.pubkey, message, signature.decode("ascii")))
+        # wrong key, wrong message, raw bytes, invalid signature encoding
+        items[3] = (other_key.pubkey, items[3][1], items[3][2])
+        items[7] = (items[7][0], "forged", items[7][2])
+        items[8] = (
+            items[8][0],
+            bytes(items[8][1], "ascii"),
+            base64.b64decode(items[8][2]),
+        )
+        items[11] = (items[11][0], items[11][1], "not base64")
+
+        expected = [index not in (3, 7, 11) for index in range(20)]
+        self.assertEqual(VerifyingKey.verify_many(items), expected)
+        self.assertEqual(VerifyingKey.verify_many(iter(items), threads=3), expected)
+        self.assertEqual(VerifyingKey.verify_many([]), [])